@@ -0,0 +1,192 @@
+"""
+Disk-backed cache for text embeddings.
+
+Vectors are stored as float32 blobs in a small SQLite database, keyed by
+(embedding model name, SHA-256 of the text), so identical label documents and
+repeated questions are embedded once, and switching models never returns a
+vector from the old one. Lookups for a whole batch are one SELECT; all misses
+go to the wrapped embedding function in one call. The table is trimmed to
+max_entries, least recently used first.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+try:
+    from chromadb.api.types import EmbeddingFunction
+except ImportError:  # chromadb is optional with the numpy vector backend
+    EmbeddingFunction = object
+
+DEFAULT_EMBEDDING_CACHE = {
+    "enabled": True,
+    "path": str(settings.BASE_DIR / "embedding_cache.sqlite3"),
+    "max_entries": 200000,
+}
+
+# SQLite limits bound parameters per statement; stay well below it.
+_LOOKUP_CHUNK = 500
+
+
+def get_embedding_cache_config():
+    config = dict(DEFAULT_EMBEDDING_CACHE)
+    config.update(getattr(settings, "EMBEDDING_CACHE", {}))
+    return config
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, key TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL, PRIMARY KEY (model, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model, keys):
+        """{key: float32 vector} for the keys that are cached. Marks them as used."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique_keys), _LOOKUP_CHUNK):
+                chunk = unique_keys[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                    [(now, model, key) for key in found],
+                )
+        return found
+
+    def put_many(self, model, items):
+        """Stores {key: vector} and evicts down to max_entries."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((model, key, len(vector), vector.tobytes(), now))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._count += self._conn.total_changes - before
+            self._conn.execute("COMMIT")
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        # Another process may have inserted or evicted too, so recount before trimming.
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = self._count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self._count -= overflow
+
+    def clear(self, model=None):
+        with self._lock:
+            if model:
+                self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+            else:
+                self._conn.execute("DELETE FROM embeddings")
+            self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """
+    Wraps a Chroma embedding function with EmbeddingCache. Reports the wrapped
+    function's name and config, so collections persisted with the plain function
+    open unchanged.
+    """
+
+    def __init__(self, embedding_function, model_name, cache):
+        self.embedding_function = embedding_function
+        self.model_name = model_name
+        self.cache = cache
+
+    def __call__(self, input):
+        texts = list(input)
+        keys = [text_key(text) for text in texts]
+        cached = self.cache.get_many(self.model_name, keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.embedding_function(list(missing.values()))
+            fresh = dict(zip(missing, (np.asarray(v, dtype=np.float32) for v in vectors)))
+            self.cache.put_many(self.model_name, fresh)
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, input):
+        # nomic-embed-text through Ollama embeds queries and documents the same way.
+        return self.__call__(input)
+
+    @staticmethod
+    def name():
+        return "ollama"
+
+    def get_config(self):
+        return self.embedding_function.get_config()
+
+    @staticmethod
+    def build_from_config(config):
+        from chromadb.utils.embedding_functions import OllamaEmbeddingFunction
+        return OllamaEmbeddingFunction.build_from_config(config)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Process-wide cache instance, or None when disabled in settings."""
+    global _cache
+    config = get_embedding_cache_config()
+    if not config["enabled"]:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(config["path"], config["max_entries"])
+    return _cache
+
+
+def cached_embedding_function(embedding_function, model_name):
+    """embedding_function wrapped in the disk cache, or unchanged when caching is disabled."""
+    cache = get_embedding_cache()
+    if cache is None:
+        return embedding_function
+    return CachedEmbeddingFunction(embedding_function, model_name, cache)
@@ -0,0 +1,69 @@
+"""
+Per-user cache of rendered pages and page fragments.
+
+The pet list and the profile form are rendered from a handful of rows that
+change rarely, yet every load queried them and rendered the template (with
+the chat widget from base.html). get_or_render() stores the rendered HTML in
+Django's cache under a per-user key; the post_save/post_delete receivers of
+Pet, UserProfile and User (pet_manager/signals.py,
+user_profile/cache_invalidation.py) delete exactly the entries of the user
+whose data changed. The timeout only bounds what writes that send no signals
+(queryset.update, bulk_update) can leave stale; those callers invalidate
+explicitly with invalidate_user_pages(). Entries are dropped when the
+transaction commits, not when the row is saved.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+DEFAULT_USER_PAGE_CACHE = {
+    "enabled": True,
+    "alias": "default",   # entry in settings.CACHES
+    "timeout": 3600,      # seconds
+    "key_prefix": "userpage",
+}
+
+# Cached page/fragment names and the models they are rendered from.
+MY_PETS = "my_pets"
+PROFILE_FORM = "profile_form"
+PAGES = (MY_PETS, PROFILE_FORM)
+
+
+def get_user_page_cache_config():
+    config = dict(DEFAULT_USER_PAGE_CACHE)
+    config.update(getattr(settings, "USER_PAGE_CACHE", {}))
+    return config
+
+
+def user_page_key(user_id, page, config=None):
+    config = config or get_user_page_cache_config()
+    return f"{config['key_prefix']}:{page}:{user_id}"
+
+
+def get_or_render(user_id, page, render):
+    """The cached HTML of `page` for the user, else render() (a str), cached."""
+    config = get_user_page_cache_config()
+    if not config["enabled"]:
+        return render()
+    cache = caches[config["alias"]]
+    key = user_page_key(user_id, page, config)
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, config["timeout"])
+    return html
+
+
+def invalidate_user_pages(user_ids, pages=PAGES):
+    """
+    Drops the cached `pages` of each user id in `user_ids` (None ids are ignored) once the
+    current transaction commits (immediately outside one). Dropping them earlier would let a
+    concurrent request re-cache the old rows until the timeout.
+    """
+    config = get_user_page_cache_config()
+    if not config["enabled"]:
+        return
+    keys = [user_page_key(user_id, page, config) for user_id in set(user_ids) if user_id is not None
+            for page in pages]
+    if keys:
+        transaction.on_commit(lambda: caches[config["alias"]].delete_many(keys))
@@ -79,13 +79,40 @@ WSGI_APPLICATION = 'PetPalAI.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# SQLite production mode (PetPalAI/sqlite_backend): WAL journaling, busy timeout and tuned
+# pragmas on every connection, BEGIN IMMEDIATE transactions and one writer at a time per
+# process, so concurrent chat requests wait for each other instead of failing with
+# "database is locked". Every transaction.atomic() block counts as a writer, including
+# read-only ones. Opt in on deployments with SQLITE_PRODUCTION_MODE=1; it switches the
+# database file to WAL mode (db.sqlite3-wal/-shm files appear next to it).
+SQLITE_PRODUCTION_MODE = os.environ.get('SQLITE_PRODUCTION_MODE', '0') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'PetPalAI.sqlite_backend' if SQLITE_PRODUCTION_MODE else 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
 
+SQLITE_TUNING = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout_ms': 20000,
+    'cache_size_kib': 65536,       # page cache per connection
+    'mmap_size_bytes': 268435456,  # 256 MB of the database file memory-mapped for reads
+    'temp_store': 'MEMORY',
+    'immediate_transactions': True,
+    'serialize_writes': True,
+}
+
+# Resolved agent cases and inactive sessions move to the compressed ArchivedAgentCase table
+# (python manage.py archive_agent_cases; see agent/archive.py).
+AGENT_CASE_ARCHIVE = {
+    'resolved_after_days': 7,
+    'inactive_after_days': 30,
+    'batch_size': 500,
+}
+
 # Login validation
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/profile/'
@@ -111,6 +138,109 @@ AUTH_PASSWORD_VALIDATORS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Label OCR preprocessing (see petfood_analyzer/preprocessing.py for all keys and defaults)
+LABEL_OCR_PREPROCESSING = {
+    'enabled': True,
+    'target_dpi': 300,
+    'deskew': True,
+    'crop': True,
+}
+# 'single' = one Tesseract call, 'tiled' = parallel OCR of overlapping bands,
+# 'auto' = tiled only for images tall enough to split (see petfood_analyzer/ocr.py)
+LABEL_OCR_MODE = 'auto'
+LABEL_OCR_TILING = {
+    'band_height': 600,
+    'overlap': 80,
+}
+
+# AI pros/cons: temperature 0 + fixed seed so cached answers are reproducible,
+# and a bounded cache of answers keyed on normalized nutrition data.
+AI_ANALYSIS_DETERMINISTIC = True
+AI_ANALYSIS_CACHE = {
+    'enabled': True,
+    'max_entries': 5000,
+    'ttl_seconds': 30 * 24 * 3600,
+}
+
+# In-memory scan indexes (nutrient matrix, ingredient index, BM25) re-read scans saved since
+# their last sync minus this overlap, and drop deleted ones (see petfood_analyzer/scan_sync.py).
+SCAN_INDEX_SYNC = {
+    'overlap_seconds': 30,
+}
+
+# On-disk Chroma index of scanned labels (see PetPalAI/utils.py). Rebuild it from the
+# database with 'python manage.py rebuild_vector_index'.
+VECTOR_STORE = {
+    'backend': 'chroma',  # or 'numpy' (memory-mapped index, see PetPalAI/vector_backends.py)
+    'path': str(BASE_DIR / 'chroma_db'),
+    'collection': 'food_label_collection',
+    'numpy_path': str(BASE_DIR / 'vector_index'),
+    'nprobe': 8,
+    'validate_on_startup': True,
+    # Changing the model (or views.LABEL_DOCUMENT_SCHEMA) makes the active index version stale;
+    # 'python manage.py reembed_vector_index' re-embeds into a new version without downtime.
+    'embedding_model': 'nomic-embed-text',
+    'ollama_url': 'http://localhost:11434',
+    'version_check_seconds': 30,
+    'auto_reembed': False,
+    'gc_grace_seconds': 300,
+}
+
+# Embeddings are cached on disk by (model, text hash) so unchanged documents and
+# repeated questions are not re-embedded (see PetPalAI/embedding_cache.py).
+EMBEDDING_CACHE = {
+    'enabled': True,
+    'path': str(BASE_DIR / 'embedding_cache.sqlite3'),
+    'max_entries': 200000,
+}
+
+# Vector-store writes are buffered and flushed in batches: when max_batch documents are
+# waiting or the oldest has waited max_delay_seconds (see PetPalAI/vector_writer.py).
+VECTOR_INGEST = {
+    'max_batch': 32,
+    'max_delay_seconds': 2.0,
+    'max_attempts': 3,
+}
+
+# Label context for the agent's food questions (see petfood_analyzer/rag_context.py).
+# Token counts are estimated as characters / chars_per_token.
+RAG_CONTEXT = {
+    'max_tokens': 1200,
+    'duplicate_threshold': 0.8,
+    'max_ingredients': 25,
+}
+
+# File-based so that the signal invalidation in one worker process reaches all of them
+# (a local-memory cache is per process).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(BASE_DIR / 'page_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Per-user cache of the pet list and profile form (see PetPalAI/page_cache.py); entries are
+# dropped by Pet/UserProfile/User signals, the timeout only bounds signal-less writes.
+USER_PAGE_CACHE = {
+    'enabled': True,
+    'alias': 'default',
+    'timeout': 3600,
+}
+
+# Agent turn outcomes (agent/orchestrator.py) go to the console; per-tool outcomes,
+# latency and tokens are stored as ToolInvocation rows (see agent/telemetry.py).
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'agent': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -0,0 +1,149 @@
+"""
+SQLite backend tuned for concurrent requests.
+
+The stock backend opens transactions with a deferred BEGIN: a transaction
+that reads first (AgentCase.objects.get(...), then .save()) has to upgrade
+its read lock to a write lock, and when another connection is writing at the
+same moment SQLite fails it at once with "database is locked", without
+waiting out the busy timeout. This backend:
+
+  * sets WAL journaling, busy_timeout and the pragmas in settings.SQLITE_TUNING
+    on every new connection (readers no longer block the writer, or the
+    writer the readers);
+  * starts transactions with BEGIN IMMEDIATE, so the write lock is taken up
+    front and waited for instead of failing on upgrade;
+  * funnels writes through one process-wide lock: threads of a process queue
+    for it in order, and only one connection per process competes for
+    SQLite's file lock (other processes are handled by busy_timeout).
+
+A transaction cannot know up front whether it will write, so every
+transaction.atomic() block takes the write lock and BEGIN IMMEDIATE, even
+one that only reads; keep reads outside atomic() where they can be (they run
+in autocommit and take no lock). Set immediate_transactions/serialize_writes
+to False in SQLITE_TUNING to keep only the pragmas.
+
+Enabled with SQLITE_PRODUCTION_MODE=1 in the environment, which sets ENGINE
+'PetPalAI.sqlite_backend' (see settings.DATABASES).
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+DEFAULT_SQLITE_TUNING = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",     # with WAL: durable across application crashes, fsync at checkpoints
+    "busy_timeout_ms": 20000,
+    "cache_size_kib": 65536,
+    "mmap_size_bytes": 268435456,
+    "temp_store": "MEMORY",
+    "immediate_transactions": True,
+    "serialize_writes": True,
+}
+
+_WRITE_RE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+# One writer at a time per process.
+_write_lock = threading.Lock()
+
+
+def get_sqlite_tuning_config():
+    config = dict(DEFAULT_SQLITE_TUNING)
+    config.update(getattr(settings, "SQLITE_TUNING", {}))
+    return config
+
+
+def _acquire_write_lock(config):
+    if not _write_lock.acquire(timeout=config["busy_timeout_ms"] / 1000):
+        raise OperationalError("database is locked (timed out waiting for this process's write lock)")
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    """Holds the process write lock around autocommit writes (those outside a transaction)."""
+
+    def execute(self, query, params=None):
+        if self._needs_lock(query):
+            _acquire_write_lock(self.tuning)
+            try:
+                return super().execute(query, params)
+            finally:
+                _write_lock.release()
+        return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        if self._needs_lock(query):
+            _acquire_write_lock(self.tuning)
+            try:
+                return super().executemany(query, param_list)
+            finally:
+                _write_lock.release()
+        return super().executemany(query, param_list)
+
+    def _needs_lock(self, query):
+        return (self.tuning["serialize_writes"] and not self.wrapper.holds_write_lock
+                and _WRITE_RE.match(query) is not None)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tuning = get_sqlite_tuning_config()
+        self.holds_write_lock = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.setdefault("timeout", self.tuning["busy_timeout_ms"] / 1000)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        tuning = self.tuning
+        conn.execute(f"PRAGMA journal_mode = {tuning['journal_mode']}")
+        conn.execute(f"PRAGMA synchronous = {tuning['synchronous']}")
+        conn.execute(f"PRAGMA busy_timeout = {int(tuning['busy_timeout_ms'])}")
+        conn.execute(f"PRAGMA cache_size = {-int(tuning['cache_size_kib'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(tuning['mmap_size_bytes'])}")
+        conn.execute(f"PRAGMA temp_store = {tuning['temp_store']}")
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.wrapper = self
+        cursor.tuning = self.tuning
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        if self.tuning["serialize_writes"] and not self.holds_write_lock:
+            _acquire_write_lock(self.tuning)
+            self.holds_write_lock = True
+        try:
+            self.cursor().execute("BEGIN IMMEDIATE" if self.tuning["immediate_transactions"] else "BEGIN")
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            _write_lock.release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
@@ -1,18 +1,305 @@
-import chromadb
-from chromadb.utils import embedding_functions
+import shutil
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError
+
+from .embedding_cache import cached_embedding_function
+from .vector_backends import NumpyVectorCollection, OllamaEmbedder
+
+try:
+    import chromadb
+    from chromadb.utils import embedding_functions
+except ImportError:  # only needed for the "chroma" backend
+    chromadb = None
+
+# On-disk vector store for scanned labels. One document per FoodLabelScan with an
+# ingredient list, with id "scan-<pk>" (see label_document_id).
+# backend: "chroma" (chromadb PersistentClient at `path`) or "numpy"
+# (vector_backends.NumpyVectorCollection at `numpy_path`).
+# The index is versioned (petfood_analyzer.models.VectorIndexVersion): each version is
+# one physical collection built with one embedding model and document schema. Processes
+# re-check which version is active every version_check_seconds.
+DEFAULT_VECTOR_STORE = {
+    "backend": "chroma",
+    "path": str(settings.BASE_DIR / "chroma_db"),
+    "collection": "food_label_collection",
+    "numpy_path": str(settings.BASE_DIR / "vector_index"),
+    "nprobe": 8,
+    "validate_on_startup": True,
+    "embedding_model": "nomic-embed-text",
+    "ollama_url": "http://localhost:11434",
+    "version_check_seconds": 30,
+    "auto_reembed": False,       # start the re-embedding job in-process when the active version is stale
+    "gc_grace_seconds": 300,     # keep a retired version this long so other processes can switch first
+}
+
+_active = None  # {"version_id", "collection", "embedding_function", "checked_at"}
+_collection_lock = threading.Lock()
+
+
+def get_vector_store_config():
+    config = dict(DEFAULT_VECTOR_STORE)
+    config.update(getattr(settings, "VECTOR_STORE", {}))
+    return config
+
+
+def _ollama_embedding_function(model_name, url):
+    if chromadb is not None:
+        return embedding_functions.OllamaEmbeddingFunction(model_name=model_name, url=url)
+    return OllamaEmbedder(model_name, url=url)
+
 
 # Embedding function that is compatible with your LLM (e.g., Llama 3)
 # Ollama provides a hostable embedding model like "nomic-embed-text" or "mxbai-embed-large"
 # Make sure your Ollama instance is running with this model.
-ollama_ef = embedding_functions.OllamaEmbeddingFunction(
-    model_name="nomic-embed-text",
-    url="http://localhost:11434"
-)
+EMBEDDING_MODEL = get_vector_store_config()["embedding_model"]
+ollama_ef = _ollama_embedding_function(EMBEDDING_MODEL, get_vector_store_config()["ollama_url"])
+
+
+def get_embedding_function(model_name=None):
+    """
+    Embedding function for model_name (default: the configured model) behind the
+    on-disk embedding cache (see embedding_cache.py).
+    """
+    model_name = model_name or get_vector_store_config()["embedding_model"]
+    if model_name == EMBEDDING_MODEL:
+        embedding_function = ollama_ef
+    else:
+        embedding_function = _ollama_embedding_function(model_name, get_vector_store_config()["ollama_url"])
+    return cached_embedding_function(embedding_function, model_name)
+
+
+def get_chroma_client():
+    """Persistent Chroma client for the configured path."""
+    if chromadb is None:
+        raise RuntimeError("chromadb is not installed; set VECTOR_STORE['backend'] = 'numpy'.")
+    return chromadb.PersistentClient(path=get_vector_store_config()["path"])
+
+
+def current_schema_version():
+    # Imported here: petfood_analyzer.views imports this module.
+    from petfood_analyzer.views import LABEL_DOCUMENT_SCHEMA
+    return LABEL_DOCUMENT_SCHEMA
+
+
+def _numpy_collection_path(config, collection_name):
+    return f"{config['numpy_path']}/{collection_name}"
+
+
+def open_version_collection(version):
+    """(collection, embedding_function) for an index version, embedding with the version's model."""
+    config = get_vector_store_config()
+    embedding_function = get_embedding_function(version.embedding_model)
+    if version.backend == "numpy":
+        collection = NumpyVectorCollection(
+            _numpy_collection_path(config, version.collection_name),
+            embedding_function=embedding_function,
+            nprobe=config["nprobe"],
+        )
+    else:
+        collection = get_chroma_client().get_or_create_collection(
+            name=version.collection_name,
+            embedding_function=embedding_function
+        )
+    return collection, embedding_function
+
+
+def drop_version_collection(version):
+    """Deletes a version's physical collection (the VectorIndexVersion row is left to the caller)."""
+    if version.backend == "numpy":
+        shutil.rmtree(_numpy_collection_path(get_vector_store_config(), version.collection_name), ignore_errors=True)
+    else:
+        try:
+            get_chroma_client().delete_collection(version.collection_name)
+        except Exception:
+            pass  # never created or already gone
+
+
+def probe_dimension(collection):
+    """Dimension of the stored vectors, or None for an empty collection."""
+    if isinstance(collection, NumpyVectorCollection):
+        return collection.dim
+    embeddings = collection.get(limit=1, include=["embeddings"])["embeddings"]
+    return len(embeddings[0]) if embeddings is not None and len(embeddings) else None
+
+
+def active_index_version(config=None):
+    """
+    The active VectorIndexVersion for the configured backend. An index that predates
+    versioning is adopted as the active version, recorded with the configured model.
+    """
+    from petfood_analyzer.models import VectorIndexVersion
+
+    config = config or get_vector_store_config()
+    version = VectorIndexVersion.objects.filter(backend=config["backend"], status="active").first()
+    if version is not None:
+        return version
+    try:
+        version = VectorIndexVersion(
+            backend=config["backend"],
+            collection_name=config["collection"],
+            embedding_model=config["embedding_model"],
+            schema_version=current_schema_version(),
+            status="active",
+        )
+        collection, _ = open_version_collection(version)
+        version.dimension = probe_dimension(collection)
+        version.document_count = collection.count()
+        version.save()
+    except IntegrityError:
+        # Another process adopted it first.
+        version = VectorIndexVersion.objects.get(backend=config["backend"], status="active")
+    return version
+
+
+def is_current_version(version, config=None):
+    """Whether a version was built with the configured embedding model and document schema."""
+    config = config or get_vector_store_config()
+    return (version.embedding_model == config["embedding_model"]
+            and version.schema_version == current_schema_version())
+
+
+def get_food_label_index():
+    """
+    (collection, embedding_function) of the active index version, shared by all threads.
+    Which version is active is re-read every version_check_seconds, so a switch-over by
+    the re-embedding job reaches every process. The first open also checks the index
+    against the database (see validate_food_label_index).
+    """
+    global _active
+    config = get_vector_store_config()
+    active = _active
+    if active is not None and time.monotonic() - active["checked_at"] < config["version_check_seconds"]:
+        return active["collection"], active["embedding_function"]
+
+    with _collection_lock:
+        active = _active
+        if active is not None and time.monotonic() - active["checked_at"] < config["version_check_seconds"]:
+            return active["collection"], active["embedding_function"]
+
+        version = active_index_version(config)
+        if active is not None and active["version_id"] == version.pk:
+            active["checked_at"] = time.monotonic()
+            return active["collection"], active["embedding_function"]
+
+        collection, embedding_function = open_version_collection(version)
+        if active is None and config["validate_on_startup"]:
+            report_food_label_index(validate_food_label_index(collection))
+        elif active is not None:
+            print(f"🔁 Vector index switched to {version}.")
+        _active = {
+            "version_id": version.pk,
+            "collection": collection,
+            "embedding_function": embedding_function,
+            "checked_at": time.monotonic(),
+        }
+
+    if not is_current_version(version, config):
+        print(f"⚠️ Vector index {version} was not built with the configured model "
+              f"'{config['embedding_model']}' / schema {current_schema_version()}. Queries are served "
+              f"from it until 'python manage.py reembed_vector_index' builds and switches to a new version.")
+        if config["auto_reembed"]:
+            from .vector_versions import start_background_reembed
+            start_background_reembed()
+    return collection, embedding_function
+
 
 def get_food_label_collection():
-    client = chromadb.Client()
-    collection = client.get_or_create_collection(
-        name="food_label_collection",
-        embedding_function=ollama_ef
-    )
-    return collection
\ No newline at end of file
+    """The active food label collection (see get_food_label_index)."""
+    return get_food_label_index()[0]
+
+
+def forget_food_label_index():
+    """Makes the next get_food_label_index() re-read the active version."""
+    global _active
+    with _collection_lock:
+        _active = None
+
+
+def reset_food_label_collection():
+    """
+    Empties the active version's collection in place and records the configured model
+    and schema on it. Used by the rebuild_vector_index command; queries see an empty
+    index until the rebuild finishes (reembed_vector_index avoids that).
+    """
+    global _active
+    with _collection_lock:
+        config = get_vector_store_config()
+        version = active_index_version(config)
+        if version.backend == "numpy":
+            if _active is not None and _active["version_id"] == version.pk:
+                collection = _active["collection"]
+            else:
+                collection, _ = open_version_collection(version)
+            collection.reset()
+        else:
+            drop_version_collection(version)
+        version.embedding_model = config["embedding_model"]
+        version.schema_version = current_schema_version()
+        version.dimension = None
+        version.document_count = 0
+        version.last_scan_id = 0
+        version.save()
+        if version.backend == "numpy":
+            embedding_function = get_embedding_function(version.embedding_model)
+            collection.embedding_function = embedding_function
+        else:
+            collection, embedding_function = open_version_collection(version)
+        _active = {
+            "version_id": version.pk,
+            "collection": collection,
+            "embedding_function": embedding_function,
+            "checked_at": time.monotonic(),
+        }
+    return collection
+
+
+def label_document_id(scan_id):
+    return f"scan-{scan_id}"
+
+
+def food_label_index_diff(collection):
+    """
+    (missing, orphaned) document ids: scans with parsed ingredients that have no document,
+    and documents whose scan no longer exists or has no ingredients.
+    """
+    # Imported here: petfood_analyzer imports this module.
+    from petfood_analyzer.models import FoodLabelScan
+
+    expected = {
+        label_document_id(pk)
+        for pk in FoodLabelScan.objects.filter(ingredient_count__gt=0).values_list("id", flat=True)
+    }
+    indexed = set(collection.get(include=[])["ids"])
+    return expected - indexed, indexed - expected, len(expected), len(indexed)
+
+
+def validate_food_label_index(collection):
+    """
+    Compares the document ids in the collection with the FoodLabelScan rows that should
+    be indexed (those with parsed ingredients). Returns counts and sample ids.
+    """
+    missing, orphaned, expected, indexed = food_label_index_diff(collection)
+    return {
+        "expected": expected,
+        "indexed": indexed,
+        "missing": len(missing),
+        "orphaned": len(orphaned),
+        "sample_missing": sorted(missing)[:5],
+        "sample_orphaned": sorted(orphaned)[:5],
+        "ok": not missing and not orphaned,
+    }
+
+
+def report_food_label_index(report):
+    if report["ok"]:
+        print(f"✅ Vector index in sync: {report['indexed']} documents.")
+    else:
+        print(
+            f"⚠️ Vector index out of sync with the database: {report['expected']} scans expected, "
+            f"{report['indexed']} indexed, {report['missing']} missing (e.g. {report['sample_missing']}), "
+            f"{report['orphaned']} orphaned (e.g. {report['sample_orphaned']}). "
+            f"Run 'python manage.py rebuild_vector_index' to fix."
+        )
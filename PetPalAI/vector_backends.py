@@ -0,0 +1,458 @@
+"""
+Retrieval backends for the food label index.
+
+get_food_label_collection() returns an object with the subset of the Chroma
+collection API the app uses (add / upsert / delete / get / query / count).
+Chroma collections provide it natively; NumpyVectorCollection is a
+dependency-light implementation of the same interface:
+
+- vectors: L2-normalized float32 rows in a memory-mapped file, so every worker
+  process shares one copy through the OS page cache;
+- ids, documents and metadata: a small SQLite database next to it, which also
+  serializes writers across processes;
+- search: exact top-k with chunked matrix products, or, once
+  train_clusters() has been run, an inverted-file search that only scores the
+  rows in the nprobe clusters nearest to the query.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+# Cluster-assignment sentinels stored alongside each vector row.
+UNASSIGNED = -1
+DELETED = -2
+
+
+class OllamaEmbedder:
+    """Minimal Ollama embedding function for installs without chromadb."""
+
+    def __init__(self, model_name, url="http://localhost:11434"):
+        from ollama import Client
+        self.model_name = model_name
+        self.url = url
+        self._client = Client(host=url)
+
+    def __call__(self, input):
+        response = self._client.embed(model=self.model_name, input=list(input))
+        return [np.asarray(vector, dtype=np.float32) for vector in response["embeddings"]]
+
+    def get_config(self):
+        return {"url": self.url, "model_name": self.model_name}
+
+
+class VectorBackend:
+    """
+    The collection interface used by the app. Results use Chroma's shapes:
+    query() returns {"ids": [[...]], "documents": [[...]], "metadatas": [[...]],
+    "distances": [[...]]} with one inner list per query.
+    """
+
+    def add(self, ids, documents=None, metadatas=None, embeddings=None):
+        """
+        Inserts new ids; ids that already exist are left unchanged. May return the ids
+        actually stored (Chroma returns None; success is then the absence of an error).
+        """
+        raise NotImplementedError
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def get(self, ids=None, include=("documents", "metadatas")):
+        raise NotImplementedError
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None,
+              include=("documents", "metadatas", "distances")):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _where_sql(where):
+    """Chroma-style metadata filter -> (SQL condition, params). Supports equality, $eq, $ne, $in, $and, $or."""
+    if "$and" in where or "$or" in where:
+        operator = "$and" if "$and" in where else "$or"
+        parts = [_where_sql(clause) for clause in where[operator]]
+        joiner = " AND " if operator == "$and" else " OR "
+        return "(" + joiner.join(sql for sql, _ in parts) + ")", [p for _, params in parts for p in params]
+
+    conditions, params = [], []
+    for key, condition in where.items():
+        column = f"json_extract(metadata, '$.{key}')"
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, value in condition.items():
+            if operator == "$eq":
+                conditions.append(f"{column} = ?")
+                params.append(value)
+            elif operator == "$ne":
+                conditions.append(f"({column} IS NULL OR {column} != ?)")
+                params.append(value)
+            elif operator == "$in":
+                conditions.append(f"{column} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                raise ValueError(f"Unsupported where operator: {operator}")
+    return "(" + " AND ".join(conditions) + ")", params
+
+
+class NumpyVectorCollection(VectorBackend):
+
+    VECTORS_FILE = "vectors.f32"
+    CLUSTERS_FILE = "clusters.i32"
+    CENTROIDS_FILE = "centroids.npy"
+    META_FILE = "meta.sqlite3"
+
+    def __init__(self, path, embedding_function=None, nprobe=8, use_clusters=True, chunk_rows=65536):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.embedding_function = embedding_function
+        self.nprobe = nprobe
+        self.use_clusters = use_clusters
+        self.chunk_rows = chunk_rows
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            os.path.join(path, self.META_FILE), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+            "document TEXT, metadata TEXT)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)")
+
+        self._vectors = None
+        self._clusters = None
+        self._mapped_size = -1
+        self._centroids = None
+        self._centroids_mtime = None
+
+    # --- storage ------------------------------------------------------------------------
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _info(self, key, default=None):
+        row = self._db.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_info(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    @property
+    def dim(self):
+        return self._info("dim")
+
+    def _row_count(self):
+        return self._info("rows", 0)
+
+    def _remap(self):
+        """(Re)opens the memory maps when another process, or this one, has grown the files."""
+        dim = self.dim
+        path = self._file(self.VECTORS_FILE)
+        size = os.path.getsize(path) if dim and os.path.exists(path) else 0
+        if size == self._mapped_size:
+            return
+        capacity = size // (dim * 4) if dim else 0
+        if capacity:
+            self._vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+            self._clusters = np.memmap(self._file(self.CLUSTERS_FILE), dtype=np.int32, mode="r+", shape=(capacity,))
+        else:
+            self._vectors, self._clusters = None, None
+        self._mapped_size = size
+
+    def _ensure_capacity(self, rows, dim):
+        self._remap()
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 1024)
+        with open(self._file(self.VECTORS_FILE), "ab") as f:
+            f.truncate(new_capacity * dim * 4)
+        with open(self._file(self.CLUSTERS_FILE), "ab") as f:
+            f.truncate(new_capacity * 4)
+        self._remap()
+        self._clusters[capacity:] = UNASSIGNED
+
+    def _load_centroids(self):
+        path = self._file(self.CENTROIDS_FILE)
+        if not os.path.exists(path):
+            self._centroids, self._centroids_mtime = None, None
+            return None
+        mtime = os.path.getmtime(path)
+        if mtime != self._centroids_mtime:
+            self._centroids = np.load(path)
+            self._centroids_mtime = mtime
+        return self._centroids
+
+    def _embed(self, texts):
+        if self.embedding_function is None:
+            raise ValueError("No embedding function configured; pass embeddings explicitly.")
+        return self.embedding_function(list(texts))
+
+    # --- writes -------------------------------------------------------------------------
+
+    def _write(self, ids, documents, metadatas, embeddings, replace):
+        ids = [str(i) for i in ids]
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")  # one writer at a time, across processes
+            try:
+                existing = {}
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    existing.update(self._db.execute(
+                        f"SELECT id, row FROM docs WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall())
+
+                todo = [i for i, doc_id in enumerate(ids) if replace or doc_id not in existing]
+                if not todo:
+                    self._db.execute("COMMIT")
+                    return []
+                if embeddings is None:
+                    vectors = _normalize(self._embed([documents[i] for i in todo]))
+                else:
+                    vectors = _normalize([embeddings[i] for i in todo])
+
+                dim = self.dim
+                if dim is None:
+                    dim = vectors.shape[1]
+                    self._set_info("dim", dim)
+                elif vectors.shape[1] != dim:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {dim}.")
+
+                next_row = self._row_count()
+                rows = []
+                for i in todo:
+                    if ids[i] in existing:
+                        rows.append(existing[ids[i]])
+                    else:
+                        rows.append(next_row)
+                        existing[ids[i]] = next_row
+                        next_row += 1
+
+                self._ensure_capacity(next_row, dim)
+                rows = np.asarray(rows, dtype=np.int64)
+                self._vectors[rows] = vectors
+                centroids = self._load_centroids()
+                if centroids is not None:
+                    self._clusters[rows] = np.argmax(vectors @ centroids.T, axis=1)
+                else:
+                    self._clusters[rows] = UNASSIGNED
+                self._vectors.flush()
+                self._clusters.flush()
+
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO docs (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (int(row), ids[i], documents[i], json.dumps(metadatas[i]) if metadatas[i] is not None else None)
+                        for row, i in zip(rows, todo)
+                    ],
+                )
+                self._set_info("rows", next_row)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return [ids[i] for i in todo]
+
+    def add(self, ids, documents=None, metadatas=None, embeddings=None):
+        return self._write(ids, documents, metadatas, embeddings, replace=False)
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        return self._write(ids, documents, metadatas, embeddings, replace=True)
+
+    def delete(self, ids):
+        ids = [str(i) for i in ids]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = [r for (r,) in self._db.execute(
+                    f"SELECT row FROM docs WHERE id IN ({','.join('?' * len(ids))})", ids
+                ).fetchall()] if ids else []
+                if rows:
+                    self._remap()
+                    self._clusters[rows] = DELETED
+                    self._vectors[rows] = 0
+                    self._clusters.flush()
+                    self._db.execute(f"DELETE FROM docs WHERE row IN ({','.join('?' * len(rows))})", rows)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def reset(self):
+        """Deletes every document and the cluster model."""
+        with self._lock:
+            self._vectors, self._clusters, self._mapped_size = None, None, -1
+            for name in (self.VECTORS_FILE, self.CLUSTERS_FILE, self.CENTROIDS_FILE):
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
+            self._centroids, self._centroids_mtime = None, None
+            self._db.execute("DELETE FROM docs")
+            self._db.execute("DELETE FROM info")
+
+    # --- reads --------------------------------------------------------------------------
+
+    def count(self):
+        return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def get(self, ids=None, include=("documents", "metadatas")):
+        if ids is None:
+            rows = self._db.execute("SELECT id, document, metadata FROM docs ORDER BY row").fetchall()
+        else:
+            ids = [str(i) for i in ids]
+            rows = self._db.execute(
+                f"SELECT id, document, metadata FROM docs WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall() if ids else []
+        result = {"ids": [r[0] for r in rows]}
+        if "documents" in include:
+            result["documents"] = [r[1] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(r[2]) if r[2] else None for r in rows]
+        return result
+
+    def _candidate_rows(self, where):
+        if not where:
+            return None
+        sql, params = _where_sql(where)
+        return np.fromiter(
+            (r for (r,) in self._db.execute(f"SELECT row FROM docs WHERE {sql}", params)), dtype=np.int64
+        )
+
+    def _top_k(self, vectors, rows, queries, k):
+        """Best k (rows, scores) per query among `rows` (None = all rows), scored by dot product."""
+        n_queries = queries.shape[0]
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+        total = vectors.shape[0] if rows is None else len(rows)
+
+        for start in range(0, total, self.chunk_rows):
+            if rows is None:
+                chunk_rows = np.arange(start, min(start + self.chunk_rows, total))
+                block = vectors[start:start + self.chunk_rows]
+            else:
+                chunk_rows = rows[start:start + self.chunk_rows]
+                block = vectors[chunk_rows]
+            scores = queries @ block.T                                   # (queries, chunk)
+            scores[:, self._clusters[chunk_rows] == DELETED] = -np.inf
+            take = min(k, scores.shape[1])
+            part = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            best_rows = np.concatenate([best_rows, chunk_rows[part]], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+            if best_rows.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def search(self, query_embeddings, k=10, where=None, exact=False):
+        """[(rows, scores)] per query. Uses the cluster model when trained unless exact=True."""
+        queries = _normalize(query_embeddings)
+        with self._lock:
+            self._remap()
+            n = self._row_count()
+            if self._vectors is None or n == 0:
+                return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+            vectors = self._vectors[:n]
+            candidates = self._candidate_rows(where)
+            centroids = None if exact or not self.use_clusters else self._load_centroids()
+
+            if centroids is None:
+                rows, scores = self._top_k(vectors, candidates, queries, k)
+                results = list(zip(rows, scores))
+            else:
+                assignments = self._clusters[:n]
+                results = []
+                for query in queries:
+                    probe = np.argsort(-(centroids @ query))[:self.nprobe]
+                    mask = np.isin(assignments, probe) | (assignments == UNASSIGNED)
+                    rows = np.flatnonzero(mask)
+                    if candidates is not None:
+                        rows = np.intersect1d(rows, candidates, assume_unique=True)
+                    top_rows, top_scores = self._top_k(vectors, rows, query[None, :], k)
+                    results.append((top_rows[0], top_scores[0]))
+
+        return [(r[np.isfinite(s)], s[np.isfinite(s)]) for r, s in results]
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None,
+              include=("documents", "metadatas", "distances")):
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts)
+        results = self.search(query_embeddings, n_results, where)
+
+        output = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for rows, scores in results:
+            by_row = {}
+            if len(rows):
+                row_list = [int(r) for r in rows]
+                by_row = {
+                    r[0]: r[1:] for r in self._db.execute(
+                        f"SELECT row, id, document, metadata FROM docs WHERE row IN ({','.join('?' * len(row_list))})",
+                        row_list,
+                    )
+                }
+            hits = [(by_row[int(r)], float(s)) for r, s in zip(rows, scores) if int(r) in by_row]
+            output["ids"].append([h[0][0] for h in hits])
+            output["documents"].append([h[0][1] for h in hits])
+            output["metadatas"].append([json.loads(h[0][2]) if h[0][2] else None for h in hits])
+            output["distances"].append([1.0 - score for _, score in hits])  # cosine distance
+        return {key: value for key, value in output.items() if key == "ids" or key in include}
+
+    # --- coarse clustering --------------------------------------------------------------
+
+    def train_clusters(self, nlist=None, iterations=10, sample_size=100000, seed=0):
+        """
+        Spherical k-means over a sample of the stored vectors, then assigns every row
+        to its nearest centroid. nlist defaults to ~sqrt(rows). Returns nlist.
+        """
+        with self._lock:
+            self._remap()
+            n = self._row_count()
+            if not n:
+                return 0
+            vectors = self._vectors[:n]
+            live = np.flatnonzero(self._clusters[:n] != DELETED)
+            nlist = nlist or max(1, int(np.sqrt(len(live))))
+            rng = np.random.default_rng(seed)
+            sample = vectors[np.sort(rng.choice(live, size=min(sample_size, len(live)), replace=False))]
+
+            centroids = sample[rng.choice(len(sample), size=min(nlist, len(sample)), replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                empty = ~np.bincount(labels, minlength=len(centroids)).astype(bool)
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                centroids = _normalize(sums)
+
+            for start in range(0, len(live), self.chunk_rows):
+                rows = live[start:start + self.chunk_rows]
+                self._clusters[rows] = np.argmax(vectors[rows] @ centroids.T, axis=1)
+            self._clusters.flush()
+
+            tmp_path = self._file(self.CENTROIDS_FILE + ".tmp.npy")
+            np.save(tmp_path, centroids.astype(np.float32))
+            os.replace(tmp_path, self._file(self.CENTROIDS_FILE))
+            self._load_centroids()
+            return len(centroids)
@@ -0,0 +1,120 @@
+"""
+Keeping the food label vector index in step with the FoodLabelScan table.
+
+Documents are keyed "scan-<pk>" and written with upsert, so re-running an
+ingestion or retrying a batch overwrites instead of duplicating. Saves and
+deletes reach the index through the post_save/post_delete signals
+(petfood_analyzer/signals.py), queued on the process-wide VectorIngestWriter
+and applied in batches. reconcile_food_label_index() repairs whatever drifted
+anyway (writes lost to a crash, bulk_create/queryset.update which send no
+signals): missing documents, documents whose scan is gone, and documents whose
+text or metadata no longer match the scan.
+"""
+from .utils import food_label_index_diff, get_food_label_index, label_document_id
+
+SCAN_FIELDS = ("id", "parsed_data", "pet_type", "food_type", "user", "ingredient_count")
+
+# Fields that feed the document text or metadata; saves touching only other fields skip the index.
+DOCUMENT_FIELDS = frozenset(("parsed_data", "pet_type", "food_type", "user", "ingredient_count", "product_name"))
+
+
+def is_indexed(scan):
+    """Scans with a parsed ingredient list have a vector document."""
+    return bool(scan.ingredient_count)
+
+
+def scan_document(scan):
+    """(id, document, metadata) of a scan's vector document."""
+    # Imported here: petfood_analyzer.views imports PetPalAI.utils.
+    from petfood_analyzer.views import build_label_document, label_document_metadata
+    return label_document_id(scan.pk), build_label_document(scan.parsed_data), label_document_metadata(scan)
+
+
+def write_scan_documents(collection, embedding_function, scans):
+    """Embeds and upserts the documents of `scans` in one call. Returns the vector dimension (or None)."""
+    if not scans:
+        return None
+    ids, documents, metadatas = zip(*(scan_document(scan) for scan in scans))
+    embeddings = embedding_function(list(documents))
+    collection.upsert(ids=list(ids), documents=list(documents), metadatas=list(metadatas), embeddings=embeddings)
+    return len(embeddings[0])
+
+
+def _scan_id(document_id):
+    return int(document_id.rsplit("-", 1)[-1])
+
+
+def _stale_ids(collection, scans):
+    """Document ids among `scans` whose stored text or metadata differ from the scan's current ones."""
+    if not scans:
+        return []
+    expected = {doc_id: (document, metadata) for doc_id, document, metadata in map(scan_document, scans)}
+    stored = collection.get(ids=list(expected), include=["documents", "metadatas"])
+    stale = []
+    for doc_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+        want_document, want_metadata = expected[doc_id]
+        metadata = metadata or {}
+        if document != want_document or any(metadata.get(k) != v for k, v in want_metadata.items()):
+            stale.append(doc_id)
+    return stale
+
+
+def reconcile_food_label_index(collection=None, embedding_function=None, batch_size=256,
+                               check_content=True, changed_since=None, dry_run=False, log=print):
+    """
+    Finds drift between FoodLabelScan and the index (default: the active version) and,
+    unless dry_run, repairs it: upserts missing and stale documents, deletes orphaned ones.
+    check_content=False compares ids only (no document reads); with changed_since, scans
+    saved at or after that time are counted stale and rewritten without reading them.
+    Returns {"expected", "indexed", "missing", "orphaned", "stale", "repaired"}.
+    """
+    from petfood_analyzer.models import FoodLabelScan
+
+    if collection is None:
+        collection, embedding_function = get_food_label_index()
+    missing, orphaned, expected, indexed = food_label_index_diff(collection)
+
+    stale = []
+    if check_content:
+        queryset = FoodLabelScan.objects.filter(ingredient_count__gt=0).only(*SCAN_FIELDS).order_by("id")
+        batch = []
+        for scan in queryset.iterator(chunk_size=batch_size):
+            if label_document_id(scan.pk) not in missing:
+                batch.append(scan)
+            if len(batch) >= batch_size:
+                stale.extend(_stale_ids(collection, batch))
+                batch = []
+        stale.extend(_stale_ids(collection, batch))
+    elif changed_since is not None:
+        changed = FoodLabelScan.objects.filter(ingredient_count__gt=0, updated_at__gte=changed_since)
+        stale = [
+            doc_id for doc_id in map(label_document_id, changed.values_list("id", flat=True))
+            if doc_id not in missing
+        ]
+
+    report = {
+        "expected": expected,
+        "indexed": indexed,
+        "missing": len(missing),
+        "orphaned": len(orphaned),
+        "stale": len(stale),
+        "repaired": 0,
+    }
+    if dry_run:
+        return report
+
+    to_write = sorted({_scan_id(doc_id) for doc_id in missing} | {_scan_id(doc_id) for doc_id in stale})
+    for i in range(0, len(to_write), batch_size):
+        scans = list(
+            FoodLabelScan.objects.filter(id__in=to_write[i:i + batch_size]).only(*SCAN_FIELDS).order_by("id")
+        )
+        write_scan_documents(collection, embedding_function, scans)
+        report["repaired"] += len(scans)
+        log(f"  upserted {len(scans)} document(s) up to scan {scans[-1].pk if scans else '-'}")
+    orphaned = sorted(orphaned)
+    for i in range(0, len(orphaned), batch_size):
+        collection.delete(ids=orphaned[i:i + batch_size])
+        report["repaired"] += len(orphaned[i:i + batch_size])
+    if orphaned:
+        log(f"  deleted {len(orphaned)} orphaned document(s)")
+    return report
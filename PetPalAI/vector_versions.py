@@ -0,0 +1,222 @@
+"""
+Re-embedding the food label vector index into a new version without downtime.
+
+Each VectorIndexVersion is one physical collection built with one embedding
+model and label document schema. When the configured model or
+views.LABEL_DOCUMENT_SCHEMA changes, reembed_food_label_index():
+
+  1. creates (or resumes) a 'building' version for the new model and schema;
+  2. embeds scans into it in batches, checkpointing the last scan id on the
+     version row, while queries keep being served from the active version;
+  3. catches up: adds scans created meanwhile, re-embeds scans saved since
+     the build started and drops documents whose scan is gone;
+  4. switches over in one transaction (the old version becomes 'retired');
+     other processes follow within VECTOR_STORE['version_check_seconds'];
+  5. after gc_grace_seconds, catches up once more (scans written to the old
+     version during the switch) and deletes retired collections.
+
+Catch-up compares ids, not document contents: edits are found by
+FoodLabelScan.updated_at instead, so queryset.update/bulk_update writes to
+document fields must set updated_at.
+
+Run it with the reembed_vector_index command, or in-process with
+VECTOR_STORE['auto_reembed'].
+"""
+import threading
+import uuid
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .utils import (
+    active_index_version, current_schema_version, drop_version_collection, forget_food_label_index,
+    get_vector_store_config, is_current_version, open_version_collection, probe_dimension,
+)
+from .vector_sync import SCAN_FIELDS, reconcile_food_label_index, write_scan_documents
+
+
+def start_version(config=None, force=False):
+    """
+    The 'building' version for the configured model and schema: resumed if one exists,
+    else created. Builds for other targets are retired (collected later). Returns None
+    when the active version is already current and `force` is not set.
+    """
+    from petfood_analyzer.models import VectorIndexVersion
+
+    config = config or get_vector_store_config()
+    active = active_index_version(config)
+    if is_current_version(active, config) and not force:
+        return None
+
+    with transaction.atomic():
+        building = VectorIndexVersion.objects.select_for_update().filter(
+            backend=config["backend"], status="building"
+        )
+        resumed = None
+        for version in building:
+            if is_current_version(version, config) and resumed is None:
+                resumed = version
+            else:
+                version.status = "retired"
+                version.retired_at = timezone.now()
+                version.save(update_fields=["status", "retired_at", "updated_at"])
+        if resumed is not None:
+            return resumed
+
+        version = VectorIndexVersion.objects.create(
+            backend=config["backend"],
+            collection_name=f"pending-{uuid.uuid4().hex}",
+            embedding_model=config["embedding_model"],
+            schema_version=current_schema_version(),
+            status="building",
+        )
+        version.collection_name = f"{config['collection']}_v{version.pk}"
+        version.save(update_fields=["collection_name"])
+    return version
+
+
+def build_version(version, batch_size=256, stop_event=None, log=print):
+    """Embeds scans above the version's checkpoint in batches. Returns False if stopped early."""
+    from petfood_analyzer.models import FoodLabelScan
+
+    collection, embedding_function = open_version_collection(version)
+    while not (stop_event is not None and stop_event.is_set()):
+        scans = list(
+            FoodLabelScan.objects.filter(ingredient_count__gt=0, id__gt=version.last_scan_id)
+            .only(*SCAN_FIELDS).order_by("id")[:batch_size]
+        )
+        if not scans:
+            return True
+        dimension = write_scan_documents(collection, embedding_function, scans)
+        if version.dimension is None:
+            version.dimension = dimension
+        version.last_scan_id = scans[-1].pk
+        version.document_count += len(scans)
+        version.save(update_fields=["dimension", "last_scan_id", "document_count", "updated_at"])
+        log(f"  {version.collection_name}: embedded up to scan {version.last_scan_id} "
+            f"({version.document_count} documents)")
+    return False
+
+
+def catch_up(version, batch_size=256):
+    """
+    Adds missing scans to a version's collection, re-embeds scans saved since the version
+    was created (their batch may have read the old content) and deletes orphaned documents.
+    Returns (written, deleted).
+    """
+    from petfood_analyzer.scan_sync import get_scan_index_sync_config
+
+    collection, embedding_function = open_version_collection(version)
+    # Less the overlap: a save committed after its batch was read can carry an earlier updated_at.
+    changed_since = version.created_at - timedelta(seconds=get_scan_index_sync_config()["overlap_seconds"])
+    report = reconcile_food_label_index(
+        collection, embedding_function, batch_size, check_content=False, changed_since=changed_since,
+        log=lambda message: None,
+    )
+    version.document_count = collection.count()
+    if version.dimension is None:
+        version.dimension = probe_dimension(collection)
+    version.save(update_fields=["dimension", "document_count", "updated_at"])
+    return report["missing"] + report["stale"], report["orphaned"]
+
+
+def switch_to_version(version):
+    """Makes `version` the active one in one transaction; the previous active version is retired."""
+    from petfood_analyzer.models import VectorIndexVersion
+
+    now = timezone.now()
+    with transaction.atomic():
+        VectorIndexVersion.objects.select_for_update().filter(
+            backend=version.backend, status="active"
+        ).exclude(pk=version.pk).update(status="retired", retired_at=now, updated_at=now)
+        version.status = "active"
+        version.activated_at = now
+        version.save(update_fields=["status", "activated_at", "updated_at"])
+    forget_food_label_index()
+
+
+def collect_garbage(grace_seconds=None, config=None, log=print):
+    """
+    Catches up the active version, then deletes retired versions (collection and row)
+    retired more than grace_seconds ago. Returns the number of versions deleted.
+    """
+    from petfood_analyzer.models import VectorIndexVersion
+
+    config = config or get_vector_store_config()
+    grace_seconds = config["gc_grace_seconds"] if grace_seconds is None else grace_seconds
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    expired = list(VectorIndexVersion.objects.filter(
+        backend=config["backend"], status="retired", retired_at__lte=cutoff
+    ))
+    if not expired:
+        return 0
+
+    written, deleted = catch_up(active_index_version(config))
+    if written or deleted:
+        log(f"  active version caught up: {written} written, {deleted} removed")
+    for version in expired:
+        drop_version_collection(version)
+        version.delete()
+        log(f"  deleted retired version {version.collection_name}")
+    return len(expired)
+
+
+def reembed_food_label_index(batch_size=256, force=False, stop_event=None, wait_for_gc=True, log=print):
+    """
+    Builds, switches to and (after the grace period) garbage-collects a new index version
+    if the active one is stale. Returns the version switched to, or None.
+    """
+    config = get_vector_store_config()
+    version = start_version(config, force=force)
+    if version is None:
+        log("Vector index is up to date.")
+        collect_garbage(config=config, log=log)
+        return None
+
+    log(f"Building {version.collection_name} with {version.embedding_model}, schema {version.schema_version} "
+        f"(resuming after scan {version.last_scan_id}).")
+    if not build_version(version, batch_size, stop_event, log):
+        log("Stopped; the build resumes from its checkpoint on the next run.")
+        return None
+    written, deleted = catch_up(version, batch_size)
+    log(f"  caught up: {written} written, {deleted} removed")
+
+    switch_to_version(version)
+    log(f"✅ Switched to {version.collection_name} ({version.document_count} documents, dim {version.dimension}).")
+
+    if wait_for_gc:
+        grace = config["gc_grace_seconds"]
+        if stop_event is None:
+            stop_event = threading.Event()
+        log(f"Waiting {grace}s for other processes to switch before collecting old versions...")
+        if not stop_event.wait(grace):
+            collect_garbage(config=config, log=log)
+    return version
+
+
+_reembed_thread = None
+_reembed_lock = threading.Lock()
+
+
+def start_background_reembed():
+    """
+    Runs reembed_food_label_index in a daemon thread, once per process. Several processes
+    resume the same building version and upsert the same batches, so this suits single-process
+    deployments; elsewhere run the reembed_vector_index command.
+    """
+    global _reembed_thread
+
+    def run():
+        try:
+            reembed_food_label_index()
+        except Exception as e:
+            print(f"❌ Background re-embedding failed: {e}")
+        finally:
+            connection.close()  # this thread's own connection
+
+    with _reembed_lock:
+        if _reembed_thread is None or not _reembed_thread.is_alive():
+            _reembed_thread = threading.Thread(target=run, name="vector-reembed", daemon=True)
+            _reembed_thread.start()
+    return _reembed_thread
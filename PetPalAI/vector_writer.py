@@ -0,0 +1,204 @@
+"""
+Buffered, batched writes to the food label vector index.
+
+Callers submit upserts (id, document, metadata) or deletes (id) and return
+immediately. Operations are flushed when max_batch of them are waiting, or when
+the oldest has waited max_delay seconds: one embedding call and one upsert()
+for the whole batch, plus one delete(). The latest operation per id wins, so a
+scan saved several times in a row is written once. A flush counts as confirmed
+when the calls return without raising. Upserts and deletes are idempotent, so
+a failed batch is simply retried on the next flush, up to max_attempts.
+
+The process-wide writer (get_vector_writer) runs a background flush thread and
+is flushed at interpreter exit. Bulk jobs can create their own writer with
+max_delay=None and flush explicitly.
+"""
+import atexit
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_VECTOR_INGEST = {
+    "max_batch": 32,
+    "max_delay_seconds": 2.0,
+    "max_attempts": 3,
+}
+
+
+def get_vector_ingest_config():
+    config = dict(DEFAULT_VECTOR_INGEST)
+    config.update(getattr(settings, "VECTOR_INGEST", {}))
+    return config
+
+
+class VectorIngestWriter:
+
+    def __init__(self, collection=None, embedding_function=None, max_batch=32, max_delay=2.0, max_attempts=3):
+        """
+        collection / embedding_function default to the active food label index version and
+        its model's embedding function, looked up on every flush so that a version
+        switch-over is followed. max_delay=None disables the background thread:
+        batches are then flushed when full, or by calling flush().
+        """
+        self._collection = collection
+        self._embedding_function = embedding_function
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+
+        self._buffer = {}          # id -> (document, metadata, attempts); document None = delete
+        self._oldest = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.confirmed = 0
+        self.dropped = 0
+
+    # --- dependencies -------------------------------------------------------------------
+
+    def _target(self):
+        """(collection, embedding_function) to write the next batch to."""
+        from .utils import get_embedding_function, get_food_label_index
+        if self._collection is None:
+            collection, embedding_function = get_food_label_index()
+        else:
+            collection, embedding_function = self._collection, None
+        return collection, self._embedding_function or embedding_function or get_embedding_function()
+
+    # --- submitting ---------------------------------------------------------------------
+
+    def submit(self, doc_id, document, metadata=None):
+        """Queues an upsert of one document."""
+        self._enqueue(doc_id, document, metadata)
+
+    def submit_delete(self, doc_id):
+        """Queues the removal of one document (a no-op if it is not indexed)."""
+        self._enqueue(doc_id, None, None)
+
+    def _enqueue(self, doc_id, document, metadata):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("VectorIngestWriter is closed.")
+            self._buffer[doc_id] = (document, metadata, 0)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._buffer) >= self.max_batch
+            if self.max_delay is not None:
+                self._start_thread()
+                self._cond.notify()
+        if full and self.max_delay is None:
+            self.flush()
+
+    def submit_many(self, items):
+        """items: iterable of (id, document, metadata)."""
+        for doc_id, document, metadata in items:
+            self.submit(doc_id, document, metadata)
+
+    def pending(self):
+        with self._cond:
+            return len(self._buffer)
+
+    # --- flushing -----------------------------------------------------------------------
+
+    def flush(self):
+        """Writes everything buffered as one batch. Returns the number of confirmed operations."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._buffer, self._oldest = self._buffer, {}, None
+            if not batch:
+                return 0
+
+            ids = [i for i, entry in batch.items() if entry[0] is not None]
+            deletes = [i for i, entry in batch.items() if entry[0] is None]
+            try:
+                collection, embedding_function = self._target()
+                if ids:
+                    documents = [batch[i][0] for i in ids]
+                    collection.upsert(
+                        ids=ids, documents=documents, metadatas=[batch[i][1] for i in ids],
+                        embeddings=embedding_function(documents),
+                    )
+                if deletes:
+                    collection.delete(ids=deletes)
+            except Exception as e:
+                self._requeue(batch, e)
+                return 0
+
+            print(f"✅ Vector database updated in one batch: {len(ids)} upserted, {len(deletes)} deleted.")
+            self.confirmed += len(batch)
+            return len(batch)
+
+    def _requeue(self, batch, error):
+        retry = {i: (doc, meta, attempts + 1) for i, (doc, meta, attempts) in batch.items()
+                 if attempts + 1 < self.max_attempts}
+        dropped = len(batch) - len(retry)
+        self.dropped += dropped
+        print(f"❌ Vector database update failed for {len(batch)} document(s): {error}. "
+              f"Retrying {len(retry)}, dropping {dropped}.")
+        with self._cond:
+            for doc_id, entry in retry.items():
+                self._buffer.setdefault(doc_id, entry)  # a newer submit of the same id wins
+            if self._buffer and self._oldest is None:
+                self._oldest = time.monotonic()
+
+    def _due(self):
+        if not self._buffer:
+            return False
+        return (len(self._buffer) >= self.max_batch
+                or time.monotonic() - self._oldest >= self.max_delay)
+
+    def _start_thread(self):
+        # Caller holds self._cond.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="vector-ingest-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    timeout = None
+                    if self._buffer:
+                        timeout = max(0.0, self.max_delay - (time.monotonic() - self._oldest))
+                    self._cond.wait(timeout)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):
+        """Stops the background thread and flushes what is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=30)
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_vector_writer():
+    """Process-wide writer used by the web path; flushed at interpreter exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            config = get_vector_ingest_config()
+            _writer = VectorIngestWriter(
+                max_batch=config["max_batch"],
+                max_delay=config["max_delay_seconds"],
+                max_attempts=config["max_attempts"],
+            )
+            atexit.register(_writer.close)
+    return _writer
@@ -1,5 +1,10 @@
+import json
+
 from django.contrib import admin
-from .models import AgentCase
+from django.utils.html import format_html
+
+from .archive import PAYLOAD_FIELDS, decompress_payload
+from .models import AgentCase, ArchivedAgentCase, ToolInvocation
 # Register your models here.
 
 @admin.register(AgentCase)
@@ -10,3 +15,41 @@ class AgentCaseAdmin(admin.ModelAdmin):
     readonly_fields = ('case_id', 'created_at', 'updated_at')
 
 
+@admin.register(ArchivedAgentCase)
+class ArchivedAgentCaseAdmin(admin.ModelAdmin):
+    """Read-only view of archived cases; the compressed payload is shown decoded."""
+    list_display = ('case_id', 'username', 'status', 'created_at', 'updated_at', 'archived_at', 'payload_size')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('case_id', 'username', 'topic')
+    exclude = ('payload',)
+    readonly_fields = ('case_id', 'user', 'username', 'status', 'topic', 'resolved_by', 'created_at',
+                       'updated_at', 'closed_at', 'archived_at', 'payload_size', 'archived_content')
+
+    @admin.display(description="Archived content")
+    def archived_content(self, obj):
+        data = decompress_payload(obj.payload)
+        return format_html(
+            '<pre style="white-space: pre-wrap">{}</pre>',
+            json.dumps({field: data.get(field) for field in PAYLOAD_FIELDS}, indent=2, ensure_ascii=False),
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ToolInvocation)
+class ToolInvocationAdmin(admin.ModelAdmin):
+    """Append-only: rows are written by the orchestrator at the end of each turn."""
+    list_display = ('intent', 'case_ref', 'success', 'latency_ms', 'llm_calls', 'prompt_tokens',
+                    'completion_tokens', 'context_tokens', 'created_at')
+    list_filter = ('intent', 'success', 'created_at')
+    search_fields = ('case_ref', 'intent', 'params_hash', 'error')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
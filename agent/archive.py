@@ -0,0 +1,128 @@
+# agent/archive.py
+"""
+Moves resolved and inactive AgentCase rows into ArchivedAgentCase.
+
+Every chat session creates a case, and the JSON and text columns grow with
+each message, so the hot table is kept to live conversations: resolved cases
+are archived after `resolved_after_days`, any other case untouched for
+`inactive_after_days` (abandoned anonymous sessions) after that. Open cases
+with pending intents are kept however old they are: they are what
+AgentOrchestrator.resume_pending_tasks() picks up when the user logs in. Archival runs in keyset-ordered batches, one transaction each:
+insert the compressed copies, then delete the originals.
+"""
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AgentCase, ArchivedAgentCase
+
+DEFAULT_AGENT_CASE_ARCHIVE = {
+    "resolved_after_days": 7,
+    "inactive_after_days": 30,
+    "batch_size": 500,
+}
+
+PAYLOAD_FIELDS = (
+    "internal_notes", "customer_notes", "parsed_intents", "pending_intents",
+    "orchestrator_state", "ai_conversation_history",
+)
+
+
+def get_agent_case_archive_config():
+    config = dict(DEFAULT_AGENT_CASE_ARCHIVE)
+    config.update(getattr(settings, "AGENT_CASE_ARCHIVE", {}))
+    return config
+
+
+def compress_payload(data):
+    """dict -> (zlib-compressed JSON bytes, uncompressed size)."""
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, 6), len(raw)
+
+
+def decompress_payload(payload):
+    return json.loads(zlib.decompress(bytes(payload)).decode("utf-8")) if payload else {}
+
+
+def archivable_cases(config=None, now=None):
+    """
+    Cases due for archival: resolved ones past resolved_after_days, any past
+    inactive_after_days except open cases waiting to resume their pending intents.
+    """
+    config = config or get_agent_case_archive_config()
+    now = now or timezone.now()
+    resolved_cutoff = now - timedelta(days=config["resolved_after_days"])
+    inactive_cutoff = now - timedelta(days=config["inactive_after_days"])
+    return AgentCase.objects.filter(
+        Q(status="resolved", updated_at__lt=resolved_cutoff)
+        | (Q(updated_at__lt=inactive_cutoff) & ~Q(status="open", pending_intents__isnull=False))
+    )
+
+
+def _archived_copy(case):
+    payload, size = compress_payload({field: getattr(case, field) for field in PAYLOAD_FIELDS})
+    return ArchivedAgentCase(
+        case_id=case.case_id,
+        user_id=case.user_id,
+        username=case.user.username if case.user_id else "",
+        status=case.status,
+        topic=case.topic,
+        resolved_by=case.resolved_by,
+        created_at=case.created_at,
+        updated_at=case.updated_at,
+        closed_at=case.closed_at,
+        payload=payload,
+        payload_size=size,
+    )
+
+
+def archive_cases(queryset=None, batch_size=None, dry_run=False, log=print):
+    """
+    Archives the cases in `queryset` (default: archivable_cases()). Returns
+    (cases archived, uncompressed bytes, compressed bytes).
+    """
+    config = get_agent_case_archive_config()
+    queryset = archivable_cases(config) if queryset is None else queryset
+    batch_size = batch_size or config["batch_size"]
+    if dry_run:
+        return queryset.count(), 0, 0
+
+    archived = raw_bytes = stored_bytes = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).select_related("user").order_by("pk")[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        with transaction.atomic():
+            # An archived row with the same case_id is either this case's copy (created_at and user
+            # match) or an older case whose id was reused; the latter stays in the hot table.
+            existing = {
+                row["case_id"]: row for row in ArchivedAgentCase.objects.filter(
+                    case_id__in=[case.case_id for case in batch]
+                ).values("case_id", "created_at", "user_id")
+            }
+            copies, done, clashes = [], [], []
+            for case in batch:
+                row = existing.get(case.case_id)
+                if row is None:
+                    copies.append(_archived_copy(case))
+                    done.append(case.pk)
+                elif row["created_at"] == case.created_at and row["user_id"] == case.user_id:
+                    done.append(case.pk)
+                else:
+                    clashes.append(case.case_id)
+            ArchivedAgentCase.objects.bulk_create(copies)
+            AgentCase.objects.filter(pk__in=done).delete()
+        if clashes:
+            log(f"  skipped {len(clashes)} case(s) whose case_id is already archived: {', '.join(clashes)}")
+        archived += len(done)
+        raw_bytes += sum(copy.payload_size for copy in copies)
+        stored_bytes += sum(len(copy.payload) for copy in copies)
+        log(f"  archived {archived} case(s) (up to id {last_pk})")
+    return archived, raw_bytes, stored_bytes
@@ -1,10 +1,41 @@
 # agent/llm_parser.py
 import json
 import re
+import threading
+from contextlib import contextmanager
+
 import ollama # Make sure you have 'ollama' installed: pip install ollama
 from ollama import Client
 ollama_client = Client(host='http://localhost:11434', timeout=120)
 
+# Token counts of the LLM calls made inside track_llm_usage() on this thread.
+_usage = threading.local()
+
+
+@contextmanager
+def track_llm_usage():
+    """Collects {"calls", "prompt_tokens", "completion_tokens"} of the chat calls made in the block."""
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    previous = getattr(_usage, "current", None)
+    _usage.current = usage
+    try:
+        yield usage
+    finally:
+        _usage.current = previous
+        if previous is not None:
+            for key, value in usage.items():
+                previous[key] += value
+
+
+def _record_usage(response):
+    usage = getattr(_usage, "current", None)
+    if usage is None:
+        return
+    usage["calls"] += 1
+    # Ollama reports prompt_eval_count / eval_count; either may be missing (e.g. a fully cached prompt).
+    usage["prompt_tokens"] += getattr(response, "prompt_eval_count", None) or 0
+    usage["completion_tokens"] += getattr(response, "eval_count", None) or 0
+
 
 def extract_json_block(text):
     """Extract JSON block from the LLM output using regex."""
@@ -85,6 +116,7 @@ User message: {message}
             ],
             options={'temperature': 0.2}
         )
+        _record_usage(response)
 
         raw = response['message']['content'].strip()
         #print("🧪 LLM raw output:\n", raw)
@@ -107,6 +139,7 @@ def llm_one_shot(messages):
         messages=messages,
         options={'temperature': 0.2}
     )
+    _record_usage(response)
 
     return response['message']['content'].strip()
 
@@ -0,0 +1,37 @@
+# agent/management/commands/archive_agent_cases.py
+from django.core.management.base import BaseCommand
+
+from agent.archive import archivable_cases, archive_cases, get_agent_case_archive_config
+from agent.models import AgentCase
+
+
+class Command(BaseCommand):
+    help = ("Moves resolved cases older than AGENT_CASE_ARCHIVE['resolved_after_days'] and any case "
+            "inactive for 'inactive_after_days' from AgentCase into the compressed ArchivedAgentCase "
+            "table. Archived cases stay viewable in the admin.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resolved-after-days', type=int, help="Override the settings value.")
+        parser.add_argument('--inactive-after-days', type=int, help="Override the settings value.")
+        parser.add_argument('--batch-size', type=int, help="Cases per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the cases that would move.")
+
+    def handle(self, *args, **options):
+        config = get_agent_case_archive_config()
+        for key in ('resolved_after_days', 'inactive_after_days'):
+            if options[key] is not None:
+                config[key] = options[key]
+
+        before = AgentCase.objects.count()
+        queryset = archivable_cases(config)
+        archived, raw_bytes, stored_bytes = archive_cases(
+            queryset, batch_size=options['batch_size'], dry_run=options['dry_run'], log=self.stdout.write
+        )
+        if options['dry_run']:
+            self.stdout.write(f"{archived} of {before} cases would be archived.")
+            return
+
+        ratio = f", payload {raw_bytes / 1e3:.0f} kB -> {stored_bytes / 1e3:.0f} kB" if archived else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} case(s){ratio}. {AgentCase.objects.count()} case(s) remain in the hot table."
+        ))
@@ -0,0 +1,149 @@
+# agent/management/commands/benchmark_sqlite_writes.py
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+
+from agent.models import AgentCase
+
+ENGINES = {
+    'stock': 'django.db.backends.sqlite3',
+    'tuned': 'PetPalAI.sqlite_backend',
+}
+
+
+def _configure(alias, engine, path):
+    """Registers a scratch database under `alias` with the AgentCase table (and its user) in it."""
+    connections.settings[alias] = {
+        **connections.settings['default'],
+        'ENGINE': ENGINES[engine],
+        'NAME': path,
+        'OPTIONS': {},
+    }
+    with connections[alias].schema_editor() as editor:
+        editor.create_model(User)
+        editor.create_model(AgentCase)
+
+
+def _seed(alias, workers):
+    user = User.objects.using(alias).create(username='bench')
+    case_ids = []
+    for i in range(workers):
+        case = AgentCase(user=user, topic=f"bench {i}")
+        case.save(using=alias)
+        case_ids.append(case.pk)
+    return case_ids
+
+
+def _handle_message(alias, case_id, n):
+    """The write pattern of AgentOrchestrator.handle_message: read the case, then several saves."""
+    with transaction.atomic(using=alias):
+        case = AgentCase.objects.using(alias).get(pk=case_id)
+        history = (case.ai_conversation_history or [])[-20:]
+        case.ai_conversation_history = history + [{"role": "user", "content": f"message {n}"}]
+        case.save(using=alias)
+        case.parsed_intents = [{"intent": "food_query", "params": {"query": f"message {n}"}}]
+        case.save(using=alias)
+        case.internal_notes = f"- handled message {n}"
+        case.save(using=alias)
+    return 3
+
+
+def _worker(alias, case_id, deadline, results):
+    ok = writes = errors = 0
+    latencies = []
+    n = 0
+    while time.monotonic() < deadline:
+        n += 1
+        start = time.perf_counter()
+        try:
+            writes += _handle_message(alias, case_id, n)
+            ok += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+        except DatabaseError:
+            errors += 1
+    connections[alias].close()
+    results.append((ok, writes, errors, latencies))
+
+
+def _process_worker(alias, case_id, deadline, queue):
+    connections.close_all()  # connections inherited through fork must not be shared
+    results = []
+    _worker(alias, case_id, deadline, results)
+    queue.put(results[0])
+
+
+class Command(BaseCommand):
+    help = ("Concurrency benchmark for SQLite writes: N workers each replay the AgentCase writes of "
+            "a chat message (read the case, save it three times in one transaction) for a fixed time, "
+            "against Django's stock backend and the tuned production backend (PetPalAI/sqlite_backend). "
+            "Reports sustained messages and writes per second, 'database is locked' failures and latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,4,8,16', help="Comma-separated worker counts.")
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run.")
+        parser.add_argument('--engines', default='stock,tuned', help="Comma-separated subset of: stock, tuned.")
+        parser.add_argument('--processes', action='store_true',
+                            help="Run workers as separate processes (like gunicorn workers) instead of threads.")
+
+    def handle(self, *args, **options):
+        engines = [e.strip() for e in options['engines'].split(',') if e.strip()]
+        unknown = set(engines) - set(ENGINES)
+        if unknown:
+            raise CommandError(f"Unknown engine(s): {', '.join(sorted(unknown))}")
+        worker_counts = [int(n) for n in options['workers'].split(',')]
+        kind = 'processes' if options['processes'] else 'threads'
+
+        workdir = tempfile.mkdtemp(prefix='sqlite-bench-')
+        try:
+            self.stdout.write(f"{options['seconds']:.0f}s per run, workers as {kind}")
+            self.stdout.write(f"{'engine':<8}{'workers':>8}{'msgs/s':>10}{'writes/s':>10}{'errors':>8}"
+                              f"{'p50 ms':>9}{'p95 ms':>9}")
+            for engine in engines:
+                for workers in worker_counts:
+                    alias = f"bench_{engine}_{workers}"
+                    _configure(alias, engine, os.path.join(workdir, f"{alias}.sqlite3"))
+                    case_ids = _seed(alias, workers)
+                    connections[alias].close()
+                    self._row(engine, workers, options['seconds'],
+                              self._run(alias, case_ids, options['seconds'], options['processes']))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _run(self, alias, case_ids, seconds, processes):
+        deadline = time.monotonic() + seconds
+        if processes:
+            queue = multiprocessing.get_context('fork').Queue()
+            workers = [multiprocessing.get_context('fork').Process(
+                target=_process_worker, args=(alias, case_id, deadline, queue)) for case_id in case_ids]
+            for worker in workers:
+                worker.start()
+            results = [queue.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            return results
+
+        results = []
+        threads = [threading.Thread(target=_worker, args=(alias, case_id, deadline, results))
+                   for case_id in case_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _row(self, engine, workers, seconds, results):
+        ok = sum(r[0] for r in results)
+        writes = sum(r[1] for r in results)
+        errors = sum(r[2] for r in results)
+        latencies = sorted(latency for r in results for latency in r[3])
+        p50 = latencies[len(latencies) // 2] if latencies else float('nan')
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else float('nan')
+        self.stdout.write(f"{engine:<8}{workers:>8}{ok / seconds:>10.1f}{writes / seconds:>10.1f}{errors:>8}"
+                          f"{p50:>9.2f}{p95:>9.2f}")
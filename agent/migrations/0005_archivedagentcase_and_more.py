@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('agent', '0004_remove_toolcall_case_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAgentCase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_id', models.CharField(max_length=50, unique=True)),
+                ('username', models.CharField(blank=True, help_text='Username at archival time.', max_length=150)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('in_progress', 'In Progress'), ('resolved', 'Resolved'), ('escalated', 'Escalated')], max_length=20)),
+                ('topic', models.CharField(blank=True, max_length=100)),
+                ('resolved_by', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('payload', models.BinaryField(help_text='zlib-compressed JSON of internal_notes, customer_notes, parsed_intents, pending_intents, orchestrator_state and ai_conversation_history.')),
+                ('payload_size', models.PositiveIntegerField(default=0, help_text='Uncompressed payload size in bytes.')),
+            ],
+            options={
+                'verbose_name': 'Archived Agent Case',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='agentcase',
+            index=models.Index(condition=models.Q(('pending_intents__isnull', False), ('status', 'open')), fields=['user', '-updated_at'], name='agentcase_user_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agentcase',
+            index=models.Index(fields=['status', 'updated_at'], name='agentcase_status_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedagentcase',
+            name='user',
+            field=models.ForeignKey(blank=True, help_text="The case's user (kept null if the user is deleted later).", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_agent_cases', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedagentcase',
+            index=models.Index(fields=['user', '-updated_at'], name='archivedcase_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0005_archivedagentcase_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ToolInvocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_ref', models.CharField(db_index=True, help_text='case_id, kept after archival.', max_length=50)),
+                ('intent', models.CharField(max_length=50)),
+                ('params_hash', models.CharField(help_text='SHA-256 of the intent params as canonical JSON.', max_length=64)),
+                ('success', models.BooleanField()),
+                ('latency_ms', models.FloatField(help_text='Wall time of the tool call, including LLM calls.')),
+                ('error', models.TextField(blank=True)),
+                ('llm_calls', models.PositiveIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0, help_text='Prompt tokens evaluated by the LLM.')),
+                ('completion_tokens', models.PositiveIntegerField(default=0, help_text='Tokens generated by the LLM.')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('case', models.ForeignKey(blank=True, help_text='The case, while it is in the hot table (null once archived).', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tool_invocations', to='agent.agentcase')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['intent', 'created_at', 'success', 'latency_ms'], name='toolinv_intent_stats_idx'), models.Index(fields=['created_at'], name='toolinv_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0006_toolinvocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='toolinvocation',
+            name='context_tokens',
+            field=models.PositiveIntegerField(blank=True, help_text='Estimated tokens of label context in the prompt (food_query only).', null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 import uuid
 # Create your models here.
@@ -28,10 +29,102 @@ class AgentCase(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.case_id:
-            self.case_id = f"{self.user.username.upper()}-{uuid.uuid4().hex[:6].upper()}"
+            self.case_id = self._new_case_id()
         super().save(*args, **kwargs)
 
+    def _new_case_id(self):
+        # Archived cases leave the hot table's unique index, so ids are checked against both tables.
+        prefix = self.user.username.upper()[:30]
+        while True:
+            case_id = f"{prefix}-{uuid.uuid4().hex[:12].upper()}"
+            if not (AgentCase.objects.filter(case_id=case_id).exists()
+                    or ArchivedAgentCase.objects.filter(case_id=case_id).exists()):
+                return case_id
+
     def __str__(self):
         return f"{self.case_id} ({self.status})"
 
+    class Meta:
+        indexes = [
+            # resume_pending_tasks: the user's latest open case with pending intents.
+            models.Index(
+                fields=['user', '-updated_at'],
+                condition=models.Q(status='open', pending_intents__isnull=False),
+                name='agentcase_user_pending_idx',
+            ),
+            # archive_agent_cases: resolved/inactive cases by age.
+            models.Index(fields=['status', 'updated_at'], name='agentcase_status_updated_idx'),
+        ]
+
+
+class ToolInvocation(models.Model):
+    """
+    One tool execution by the agent orchestrator (append-only). Written with
+    bulk_create at the end of each turn; see agent/telemetry.py for the
+    per-intent latency and failure-rate queries it is indexed for.
+    """
+    case = models.ForeignKey(
+        AgentCase, on_delete=models.SET_NULL, null=True, blank=True, related_name='tool_invocations',
+        help_text="The case, while it is in the hot table (null once archived)."
+    )
+    case_ref = models.CharField(max_length=50, db_index=True, help_text="case_id, kept after archival.")
+    intent = models.CharField(max_length=50)
+    params_hash = models.CharField(max_length=64, help_text="SHA-256 of the intent params as canonical JSON.")
+    success = models.BooleanField()
+    latency_ms = models.FloatField(help_text="Wall time of the tool call, including LLM calls.")
+    error = models.TextField(blank=True)
+    llm_calls = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveIntegerField(default=0, help_text="Prompt tokens evaluated by the LLM.")
+    completion_tokens = models.PositiveIntegerField(default=0, help_text="Tokens generated by the LLM.")
+    context_tokens = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Estimated tokens of label context in the prompt (food_query only)."
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.intent} on {self.case_ref} ({'ok' if self.success else 'failed'}, {self.latency_ms:.0f} ms)"
+
+    class Meta:
+        indexes = [
+            # Covers per-intent latency/failure-rate queries over a time window (index-only).
+            models.Index(fields=['intent', 'created_at', 'success', 'latency_ms'], name='toolinv_intent_stats_idx'),
+            models.Index(fields=['created_at'], name='toolinv_created_idx'),
+        ]
+
+
+class ArchivedAgentCase(models.Model):
+    """
+    A resolved or inactive AgentCase moved out of the hot table by the
+    archive_agent_cases command. The small columns stay queryable; the notes,
+    intents, state and conversation history are stored as one zlib-compressed
+    JSON blob (see agent/archive.py).
+    """
+    case_id = models.CharField(max_length=50, unique=True)
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_agent_cases',
+        help_text="The case's user (kept null if the user is deleted later)."
+    )
+    username = models.CharField(max_length=150, blank=True, help_text="Username at archival time.")
+    status = models.CharField(max_length=20, choices=AgentCase.STATUS_CHOICES)
+    topic = models.CharField(max_length=100, blank=True)
+    resolved_by = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    closed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    payload = models.BinaryField(
+        help_text="zlib-compressed JSON of internal_notes, customer_notes, parsed_intents, "
+                  "pending_intents, orchestrator_state and ai_conversation_history."
+    )
+    payload_size = models.PositiveIntegerField(default=0, help_text="Uncompressed payload size in bytes.")
+
+    def __str__(self):
+        return f"{self.case_id} ({self.status}, archived)"
+
+    class Meta:
+        verbose_name = "Archived Agent Case"
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='archivedcase_user_updated_idx'),
+        ]
+
 
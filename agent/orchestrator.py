@@ -1,6 +1,7 @@
 # PetPalAI/agent/orchestrator.py
 
 import json
+import logging
 from django.contrib.auth.models import User
 from django.db import transaction
 from django.utils.timezone import now
@@ -10,11 +11,15 @@ from datetime import datetime
 from .llm_parser import try_llm_parser, llm_one_shot
 from .rule_parser import fallback_regex_parser
 from .models import AgentCase
+from .telemetry import records_tool_invocations, tool_invocation
 
 # Import business logic "tools"
 from pet_manager.utils import create_pet_via_agent
 from user_profile.utils import register_user_via_agent
-from PetPalAI.utils import get_food_label_collection
+from petfood_analyzer.rag_context import assemble_context
+from petfood_analyzer.retrieval import search_food_labels_for_user
+
+logger = logging.getLogger(__name__)
 
 class PetSlots:
     def __init__(self, name=None, species=None, breed=None, gender=None, weight_lbs=None, birth_date=None):
@@ -45,6 +50,7 @@ class AgentOrchestrator:
     def __init__(self, request, user):
         self.request = request
         self.user = user
+        self.tool_invocations = []  # ToolInvocation rows of the current turn (see telemetry.py)
         # Get or create an active case for the session
         self.case = self._get_or_create_active_case()
 
@@ -114,33 +120,40 @@ class AgentOrchestrator:
             return "🤔 Sorry, I didn’t understand that.", f"Unknown intent: {intent}"
 
         try:
-            # Execute the tool
-            if intent == "register_user":
-                result, new_user = tool_func(params.get("name"), params.get("email"))
-                if new_user and self.case.user.username == "guest":
-                    self.case.user = new_user
-                    self.case.save(update_fields=['user'])
-
-            # Add a specific check for "food_query" if its handler has a different signature
-            elif intent == "food_query":
-                result = tool_func(params.get('query'))
-                print("food query tool func result - ", result)
-                internal_log = result["log"]
-            else:
-                result = tool_func(self.user, params)
-
-            if result["success"]:
-                internal_log = f"✅ Executed `{intent}` with `{params}` successfully."
-            else:
-                internal_log = f" Unable to process `{intent}` with `{params}`."
-
-            return result , internal_log
+            with tool_invocation(self.tool_invocations, self.case, intent, params) as invocation:
+                # Execute the tool
+                if intent == "register_user":
+                    result, new_user = tool_func(params.get("name"), params.get("email"))
+                    if new_user and self.case.user.username == "guest":
+                        self.case.user = new_user
+                        self.case.save(update_fields=['user'])
+
+                # Add a specific check for "food_query" if its handler has a different signature
+                elif intent == "food_query":
+                    result = tool_func(params.get('query'), self.user)
+                    print("food query tool func result - ", result)
+                    internal_log = result["log"]
+                    invocation.context_tokens = result.get("context_tokens")
+                else:
+                    result = tool_func(self.user, params)
+
+                if result["success"]:
+                    invocation.success = True
+                    internal_log = f"✅ Executed `{intent}` with `{params}` successfully."
+                    if intent == "food_query":
+                        internal_log += f" {result['log']}"
+                else:
+                    invocation.error = str(result.get("message", ""))
+                    internal_log = f" Unable to process `{intent}` with `{params}`."
+
+                return result , internal_log
 
         except Exception as e:
             # Re-raise the exception to allow the atomic block to fail
             # this is crucial for the transaction to be rolled back.
             raise e
 
+    @records_tool_invocations
     @transaction.atomic
     def handle_message(self, message):
         """Main orchestration method for a single user message."""
@@ -206,20 +219,22 @@ class AgentOrchestrator:
                 result, internal_log = self._execute_intent(intent_data.get("intent"), intent_data.get("params", {}))
                 reply = result["message"]
                 replies.append(reply)
-                self.case.internal_notes += f"\n- {internal_log}"
+                # Outcome, latency and tokens are recorded as a ToolInvocation (see telemetry.py).
+                logger.info("%s: %s", self.case.case_id, internal_log)
                 self.case.customer_notes += f"\n- {reply}"
             except Exception as e:
                 # Catch the exception, add a user-friendly message, and then break
                 # The outer transaction.atomic block will handle the rollback.
                 deferred_intents.append(intent_data)
                 replies.append(f"❌ Failed to complete your request. Please try again or rephrase.")
-                self.case.internal_notes += f"\n- ❌ Transaction failed due to an unhandled error: {e}"
+                # Tool errors are also on their ToolInvocation row; this covers the rest of the turn.
+                logger.exception("%s: intent %s failed", self.case.case_id, intent_data.get("intent"))
                 break
 
         # 3. Handle deferred intents
         if deferred_intents:
             self.case.pending_intents = deferred_intents
-            self.case.internal_notes += "\n- 💾 Saved deferred intents."
+            logger.info("%s: saved %d deferred intent(s)", self.case.case_id, len(deferred_intents))
             replies.append("\n🔐 Please [log in](/login/) to complete the remaining tasks.")
         else:
             self.case.status = "resolved"
@@ -233,6 +248,7 @@ class AgentOrchestrator:
 
         return {"reply": reply_text}
 
+    @records_tool_invocations
     @transaction.atomic
     def resume_pending_tasks(self):
         """Method to resume pending tasks for a logged-in user."""
@@ -267,7 +283,7 @@ class AgentOrchestrator:
             result, internal_log = self._execute_intent(intent, params)
             reply = result["message"]
             replies.append(reply)
-            self.case.internal_notes += f"\n- 🔁 Resumed: {internal_log}"
+            logger.info("%s: resumed: %s", self.case.case_id, internal_log)
             self.case.customer_notes += f"\n- {reply}"
 
         # Clear the pending intents after successful execution
@@ -281,7 +297,7 @@ class AgentOrchestrator:
         return {"history":history,
                 "reply": reply_text}
 
-    def _handle_food_query(self, user_query):
+    def _handle_food_query(self, user_query, user=None):
         """Performs a RAG search on the vector database and generates a response."""
         if not user_query:
             return {"success": False,
@@ -289,15 +305,14 @@ class AgentOrchestrator:
                 "log": "No query provided for food_query intent."
                 }
 
-        # 1. Retrieval: Query the vector database
-        collection = get_food_label_collection()
-        results = collection.query(
-            query_texts=[user_query],
-            n_results=5  # Get the top 5 most relevant documents
-        )
+        # 1. Retrieval: BM25 + vector search fused with RRF, limited to the species of the
+        #    user's pets and any filters named in the question; an exact product name
+        #    short-circuits to that product's label (see petfood_analyzer/retrieval.py)
+        results = search_food_labels_for_user(user_query, user, k=5)  # Get the top 5 most relevant documents
 
-        # 2. Format the retrieved context for the LLM
-        retrieved_docs = results['documents'][0]
+        # 2. Format the retrieved context for the LLM: near-duplicates removed, fields the
+        #    question doesn't need trimmed, packed into settings.RAG_CONTEXT['max_tokens']
+        retrieved_docs = [result["document"] for result in results]
         #print("retrieved_docs ", retrieved_docs)
         if not retrieved_docs:
             return {"success": True,
@@ -305,7 +320,12 @@ class AgentOrchestrator:
                 "log": f"No documents found in vector DB for user query - {user_query}."
                 }
 
-        retrieved_context = "\n---\n".join(retrieved_docs)
+        context = assemble_context(user_query, retrieved_docs)
+        retrieved_context = context["context"]
+        context_log = (f"Context: {context['tokens']}/{context['budget']} tokens, "
+                       f"{context['passages']} label(s), {context['duplicates']} near-duplicate(s) dropped"
+                       f"{', truncated' if context['truncated'] else ''}.")
+        print(context_log)
 
         # 3. Generation: Use the LLM to generate a final answer
         prompt = f"""
@@ -326,7 +346,8 @@ class AgentOrchestrator:
 
         return {"success": True,
                 "message": llm_response,
-                "log": "RAG-powered analysis completed."
+                "log": f"RAG-powered analysis completed. {context_log}",
+                "context_tokens": context["tokens"],
                 }
 
     def _handle_follow_up(self, message, last_question):
@@ -350,7 +371,12 @@ class AgentOrchestrator:
             return {"reply": question}
 
         # All slots are filled, so execute the tool
-        result = create_pet_via_agent(self.user, updated_slots.as_dict())
+        pet_params = updated_slots.as_dict()
+        with tool_invocation(self.tool_invocations, self.case, "create_pet", pet_params) as invocation:
+            result = create_pet_via_agent(self.user, pet_params)
+            invocation.success = bool(result.get("success"))
+            if not invocation.success:
+                invocation.error = str(result.get("message", ""))
         self._clear_state()
         self._add_to_conversation_history("agent", result["message"])
         return {"reply": result["message"]}
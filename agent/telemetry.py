@@ -0,0 +1,95 @@
+# agent/telemetry.py
+"""
+Tool-invocation telemetry for the agent orchestrator.
+
+Each tool call becomes one ToolInvocation row (intent, params hash, success,
+latency, error, LLM tokens, and for food queries the label-context tokens).
+The orchestrator buffers the rows of a turn and writes them with one
+bulk_create when the turn ends, after its transaction, so failed turns are
+recorded too.
+"""
+import functools
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db.models import Avg, Count, Max, Q, Sum
+
+from .llm_parser import track_llm_usage
+from .models import ToolInvocation
+
+logger = logging.getLogger(__name__)
+
+
+def params_hash(params):
+    canonical = json.dumps(params or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def tool_invocation(buffer, case, intent, params):
+    """
+    Times the block and appends a ToolInvocation to `buffer`. The block sets
+    `.success` on the yielded record (default False); an exception marks it failed.
+    """
+    record = ToolInvocation(
+        case=case, case_ref=case.case_id if case else "", intent=(intent or "")[:50],
+        params_hash=params_hash(params), success=False,
+    )
+    start = time.perf_counter()
+    with track_llm_usage() as usage:
+        try:
+            yield record
+        except Exception as e:
+            record.success = False
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.latency_ms = (time.perf_counter() - start) * 1000
+            record.llm_calls = usage["calls"]
+            record.prompt_tokens = usage["prompt_tokens"]
+            record.completion_tokens = usage["completion_tokens"]
+            buffer.append(record)
+
+
+def records_tool_invocations(method):
+    """
+    Orchestrator entry points: start an empty buffer for the turn and bulk_create it
+    when the turn ends. Apply outside @transaction.atomic so a rolled-back turn's
+    failures are still written.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.tool_invocations = []
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if self.tool_invocations:
+                try:
+                    ToolInvocation.objects.bulk_create(self.tool_invocations)
+                except Exception:
+                    # Telemetry must never break a reply.
+                    logger.exception("Failed to record %d tool invocation(s)", len(self.tool_invocations))
+            self.tool_invocations = []
+    return wrapper
+
+
+def intent_stats(since=None):
+    """Per-intent call count, failure rate, latency and token use, optionally since a datetime."""
+    queryset = ToolInvocation.objects.all()
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    rows = list(queryset.values("intent").annotate(
+        calls=Count("id"),
+        failures=Count("id", filter=Q(success=False)),
+        avg_latency_ms=Avg("latency_ms"),
+        max_latency_ms=Max("latency_ms"),
+        prompt_tokens=Sum("prompt_tokens"),
+        completion_tokens=Sum("completion_tokens"),
+        avg_context_tokens=Avg("context_tokens"),
+    ).order_by("intent"))
+    for row in rows:
+        row["failure_rate"] = row["failures"] / row["calls"] if row["calls"] else 0.0
+    return rows
@@ -1,3 +1,85 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
+
+from .archive import archivable_cases, archive_cases, decompress_payload
+from .models import AgentCase, ArchivedAgentCase, ToolInvocation
+from .telemetry import intent_stats, records_tool_invocations, tool_invocation
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='x')
+
+    def case(self, days_old, **fields):
+        case = AgentCase.objects.create(user=self.user, internal_notes='', **fields)
+        AgentCase.objects.filter(pk=case.pk).update(updated_at=timezone.now() - timedelta(days=days_old))
+        return case
+
+    def test_archivable_cases(self):
+        resolved = self.case(10, status='resolved')
+        abandoned = self.case(40)
+        self.case(3, status='resolved')
+        self.case(40, pending_intents=[{'intent': 'create_pet', 'params': {}}])
+        self.case(20)
+        self.assertEqual(sorted(archivable_cases().values_list('pk', flat=True)), [resolved.pk, abandoned.pk])
+
+    def test_archives_and_compresses(self):
+        case = self.case(10, status='resolved', customer_notes='- Added Rex')
+        archived, _, _ = archive_cases(log=lambda message: None)
+        self.assertEqual(archived, 1)
+        self.assertFalse(AgentCase.objects.filter(pk=case.pk).exists())
+        copy = ArchivedAgentCase.objects.get(case_id=case.case_id)
+        self.assertEqual((copy.username, copy.status), ('owner', 'resolved'))
+        self.assertEqual(decompress_payload(copy.payload)['customer_notes'], '- Added Rex')
+
+    def test_reused_case_id_stays_in_the_hot_table(self):
+        case = self.case(10, status='resolved')
+        ArchivedAgentCase.objects.create(
+            case_id=case.case_id, status='resolved',
+            created_at=case.created_at - timedelta(days=100), updated_at=case.created_at - timedelta(days=90),
+        )
+        messages = []
+        archived, _, _ = archive_cases(log=messages.append)
+        self.assertEqual(archived, 0)
+        self.assertTrue(AgentCase.objects.filter(pk=case.pk).exists())
+        self.assertIn(case.case_id, messages[0])
+
+
+class Turn:
+    def __init__(self, case):
+        self.case = case
+
+    @records_tool_invocations
+    @transaction.atomic
+    def run(self, fail):
+        with tool_invocation(self.tool_invocations, self.case, 'food_query', {'query': 'grain free'}) as call:
+            if fail:
+                raise ValueError('vector store down')
+            call.success = True
+
+
+class TelemetryTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', password='x')
+        self.case = AgentCase.objects.create(user=user, internal_notes='')
+
+    def test_failed_turn_is_still_recorded(self):
+        Turn(self.case).run(fail=False)
+        with self.assertRaises(ValueError):
+            Turn(self.case).run(fail=True)
+
+        rows = ToolInvocation.objects.order_by('id')
+        self.assertEqual([(row.success, row.error) for row in rows],
+                         [(True, ''), (False, 'ValueError: vector store down')])
+        self.assertEqual({row.case_ref for row in rows}, {self.case.case_id})
+        self.assertEqual(rows[0].params_hash, rows[1].params_hash)
 
-# Create your tests here.
+        [stats] = intent_stats()
+        self.assertEqual((stats['intent'], stats['calls'], stats['failures']), ('food_query', 2, 1))
+        self.assertEqual(stats['failure_rate'], 0.5)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PetManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pet_manager'
+
+    def ready(self):
+        from . import signals  # noqa: F401
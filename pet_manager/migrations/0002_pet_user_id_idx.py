@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['user', 'id'], name='pet_user_id_idx'),
+        ),
+    ]
@@ -34,6 +34,12 @@ class Pet(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's pets (pet_manager.utils.pets_page).
+            models.Index(fields=['user', 'id'], name='pet_user_id_idx'),
+        ]
+
     def age(self):
         from datetime import date
         if self.birth_date:
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from PetPalAI.page_cache import MY_PETS, invalidate_user_pages
+from .models import Pet
+
+
+@receiver(post_init, sender=Pet)
+def remember_pet_owner(sender, instance, **kwargs):
+    # A pet moved to another user must also leave the previous owner's cached list.
+    instance._loaded_user_id = instance.user_id
+
+
+@receiver(post_save, sender=Pet)
+def invalidate_pet_list_on_save(sender, instance, **kwargs):
+    invalidate_user_pages([instance.user_id, instance._loaded_user_id], pages=(MY_PETS,))
+    instance._loaded_user_id = instance.user_id
+
+
+@receiver(post_delete, sender=Pet)
+def invalidate_pet_list_on_delete(sender, instance, **kwargs):
+    invalidate_user_pages([instance.user_id, instance._loaded_user_id], pages=(MY_PETS,))
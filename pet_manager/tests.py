@@ -1,3 +1,136 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PetPalAI.page_cache import MY_PETS, PROFILE_FORM, get_or_render, user_page_key
+from .models import Pet
+
+
+@override_settings(USER_PAGE_CACHE={'enabled': False})
+class PetsApiTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('shelter', password='x')
+        self.other = User.objects.create_user('breeder', password='x')
+        self.client.force_login(self.user)
+        self.url = reverse('pets_api')
+
+    def post(self, rows):
+        return self.client.post(self.url, json.dumps({'pets': rows}), content_type='application/json')
+
+    def test_creates_and_updates_in_one_request(self):
+        pet = Pet.objects.create(user=self.user, name='Rex', species='dog')
+        response = self.post([
+            {'id': pet.id, 'name': 'Rexy', 'weight_lbs': '41.5'},
+            {'name': 'Milo', 'species': 'Cat', 'birth_date': '2021-04-01'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['updated'], [pet.id])
+        self.assertEqual(len(body['created']), 1)
+
+        pet.refresh_from_db()
+        self.assertEqual((pet.name, str(pet.weight_lbs), pet.species), ('Rexy', '41.50', 'dog'))
+        milo = Pet.objects.get(id=body['created'][0])
+        self.assertEqual((milo.user, milo.species, str(milo.birth_date)), (self.user, 'cat', '2021-04-01'))
+
+    def test_rejects_another_users_pet(self):
+        theirs = Pet.objects.create(user=self.other, name='Bella', species='dog')
+        response = self.post([{'id': theirs.id, 'name': 'Mine now'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [{'index': 0, 'id': theirs.id, 'errors': {'id': ['No such pet.']}}])
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.name, 'Bella')
+
+    def test_rejects_duplicate_ids(self):
+        pet = Pet.objects.create(user=self.user, name='Rex', species='dog')
+        response = self.post([{'id': pet.id, 'name': 'A'}, {'id': pet.id, 'name': 'B'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([(e['index'], e['errors']) for e in response.json()['errors']],
+                         [(1, {'id': ['Duplicate id in this request.']})])
+        pet.refresh_from_db()
+        self.assertEqual(pet.name, 'Rex')
+
+    def test_one_invalid_row_saves_nothing(self):
+        pet = Pet.objects.create(user=self.user, name='Rex', species='dog')
+        response = self.post([
+            {'name': 'Milo', 'species': 'cat'},
+            {'id': pet.id, 'name': 'Renamed'},
+            {'name': 'Nemo', 'species': 'fish'},
+            {'name': 'Kiwi', 'species': 'bird', 'nickname': 'x'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual([(e['index'], sorted(e['errors'])) for e in errors], [(2, ['species']), (3, ['nickname'])])
+        self.assertEqual(list(Pet.objects.filter(user=self.user).values_list('name', flat=True)), ['Rex'])
+
+    def test_invalid_body(self):
+        response = self.client.post(self.url, b'\xff\xfe', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pages_cover_every_pet_once(self):
+        Pet.objects.bulk_create([Pet(user=self.user, name=f'Pet {i}', species='dog') for i in range(7)])
+        Pet.objects.create(user=self.other, name='Not mine', species='cat')
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+            body = self.client.get(self.url, params).json()
+            seen.extend(row['id'] for row in body['results'])
+            pages += 1
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+
+        expected = list(Pet.objects.filter(user=self.user).order_by('id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'abc'}).status_code, 400)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pages'}},
+    USER_PAGE_CACHE={'enabled': True, 'alias': 'default'},
+)
+class UserPageCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.user = User.objects.create_user('shelter', password='x')
+        self.other = User.objects.create_user('breeder', password='x')
+        for user in (self.user, self.other):
+            for page in (MY_PETS, PROFILE_FORM):
+                get_or_render(user.id, page, lambda: 'html')
+
+    def cached(self, user, page):
+        return self.cache.get(user_page_key(user.id, page)) is not None
+
+    def test_pet_save_drops_the_owners_list_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Pet.objects.create(user=self.user, name='Rex', species='dog')
+        self.assertTrue(self.cached(self.user, MY_PETS))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.cached(self.user, MY_PETS))
+        self.assertTrue(self.cached(self.user, PROFILE_FORM))
+        self.assertTrue(self.cached(self.other, MY_PETS))
+
+    def test_moved_pet_drops_both_owners_lists(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pet = Pet.objects.create(user=self.user, name='Rex', species='dog')
+        get_or_render(self.user.id, MY_PETS, lambda: 'html')
+        with self.captureOnCommitCallbacks(execute=True):
+            pet.user = self.other
+            pet.save()
+        self.assertFalse(self.cached(self.user, MY_PETS))
+        self.assertFalse(self.cached(self.other, MY_PETS))
+
+    def test_login_keeps_the_cached_pages(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.user)
+        self.assertTrue(self.cached(self.user, MY_PETS))
+        self.assertTrue(self.cached(self.user, PROFILE_FORM))
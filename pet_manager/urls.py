@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import my_pets
+from .views import my_pets, pets_api
 
 urlpatterns = [
     path('my-pets/', my_pets, name='my_pets'),
+    path('api/pets/', pets_api, name='pets_api'),
 ]
\ No newline at end of file
@@ -2,6 +2,11 @@ from datetime import datetime
 
 from .models import Pet
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from PetPalAI.page_cache import MY_PETS, invalidate_user_pages
 
 def create_pet_via_agent(user: User, pet_data: dict) -> str:
     """
@@ -46,3 +51,105 @@ def create_pet_via_agent(user: User, pet_data: dict) -> str:
         "success": True,
         "message": f"🦴 Added pet {pet.name} ({pet.species}) for {user.username}."
     }
+
+
+# --- JSON API (pet_manager.views.pets_api) ---------------------------------------------------
+
+PET_API_FIELDS = ('name', 'species', 'breed', 'gender', 'birth_date', 'weight_lbs', 'color',
+                  'microchip_id', 'license_number', 'notes')
+MAX_BULK_PETS = 500
+
+
+def _apply_row(pet, row):
+    """Sets the row's fields on `pet` and validates it. Returns {field: [messages]} (empty when valid)."""
+    unknown = sorted(set(row) - set(PET_API_FIELDS) - {'id'})
+    if unknown:
+        return {field: ["Unknown field."] for field in unknown}
+    for field in PET_API_FIELDS:
+        if field not in row:
+            continue
+        value = row[field]
+        if field in ('species', 'gender') and isinstance(value, str):
+            value = value.strip().lower()
+        elif value is None and field not in ('birth_date', 'weight_lbs'):
+            value = ''
+        setattr(pet, field, value)
+    try:
+        # Also converts strings ("2021-04-01", "12.5") to the field types.
+        pet.full_clean(exclude=['user'])
+    except ValidationError as e:
+        return e.message_dict
+    return {}
+
+
+def bulk_save_pets(user: User, rows: list) -> dict:
+    """
+    Creates (rows without "id") and updates (rows with the "id" of one of the user's pets)
+    in one transaction, with one bulk_create and one bulk_update. Every row is validated
+    first; if any fails nothing is written.
+    Returns {"success", "created": [ids], "updated": [ids], "errors": [{"index", "id", "errors"}]}.
+    """
+    result = {"success": False, "created": [], "updated": [], "errors": []}
+    if len(rows) > MAX_BULK_PETS:
+        result["errors"].append({"index": None, "id": None,
+                                 "errors": {"pets": [f"At most {MAX_BULK_PETS} pets per request."]}})
+        return result
+
+    with transaction.atomic():
+        update_ids = [row.get('id') for row in rows if isinstance(row, dict) and row.get('id') is not None]
+        existing = Pet.objects.select_for_update().filter(user=user).in_bulk(
+            [pet_id for pet_id in update_ids if isinstance(pet_id, int)]
+        ) if update_ids else {}
+
+        to_create, to_update, update_fields, seen = [], [], set(), set()
+        for index, row in enumerate(rows):
+            pet_id = row.get('id') if isinstance(row, dict) else None
+            if not isinstance(row, dict):
+                errors = {"row": ["Expected an object."]}
+            elif pet_id is None:
+                pet = Pet(user=user)
+                errors = _apply_row(pet, row)
+                to_create.append(pet)
+            elif pet_id in seen:
+                errors = {"id": ["Duplicate id in this request."]}
+            elif pet_id not in existing:
+                errors = {"id": ["No such pet."]}
+            else:
+                seen.add(pet_id)
+                pet = existing[pet_id]
+                errors = _apply_row(pet, row)
+                to_update.append(pet)
+                update_fields.update(field for field in row if field != 'id')
+            if errors:
+                result["errors"].append({"index": index, "id": pet_id, "errors": errors})
+
+        if result["errors"]:
+            return result
+
+        Pet.objects.bulk_create(to_create)
+        if to_update:
+            # bulk_update skips auto_now.
+            now = timezone.now()
+            for pet in to_update:
+                pet.updated_at = now
+            Pet.objects.bulk_update(to_update, sorted(update_fields | {'updated_at'}))
+        # Neither sends signals, so the cached pet list is dropped here (on commit).
+        invalidate_user_pages([user.pk], pages=(MY_PETS,))
+
+    result.update(success=True, created=[pet.pk for pet in to_create], updated=[pet.pk for pet in to_update])
+    return result
+
+
+def pets_page(user: User, after=None, limit=50) -> dict:
+    """
+    One page of the user's pets ordered by id, keyset-paginated: the next page starts after
+    the last id returned, so each page is one index range scan on (user, id) whatever its depth.
+    Returns {"results": [...], "next_cursor": last id or None}.
+    """
+    queryset = Pet.objects.filter(user=user)
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    rows = list(queryset.order_by('id').values('id', *PET_API_FIELDS, 'created_at', 'updated_at')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {"results": rows, "next_cursor": rows[-1]['id'] if has_more else None}
@@ -1,9 +1,54 @@
+import json
+
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+
+from PetPalAI.page_cache import MY_PETS, get_or_render
 from .models import Pet
+from .utils import bulk_save_pets, pets_page
 
 @login_required
 def my_pets(request):
-    pets = Pet.objects.filter(user=request.user)
-    return render(request, 'pet_manager/my_pets.html', {'pets': pets})
+    # The page has no per-request state (no CSRF token), so it is cached whole per user.
+    def render_page():
+        pets = Pet.objects.filter(user=request.user)
+        return render_to_string('pet_manager/my_pets.html', {'pets': pets}, request=request)
+
+    return HttpResponse(get_or_render(request.user.pk, MY_PETS, render_page))
+
+
+@login_required
+def pets_api(request):
+    """
+    JSON API for the user's pets.
+
+    GET: one page of pets ordered by id.
+      cursor  "next_cursor" of the previous page (omit for the first page)
+      limit   pets per page (default 50, max 500)
+    POST: {"pets": [{...}, ...]} creates rows without "id" and updates rows with one, all in
+      one transaction. Fields: name, species, breed, gender, birth_date (YYYY-MM-DD),
+      weight_lbs, color, microchip_id, license_number, notes. If any row is invalid nothing
+      is saved and the response lists each row's errors (status 400).
+    """
+    if request.method == 'GET':
+        try:
+            cursor = request.GET.get('cursor')
+            cursor = int(cursor) if cursor else None
+            limit = min(max(int(request.GET.get('limit', 50)), 1), 500)
+        except ValueError:
+            return JsonResponse({"error": "cursor and limit must be integers."}, status=400)
+        return JsonResponse(pets_page(request.user, after=cursor, limit=limit))
+
+    if request.method != 'POST':
+        return JsonResponse({"error": "Invalid method"}, status=405)
+
+    try:
+        rows = json.loads(request.body).get('pets')
+    except (ValueError, AttributeError):  # JSONDecodeError and UnicodeDecodeError are ValueErrors
+        return JsonResponse({"error": "Invalid JSON payload."}, status=400)
+    if not isinstance(rows, list):
+        return JsonResponse({"error": "Expected {\"pets\": [...]}."}, status=400)
 
+    result = bulk_save_pets(request.user, rows)
+    return JsonResponse(result, status=200 if result["success"] else 400)
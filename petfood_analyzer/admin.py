@@ -1,8 +1,51 @@
-from django.contrib import admin
-from .models import FoodLabelScan
+from django.contrib import admin, messages
+from .analysis_cache import purge_expired
+from .models import AnalysisCacheEntry, FoodLabelScan, LabelResultCache, VectorIndexVersion
 
 # Register your models here.
 @admin.register(FoodLabelScan)
 class FoodLabelScanAdmin(admin.ModelAdmin):
-    list_display = ('product_name', 'food_type', 'scanned_at', 'user') # Customize as you like
-    # Add search_fields, list_filter etc. as discussed previously for convenience
\ No newline at end of file
+    list_display = ('product_name', 'food_type', 'scanned_at', 'user', 'protein_percent', 'fat_percent',
+                    'fiber_percent', 'moisture_percent', 'ingredient_count') # Customize as you like
+    list_filter = ('pet_type', 'food_type')
+    search_fields = ('product_name',)
+
+
+@admin.register(LabelResultCache)
+class LabelResultCacheAdmin(admin.ModelAdmin):
+    list_display = ('image_hash', 'analysis_version', 'hit_count', 'created_at', 'last_hit_at')
+    list_filter = ('analysis_version',)
+    search_fields = ('image_hash',)
+    readonly_fields = ('created_at', 'last_hit_at', 'hit_count')
+
+
+@admin.register(AnalysisCacheEntry)
+class AnalysisCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('cache_key', 'pet_type', 'food_type', 'analysis_version', 'hit_count', 'created_at', 'last_used_at')
+    list_filter = ('pet_type', 'food_type', 'analysis_version')
+    search_fields = ('cache_key', 'ai_analysis')
+    readonly_fields = ('cache_key', 'created_at', 'last_used_at', 'hit_count')
+    actions = ['purge_selected', 'purge_expired_entries', 'purge_all']
+
+    @admin.action(description="Purge selected cache entries")
+    def purge_selected(self, request, queryset):
+        deleted, _ = queryset.delete()
+        self.message_user(request, f"Purged {deleted} cache entries.", messages.SUCCESS)
+
+    @admin.action(description="Purge expired cache entries (ignores selection)")
+    def purge_expired_entries(self, request, queryset):
+        deleted = purge_expired()
+        self.message_user(request, f"Purged {deleted} expired cache entries.", messages.SUCCESS)
+
+    @admin.action(description="Purge the entire AI analysis cache (ignores selection)")
+    def purge_all(self, request, queryset):
+        deleted, _ = AnalysisCacheEntry.objects.all().delete()
+        self.message_user(request, f"Purged {deleted} cache entries.", messages.SUCCESS)
+
+
+@admin.register(VectorIndexVersion)
+class VectorIndexVersionAdmin(admin.ModelAdmin):
+    list_display = ('collection_name', 'backend', 'status', 'embedding_model', 'dimension', 'schema_version',
+                    'document_count', 'last_scan_id', 'activated_at', 'retired_at')
+    list_filter = ('backend', 'status', 'embedding_model')
+    readonly_fields = ('created_at', 'updated_at', 'activated_at', 'retired_at')
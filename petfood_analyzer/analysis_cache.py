@@ -0,0 +1,130 @@
+# petfood_analyzer/analysis_cache.py
+"""
+Cache of AI pros/cons keyed on normalized nutrition data.
+
+The key is a SHA-256 over the canonical form of the analysis-relevant part of
+parsed_data (product name, guaranteed analysis, ingredients), the pet type,
+the food type, and the prompt version/model/options that produced the text.
+Small OCR differences between photos of the same bag (case, spacing,
+punctuation, "26.0%" vs "26%") therefore map to the same entry.
+"""
+import hashlib
+import json
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AnalysisCacheEntry
+
+DEFAULT_ANALYSIS_CACHE = {
+    "enabled": True,
+    "max_entries": 5000,
+    "ttl_seconds": 30 * 24 * 3600,
+}
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_NON_WORD_RE = re.compile(r"[^\w%/.]+")
+
+
+def get_analysis_cache_config():
+    config = dict(DEFAULT_ANALYSIS_CACHE)
+    config.update(getattr(settings, "AI_ANALYSIS_CACHE", {}))
+    return config
+
+
+def _normalize_text(value):
+    return _NON_WORD_RE.sub(" ", str(value or "").lower()).strip(" .")
+
+
+def _normalize_amount(value):
+    """'26.0%' -> '26%', '400 mg/kg' -> '400 mg/kg'."""
+    text = _normalize_text(value)
+    return _NUMBER_RE.sub(lambda m: f"{float(m.group()):g}", text).replace(" %", "%")
+
+
+def canonical_analysis_payload(parsed_data):
+    """
+    The part of parsed_data the pros/cons depend on, normalized so that
+    equivalent labels produce identical payloads. This is also what is sent
+    to the LLM, so the cache key fully determines the prompt.
+    """
+    parsed_data = parsed_data or {}
+    analysis = parsed_data.get("guaranteed_analysis") or {}
+    return {
+        "product_name": _normalize_text(parsed_data.get("product_name")) or None,
+        "guaranteed_analysis": {k: _normalize_amount(v) for k, v in sorted(analysis.items())},
+        "ingredients": [i for i in (_normalize_text(i) for i in parsed_data.get("ingredients") or []) if i],
+    }
+
+
+def analysis_cache_key(payload, pet_type, food_type, analysis_version, options):
+    key = {
+        "payload": payload,
+        "pet_type": (pet_type or "").lower(),
+        "food_type": (food_type or "").upper(),
+        "version": analysis_version,
+        "options": options,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_cached_analysis(cache_key):
+    """Returns the cached analysis text, or None on a miss or an expired entry."""
+    config = get_analysis_cache_config()
+    if not config["enabled"]:
+        return None
+
+    fresh_after = timezone.now() - timedelta(seconds=config["ttl_seconds"])
+    entry = AnalysisCacheEntry.objects.filter(cache_key=cache_key, created_at__gte=fresh_after).first()
+    if not entry:
+        return None
+
+    AnalysisCacheEntry.objects.filter(pk=entry.pk).update(
+        hit_count=F("hit_count") + 1, last_used_at=timezone.now()
+    )
+    return entry.ai_analysis
+
+
+def store_analysis(cache_key, ai_analysis, pet_type, food_type, analysis_version):
+    config = get_analysis_cache_config()
+    if not config["enabled"]:
+        return None
+
+    entry, _ = AnalysisCacheEntry.objects.update_or_create(
+        cache_key=cache_key,
+        defaults={
+            "ai_analysis": ai_analysis,
+            "pet_type": pet_type or "",
+            "food_type": food_type or "",
+            "analysis_version": analysis_version,
+            "created_at": timezone.now(),
+            "last_used_at": timezone.now(),
+        },
+    )
+    evict(config)
+    return entry
+
+
+def purge_expired(config=None):
+    """Deletes entries older than the TTL. Returns the number deleted."""
+    config = config or get_analysis_cache_config()
+    cutoff = timezone.now() - timedelta(seconds=config["ttl_seconds"])
+    deleted, _ = AnalysisCacheEntry.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def evict(config=None):
+    """Applies TTL expiry, then trims the cache to max_entries, least recently used first."""
+    config = config or get_analysis_cache_config()
+    deleted = purge_expired(config)
+
+    overflow = AnalysisCacheEntry.objects.count() - config["max_entries"]
+    if overflow > 0:
+        stale_ids = list(
+            AnalysisCacheEntry.objects.order_by("last_used_at").values_list("id", flat=True)[:overflow]
+        )
+        deleted += AnalysisCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+    return deleted
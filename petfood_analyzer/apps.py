@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PetfoodAnalyzerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'petfood_analyzer'
+
+    def ready(self):
+        from . import signals  # noqa: F401
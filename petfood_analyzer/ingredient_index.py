@@ -0,0 +1,144 @@
+# petfood_analyzer/ingredient_index.py
+"""
+Inverted index from canonical ingredient id to FoodLabelScan ids.
+
+Each postings list is a sorted NumPy int64 array, so a query like
+"chicken_meal AND NOT corn" is an intersection/difference of sorted arrays
+instead of deserializing every scan's parsed_data. Like the nutrient matrix,
+the index is built once per process, synced with scans saved or deleted in
+any process on each refresh (scan_sync.py), and kept current in between by
+the FoodLabelScan save/delete signals.
+"""
+import threading
+
+import numpy as np
+
+from .ingredients import canonical_ingredient_ids, canonicalize_ingredient, in_ingredient_family
+from .scan_sync import ScanSync
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _scan_ingredient_ids(scan):
+    return canonical_ingredient_ids((scan.parsed_data or {}).get("ingredients"))
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}       # canonical id -> sorted np.int64 array of scan ids
+        self.scan_terms = {}     # scan id -> tuple of canonical ids (for updates/deletes)
+        self.sync = ScanSync(("id", "parsed_data"))
+
+    # --- maintenance --------------------------------------------------------------------
+
+    def _add_scans(self, scans):
+        pending = {}
+        for scan in scans:
+            terms = tuple(_scan_ingredient_ids(scan))
+            self.scan_terms[scan.id] = terms
+            for term in terms:
+                pending.setdefault(term, []).append(scan.id)
+
+        for term, ids in pending.items():
+            existing = self.postings.get(term, _EMPTY)
+            self.postings[term] = np.union1d(existing, np.asarray(ids, dtype=np.int64))
+
+    def _drop_scans(self, scan_ids):
+        removed = {}
+        for scan_id in scan_ids:
+            for term in self.scan_terms.pop(scan_id, ()):
+                removed.setdefault(term, []).append(scan_id)
+        for term, ids in removed.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings = np.setdiff1d(postings, np.asarray(ids, dtype=np.int64), assume_unique=True)
+            if len(postings):
+                self.postings[term] = postings
+            else:
+                del self.postings[term]
+
+    def refresh(self, batch_size=2000):
+        """Indexes scans saved or deleted (in any process) since the last refresh."""
+        with self._lock:
+            self.sync.refresh(self, batch_size)
+
+    def upsert(self, scan):
+        """Re-indexes one scan. Called from post_save."""
+        with self._lock:
+            self.sync.replace(self, [scan])
+
+    def remove(self, scan_id):
+        with self._lock:
+            self.sync.drop(self, [scan_id])
+
+    # --- queries ------------------------------------------------------------------------
+
+    def query(self, include=(), exclude=(), any_of=()):
+        """
+        Scan ids containing every ingredient in `include`, at least one of
+        `any_of` (if given), and none of `exclude`. Terms may be raw spellings;
+        they are canonicalized first. An exclusion covers the ingredient's whole
+        family ("corn" also drops corn_gluten_meal, corn_starch...), since excluding
+        an ingredient usually means avoiding it in any form. Returns a sorted np.int64 array.
+        """
+        include = [t for t in (canonicalize_ingredient(t) for t in include) if t]
+        exclude = [t for t in (canonicalize_ingredient(t) for t in exclude) if t]
+        any_of = [t for t in (canonicalize_ingredient(t) for t in any_of) if t]
+
+        with self._lock:
+            if include:
+                # Intersect smallest-first so the working set only shrinks.
+                lists = sorted((self.postings.get(t, _EMPTY) for t in include), key=len)
+                result = lists[0]
+                for postings in lists[1:]:
+                    if not len(result):
+                        break
+                    result = np.intersect1d(result, postings, assume_unique=True)
+            else:
+                result = np.fromiter(sorted(self.scan_terms), dtype=np.int64, count=len(self.scan_terms))
+
+            if any_of:
+                union = _EMPTY
+                for term in any_of:
+                    union = np.union1d(union, self.postings.get(term, _EMPTY))
+                result = np.intersect1d(result, union, assume_unique=True)
+
+            if exclude:
+                excluded = [
+                    term for term in self.postings
+                    if any(in_ingredient_family(term, family) for family in exclude)
+                ]
+                for term in excluded:
+                    if not len(result):
+                        break
+                    result = np.setdiff1d(result, self.postings[term], assume_unique=True)
+
+        return result
+
+    def document_frequencies(self, limit=50):
+        """Most common canonical ingredients as [(id, scan count), ...]."""
+        with self._lock:
+            counts = [(term, len(postings)) for term, postings in self.postings.items()]
+        return sorted(counts, key=lambda item: (-item[1], item[0]))[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_ingredient_index():
+    """Process-wide index, built lazily and synced with the table on every call."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IngredientIndex()
+    _index.refresh()
+    return _index
+
+
+def loaded_ingredient_index():
+    """The index if this process has already built it, else None (used by signal handlers)."""
+    return _index
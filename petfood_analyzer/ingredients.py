@@ -0,0 +1,171 @@
+# petfood_analyzer/ingredients.py
+"""
+Ingredient canonicalization.
+
+Maps the many ways an ingredient shows up on OCR'd labels ("Chicken Meal",
+"chicken-meal", "Chlcken Meal", "Dehydrated Chicken") to one canonical id
+("chicken_meal"). Unknown ingredients still get a stable id: their
+normalized spelling with spaces replaced by underscores.
+
+Ids made of the same words form families: "corn_gluten_meal" and
+"ground_whole_grain_corn" are both in the "corn" family (see
+in_ingredient_family), so excluding corn excludes its derivatives too.
+
+The dictionary can be extended without code changes through
+settings.INGREDIENT_SYNONYMS ({canonical_id: [spelling, ...]}).
+"""
+import re
+from difflib import get_close_matches
+from functools import lru_cache
+
+from django.conf import settings
+
+# canonical id -> spellings/synonyms (already normalized: lowercase, single spaces)
+DEFAULT_INGREDIENT_SYNONYMS = {
+    "chicken": ["chicken", "deboned chicken", "fresh chicken", "chicken meat"],
+    "chicken_meal": ["chicken meal", "dehydrated chicken", "chicken protein meal"],
+    "chicken_by_product_meal": ["chicken by product meal", "chicken byproduct meal", "chicken by products meal"],
+    "chicken_fat": ["chicken fat"],
+    "turkey": ["turkey", "deboned turkey"],
+    "turkey_meal": ["turkey meal"],
+    "beef": ["beef", "deboned beef"],
+    "beef_meal": ["beef meal"],
+    "lamb": ["lamb", "deboned lamb"],
+    "lamb_meal": ["lamb meal"],
+    "salmon": ["salmon", "deboned salmon"],
+    "salmon_meal": ["salmon meal"],
+    "fish_meal": ["fish meal", "ocean fish meal", "menhaden fish meal", "whitefish meal"],
+    "fish_oil": ["fish oil", "salmon oil", "menhaden oil", "menhaden fish oil"],
+    "poultry_by_product_meal": ["poultry by product meal", "poultry byproduct meal"],
+    "meat_by_products": ["meat by products", "meat byproducts"],
+    "animal_fat": ["animal fat"],
+    "egg": ["egg", "eggs", "egg product", "dried egg product", "whole egg"],
+    "liver": ["liver", "chicken liver", "pork liver", "beef liver"],
+    "corn": ["corn", "ground corn", "ground yellow corn", "whole grain corn", "maize", "corn grits"],
+    "corn_gluten_meal": ["corn gluten meal"],
+    "wheat": ["wheat", "ground wheat", "whole wheat", "whole grain wheat"],
+    "wheat_gluten": ["wheat gluten"],
+    "soy": ["soy", "soybean", "soybeans", "soybean meal", "soy flour"],
+    "rice": ["rice", "brewers rice", "ground rice", "white rice"],
+    "brown_rice": ["brown rice", "whole grain brown rice"],
+    "barley": ["barley", "pearled barley", "whole grain barley", "cracked pearled barley"],
+    "oats": ["oats", "oatmeal", "whole grain oats", "ground oats"],
+    "pea": ["pea", "peas", "green peas", "whole peas"],
+    "pea_protein": ["pea protein", "pea protein concentrate"],
+    "lentils": ["lentil", "lentils", "red lentils", "green lentils"],
+    "chickpeas": ["chickpea", "chickpeas", "garbanzo beans"],
+    "potato": ["potato", "potatoes", "dried potatoes", "potato starch"],
+    "sweet_potato": ["sweet potato", "sweet potatoes", "dried sweet potatoes"],
+    "beet_pulp": ["beet pulp", "dried beet pulp", "dried plain beet pulp"],
+    "flaxseed": ["flaxseed", "flax seed", "ground flaxseed", "linseed"],
+    "carrots": ["carrot", "carrots"],
+    "tomato_pomace": ["tomato pomace", "dried tomato pomace"],
+    "natural_flavor": ["natural flavor", "natural flavors", "natural flavour", "flavor", "flavors"],
+    "salt": ["salt", "sodium chloride", "iodized salt"],
+    "potassium_chloride": ["potassium chloride"],
+    "choline_chloride": ["choline chloride"],
+    "taurine": ["taurine"],
+    "vitamins": ["vitamins", "vitamin premix"],
+    "minerals": ["minerals", "mineral premix"],
+    "mixed_tocopherols": ["mixed tocopherols", "tocopherols"],
+    "water": ["water", "water sufficient for processing", "broth", "chicken broth"],
+    "guar_gum": ["guar gum"],
+    "carrageenan": ["carrageenan"],
+}
+
+# Dropped before lookup; they describe preparation, not the ingredient.
+QUALIFIER_WORDS = {"fresh", "organic", "natural", "real", "raw", "deboned", "preserved"}
+
+FUZZY_CUTOFF = 0.88
+
+_PARENTHETICAL_RE = re.compile(r"[(\[][^)\]]*[)\]]?")
+# 0/1/| misread for o/l inside a word, at its start, or at the end of a word of two or more
+# letters ("mea1"); a digit after a single letter is real ("vitamin b1", "vitamin b12").
+_OCR_DIGIT_RE = re.compile(r"(?<=[a-z])[01|](?=[a-z])|(?<=[a-z]{2})[01|]\b|\b[01|](?=[a-z])")
+_LETTER_DIGIT_HYPHEN_RE = re.compile(r"(?<=[a-z])-(?=\d)")  # "omega-3", "vitamin b-12"
+_NON_ALPHANUMERIC_RE = re.compile(r"[^a-z0-9 ]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def get_ingredient_synonyms():
+    synonyms = {k: list(v) for k, v in DEFAULT_INGREDIENT_SYNONYMS.items()}
+    for canonical, spellings in getattr(settings, "INGREDIENT_SYNONYMS", {}).items():
+        synonyms.setdefault(canonical, []).extend(spellings)
+    return synonyms
+
+
+@lru_cache(maxsize=1)
+def _spelling_table():
+    table = {}
+    for canonical, spellings in get_ingredient_synonyms().items():
+        table[canonical.replace("_", " ")] = canonical
+        for spelling in spellings:
+            table[normalize_ingredient(spelling)] = canonical
+    return table
+
+
+def normalize_ingredient(text):
+    """
+    'Deboned Chlcken (source of Glucosamine)' -> 'chlcken'; '0ats' -> 'oats';
+    'Vitamin B12 Supplement' -> 'vitamin b12 supplement'. Bare numbers are dropped.
+    """
+    text = _PARENTHETICAL_RE.sub(" ", str(text or "").lower())
+
+    def fix_digit(match):
+        return "o" if match.group() == "0" else "l"
+
+    text = _OCR_DIGIT_RE.sub(fix_digit, text)
+    text = _LETTER_DIGIT_HYPHEN_RE.sub("", text)
+    text = _NON_ALPHANUMERIC_RE.sub(" ", text.replace("-", " "))
+    words = [w for w in _WHITESPACE_RE.split(text) if w and not w.isdigit() and w not in QUALIFIER_WORDS]
+    return " ".join(words)
+
+
+@lru_cache(maxsize=20000)
+def canonicalize_ingredient(text):
+    """
+    Returns the canonical id for one ingredient spelling, or None for empty input.
+    Lookup order: exact spelling, singular form, fuzzy match (OCR noise), then
+    the normalized spelling itself as a new id.
+    """
+    normalized = normalize_ingredient(text)
+    if not normalized:
+        return None
+
+    table = _spelling_table()
+    if normalized in table:
+        return table[normalized]
+
+    if normalized.endswith("s") and not normalized.endswith("ss") and normalized[:-1] in table:
+        return table[normalized[:-1]]
+
+    close = get_close_matches(normalized, table.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    if close:
+        return table[close[0]]
+
+    return normalized.replace(" ", "_")
+
+
+def _family_words(canonical_id):
+    return [word[:-1] if word.endswith("s") and not word.endswith("ss") else word
+            for word in canonical_id.split("_")]
+
+
+def in_ingredient_family(canonical_id, family_id):
+    """
+    True if `canonical_id` contains the words of `family_id` in order, ignoring plural
+    's': corn_gluten_meal, corn_starch and ground_whole_grain_corn are in the corn
+    family, oat_fiber in the oats family; peppercorn and chickpeas are not.
+    """
+    words, family = _family_words(canonical_id), _family_words(family_id)
+    return any(words[i:i + len(family)] == family for i in range(len(words) - len(family) + 1))
+
+
+def canonical_ingredient_ids(ingredients):
+    """Canonical ids for a parsed ingredient list, de-duplicated, label order kept."""
+    seen = {}
+    for ingredient in ingredients or []:
+        canonical = canonicalize_ingredient(ingredient)
+        if canonical:
+            seen.setdefault(canonical, None)
+    return list(seen)
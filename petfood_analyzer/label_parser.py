@@ -0,0 +1,260 @@
+# petfood_analyzer/label_parser.py
+"""
+Single-pass parser for OCR'd pet food label text.
+
+The text is tokenized once into sections (Ingredients, Guaranteed Analysis,
+Calorie Content, Feeding Guide, AAFCO statement) by scanning for section
+headers with one compiled pattern. Each section is then read once with its
+own precompiled pattern. Header patterns tolerate common OCR confusions
+(l/1/I, O/0, "Inaredients", "Guarantced", ...).
+
+All patterns are compiled at import time; nothing uses DOTALL with lazy
+quantifiers, so runtime is linear in the length of the text.
+"""
+import re
+
+# --- Section headers ----------------------------------------------------------------------
+
+# Sections whose header words are part of the content (no explicit "AAFCO Statement:" label).
+# "X is formulated to meet ..." additionally pulls in the product name before it.
+_CONTENT_HEADERS = {"aafco_inline", "aafco_formulated"}
+_SENTENCE_BREAKS = ".:;)\n"
+
+SECTION_HEADER_RE = re.compile(
+    r"""
+    (?P<ingredients>\b[il1][nm][gaqc]?[rn]?[eo]d[il1][eo][nm]ts?\b\s*[:;.]?)
+    | (?P<guaranteed_analysis>\bguar[ao]n[tf]?[eco]{1,2}d\s+an[ao][l1i]ys[il1]s\b\s*[:;.]?)
+    | (?P<calorie_content>\bca[l1i]or[il1]e\s+cont[eo]nt\b(?:\s*\(\s*ca[l1i]cu[l1i]ated\s*\))?\s*[:;.]?)
+    | (?P<feeding_guide>\b(?:da[il1]ly\s+)?fe[eo]d[il1]ng\s+(?:gu[il1]de|[il1]nstruct[il1]ons|d[il1]rect[il1]ons)\b\s*[:;.]?)
+    | (?P<aafco>\ba?afco\s+(?:nutr[il1]t[il1]ona[l1]\s+)?statement\b\s*[:;.]?)
+    | (?P<aafco_inline>\ban[il1]ma[l1]\s+fe[eo]d[il1]ng\s+tests\b)
+    | (?P<aafco_formulated>\b[il1]s\s+formu[l1]ated\s+to\s+meet\b)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+SECTION_NAMES = ("ingredients", "guaranteed_analysis", "calorie_content", "feeding_guide", "aafco")
+
+# --- Guaranteed analysis ------------------------------------------------------------------
+
+# Canonical field name -> OCR-tolerant pattern for the nutrient name.
+NUTRIENT_PATTERNS = {
+    "crude_protein": r"(?:crude\s+)?pr[o0]te[il1]n",
+    "crude_fat": r"(?:crude\s+)?fat",
+    "crude_fiber": r"(?:crude\s+)?f[il1](?:ber|bre)",
+    "moisture": r"m[o0][il1]sture",
+    "ash": r"ash",
+    "taurine": r"taur[il1]ne",
+    "omega_6": r"omega[\s-]*6(?:\s+fatty\s+ac[il1]ds)?",
+    "omega_3": r"omega[\s-]*3(?:\s+fatty\s+ac[il1]ds)?",
+    "dha": r"(?:docosahexaeno[il1]c\s+ac[il1]d\s*)?\(?dha\)?",
+    "epa": r"(?:e[il1]cosapentaeno[il1]c\s+ac[il1]d\s*)?\(?epa\)?",
+    "linoleic_acid": r"[l1][il1]no[l1]e[il1]c\s+ac[il1]d",
+    "calcium": r"ca[l1]c[il1]um",
+    "phosphorus": r"phosphorus",
+    "magnesium": r"magnes[il1]um",
+    "sodium": r"sod[il1]um",
+    "zinc": r"z[il1]nc",
+    "vitamin_e": r"v[il1]tam[il1]n\s+e",
+    "l_carnitine": r"[l1][\s-]*carn[il1]t[il1]ne",
+    "glucosamine": r"g[l1]ucosam[il1]ne",
+    "chondroitin": r"chondro[il1]t[il1]n(?:\s+su[l1]fate)?",
+    "total_microorganisms": r"tota[l1]\s+m[il1]croorgan[il1]sms",
+}
+
+_NUTRIENT_ALTERNATION = "|".join(f"(?P<{name}>{pattern})" for name, pattern in NUTRIENT_PATTERNS.items())
+
+GUARANTEED_ANALYSIS_RE = re.compile(
+    rf"""
+    (?<!\w)(?:{_NUTRIENT_ALTERNATION})(?!\w)
+    \**                                                  # "Omega-6 Fatty Acids*" footnote marks
+    (?:[\s,]*\(?\s*(?P<bound>m[il1]n|max)[a-z]*\.?\s*\)?)?   # Min. / Max. / (min) / Minimum
+    [\s:,.]*
+    (?P<value>\d[\dOo]*(?:[.,][\dOo]+)*)\s*
+    (?P<unit>%|mg/kg|[il1]u/kg|mg/[l1]b|[il1]u/[l1]b|cfu/[l1]b|cfu/g|mg/g)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# --- Calorie content ----------------------------------------------------------------------
+
+CALORIE_RE = re.compile(
+    r"""
+    (?P<value>\d[\d,]*(?:\.\d+)?)\s*
+    kca[l1]\s*(?:ME)?\s*(?:/|per)\s*
+    (?P<unit>kg|can|cup|treat|pouch|tray|piece|tub|stick|chew)\b
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# --- AAFCO statement / product name -------------------------------------------------------
+
+PRODUCT_NAME_RES = (
+    re.compile(r"substantiate\s+that\s+(?P<name>[^.]+?)\s+prov[il1]des\s+comp[l1]ete", re.IGNORECASE),
+    re.compile(r"^(?P<name>[^.:]+?)\s+[il1]s\s+formu[l1]ated\s+to\s+meet", re.IGNORECASE),
+)
+
+# --- Ingredients --------------------------------------------------------------------------
+
+INGREDIENT_SPLIT_RE = re.compile(r"[,;]")
+HYPHEN_BREAK_RE = re.compile(r"(\w)-\s*\n\s*(\w)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+PERCENT_VALUE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+
+
+def _normalize_whitespace(text):
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _sentence_start(text, lower_bound, position):
+    """Index just after the last sentence break in text[lower_bound:position]."""
+    return max(lower_bound, max(text.rfind(char, lower_bound, position) for char in _SENTENCE_BREAKS) + 1)
+
+
+def tokenize_sections(raw_text):
+    """
+    Splits label text into {section_name: text} with a single scan for headers.
+    Only the first non-empty occurrence of each section is kept.
+    """
+    text = HYPHEN_BREAK_RE.sub(r"\1-\2", raw_text or "")
+
+    # (section name, where the previous section must end, where this body starts)
+    spans = []
+    previous_end = 0
+    for match in SECTION_HEADER_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "aafco_formulated":
+            start = _sentence_start(text, previous_end, match.start())
+        elif kind in _CONTENT_HEADERS:
+            start = match.start()
+        else:
+            start = match.end()
+        name = "aafco" if kind in _CONTENT_HEADERS else kind
+        spans.append((name, min(start, match.start()), start))
+        previous_end = match.end()
+
+    sections = {}
+    for i, (name, _, start) in enumerate(spans):
+        end = spans[i + 1][1] if i + 1 < len(spans) else len(text)
+        body = _normalize_whitespace(text[start:end])
+        if body and name not in sections:
+            sections[name] = body
+    return sections
+
+
+def _split_ingredients(section):
+    """Splits on commas/semicolons that are not inside parentheses or brackets."""
+    items, depth, current = [], 0, []
+    for char in section:
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth = max(0, depth - 1)
+        if depth == 0 and INGREDIENT_SPLIT_RE.match(char):
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    items.append("".join(current))
+
+    cleaned = []
+    for item in items:
+        item = item.strip(" .:*")
+        if item:
+            cleaned.append(item)
+    return cleaned
+
+
+def _parse_number(value):
+    value = value.replace("O", "0").replace("o", "0")
+    # "1,185" / "1,000,000" use thousands separators, "7,3" is a decimal comma.
+    if value.count(",") == 1 and "." not in value and len(value.split(",")[-1]) != 3:
+        value = value.replace(",", ".")
+    return float(value.replace(",", ""))
+
+
+def _format_number(number):
+    return f"{number:.4f}".rstrip("0").rstrip(".")
+
+
+def _parse_guaranteed_analysis(section):
+    values, bounds = {}, {}
+    for match in GUARANTEED_ANALYSIS_RE.finditer(section):
+        name = next(key for key in NUTRIENT_PATTERNS if match.group(key))
+        if name in values:
+            continue
+        number = _format_number(_parse_number(match.group("value")))
+        unit = match.group("unit").lower().replace("1", "l").replace("iu", "IU")
+        values[name] = f"{number}%" if unit == "%" else f"{number} {unit}"
+        if match.group("bound"):
+            bounds[name] = "max" if match.group("bound").lower().startswith("ma") else "min"
+    return values, bounds
+
+
+def _parse_calories(section):
+    kcal_per_kg, kcal_per_unit = None, None
+    for match in CALORIE_RE.finditer(section):
+        unit = match.group("unit").lower()
+        value = _parse_number(match.group("value"))
+        if unit == "kg" and kcal_per_kg is None:
+            kcal_per_kg = value
+        elif unit != "kg" and kcal_per_unit is None:
+            kcal_per_unit = f"{_format_number(value)} kcal ME/{unit}"
+    return kcal_per_kg, kcal_per_unit
+
+
+def _parse_product_name(section):
+    for pattern in PRODUCT_NAME_RES:
+        match = pattern.search(section)
+        if match:
+            return match.group("name").strip()
+    return None
+
+
+def percent_value(value):
+    """'26%' -> 26.0. None for missing values, other units, or values outside 0-100."""
+    match = PERCENT_VALUE_RE.fullmatch(str(value or "").strip())
+    if not match:
+        return None
+    number = float(match.group(1))
+    return number if 0 <= number <= 100 else None
+
+
+def parse_label(raw_text):
+    """
+    Parses raw OCR text into structured label data.
+    Returns (data, kcal_per_kg, kcal_per_unit), the same shape as
+    views.parse_nutritional_data has always returned.
+    """
+    sections = tokenize_sections(raw_text)
+
+    data = {
+        "product_name": None,
+        "guaranteed_analysis": {},
+        "ingredients": [],
+        "feeding_guide": None,
+        "other_info": {},
+    }
+
+    if "ingredients" in sections:
+        data["ingredients"] = _split_ingredients(sections["ingredients"])
+
+    analysis_section = sections.get("guaranteed_analysis", "")
+    if analysis_section:
+        values, bounds = _parse_guaranteed_analysis(analysis_section)
+        data["guaranteed_analysis"] = values
+        if bounds:
+            data["other_info"]["guaranteed_analysis_bounds"] = bounds
+
+    # Calories are usually their own section but are sometimes run into the analysis.
+    kcal_per_kg, kcal_per_unit = _parse_calories(sections.get("calorie_content") or analysis_section)
+
+    if "feeding_guide" in sections:
+        data["feeding_guide"] = sections["feeding_guide"]
+
+    if "aafco" in sections:
+        data["other_info"]["aafco_statement"] = sections["aafco"]
+        data["product_name"] = _parse_product_name(sections["aafco"])
+
+    return data, kcal_per_kg, kcal_per_unit
@@ -0,0 +1,95 @@
+# petfood_analyzer/management/commands/backfill_nutrient_columns.py
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from petfood_analyzer.models import FoodLabelScan
+
+DENORMALIZED_FIELDS = list(FoodLabelScan.DENORMALIZED_FIELDS)
+
+
+class Command(BaseCommand):
+    help = ("Fills the denormalized nutrient columns (protein/fat/fiber/moisture %, ingredient count, "
+            "product name) from parsed_data for existing FoodLabelScan rows. Works in primary-key "
+            "chunks, one transaction per chunk, and records the last finished id in a checkpoint "
+            "file so an interrupted run resumes where it stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Rows read and updated per transaction.")
+        parser.add_argument('--checkpoint',
+                            default=str(settings.BASE_DIR / 'nutrient-backfill-checkpoint.json'),
+                            help="Checkpoint file holding the last processed id "
+                                 "(default: nutrient-backfill-checkpoint.json in the project directory).")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore an existing checkpoint and start from the first row.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Count rows that would change without writing anything.")
+
+    def _load_checkpoint(self, path):
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return int(json.load(f).get('last_id', 0))
+
+    def _save_checkpoint(self, path, last_id):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_id': last_id}, f)
+        os.replace(tmp_path, path)  # atomic, so a crash never leaves a half-written checkpoint
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        checkpoint_path = options['checkpoint']
+        dry_run = options['dry_run']
+
+        last_id = 0 if options['restart'] else self._load_checkpoint(checkpoint_path)
+        if last_id:
+            self.stdout.write(f"Resuming after id {last_id}.")
+
+        fields = ['id', 'parsed_data'] + DENORMALIZED_FIELDS
+        scanned, changed = 0, 0
+        start = time.perf_counter()
+
+        while True:
+            # Keyset pagination: each chunk is an index range scan on the primary key.
+            chunk = list(
+                FoodLabelScan.objects.filter(id__gt=last_id).order_by('id').only(*fields)[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            updates = []
+            for scan in chunk:
+                before = [getattr(scan, name) for name in DENORMALIZED_FIELDS]
+                scan.apply_parsed_data()
+                if [getattr(scan, name) for name in DENORMALIZED_FIELDS] != before:
+                    updates.append(scan)
+
+            if updates and not dry_run:
+                # bulk_update skips auto_now; updated_at tells the in-memory indexes to re-read the rows.
+                now = timezone.now()
+                for scan in updates:
+                    scan.updated_at = now
+                with transaction.atomic():
+                    FoodLabelScan.objects.bulk_update(updates, DENORMALIZED_FIELDS + ['updated_at'])
+
+            scanned += len(chunk)
+            changed += len(updates)
+            last_id = chunk[-1].id
+            if not dry_run:
+                self._save_checkpoint(checkpoint_path, last_id)
+            self.stdout.write(f"  up to id {last_id}: {scanned} scanned, {changed} updated")
+
+        elapsed = time.perf_counter() - start
+        verb = "would be updated" if dry_run else "updated"
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {scanned} rows scanned, {changed} {verb} in {elapsed:.1f}s."
+        ))
+        if not dry_run and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
@@ -0,0 +1,48 @@
+# petfood_analyzer/management/commands/benchmark_label_parser.py
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from petfood_analyzer.label_parser import parse_label
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'testdata', 'labels')
+
+NOISE = "Crude Protein, Min. lorem ipsum ~~ lngredient kcal per 0O1l| (see below); "
+
+
+class Command(BaseCommand):
+    help = ("Micro-benchmark for the label parser: per-call latency on the golden label texts, "
+            "and throughput on long noisy text to show that parse time grows linearly.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=2000,
+                            help="Parses per golden label text.")
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+
+        self.stdout.write(f"{'label':<32}{'chars':>8}{'us/parse':>12}")
+        for name in sorted(os.listdir(TESTDATA_DIR)):
+            if not name.endswith('.txt'):
+                continue
+            with open(os.path.join(TESTDATA_DIR, name), encoding='utf-8') as f:
+                text = f.read()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                parse_label(text)
+            per_call = (time.perf_counter() - start) / repeat
+            self.stdout.write(f"{name[:-4]:<32}{len(text):>8}{per_call * 1e6:>12.1f}")
+
+        self.stdout.write(f"\n{'noisy text':<32}{'chars':>8}{'ms/parse':>12}{'MB/s':>8}")
+        with open(os.path.join(TESTDATA_DIR, 'hills_adult_turkey_wet_cat.txt'), encoding='utf-8') as f:
+            label = f.read()
+        for multiplier in (10, 100, 1000):
+            text = NOISE * multiplier + label
+            start = time.perf_counter()
+            parse_label(text)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{f'{multiplier}x noise + label':<32}{len(text):>8}{elapsed * 1e3:>12.2f}"
+                f"{len(text) / elapsed / 1e6:>8.2f}"
+            )
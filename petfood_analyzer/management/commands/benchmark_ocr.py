@@ -0,0 +1,90 @@
+# petfood_analyzer/management/commands/benchmark_ocr.py
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from petfood_analyzer.ocr import extract_label_text
+from petfood_analyzer.preprocessing import STEPS, get_preprocessing_config
+from petfood_analyzer.views import parse_nutritional_data
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp')
+
+
+def count_extracted_fields(raw_text):
+    """Returns (found, total) for the fields the label parser knows how to extract."""
+    data, kcal_per_kg, _ = parse_nutritional_data(raw_text)
+    analysis = data.get("guaranteed_analysis", {})
+    checks = [
+        bool(data.get("product_name")),
+        bool(data.get("ingredients")),
+        "crude_protein" in analysis,
+        "crude_fat" in analysis,
+        "moisture" in analysis,
+        kcal_per_kg is not None,
+    ]
+    return sum(checks), len(checks)
+
+
+class Command(BaseCommand):
+    help = ("Benchmarks label OCR over a directory of images, with the preprocessing pipeline "
+            "off, fully on, and with each step removed in turn (or single vs tiled OCR "
+            "with --compare-modes).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=os.path.join(settings.MEDIA_ROOT, 'pet_food_labels'),
+                            help="Directory of label images (default: MEDIA_ROOT/pet_food_labels).")
+        parser.add_argument('--limit', type=int, default=0, help="Only use the first N images.")
+        parser.add_argument('--compare-modes', action='store_true',
+                            help="Compare single-call and tiled OCR (full preprocessing) instead of "
+                                 "benchmarking the preprocessing steps.")
+
+    def handle(self, *args, **options):
+        directory = options['dir']
+        if not os.path.isdir(directory):
+            raise CommandError(f"Directory not found: {directory}")
+
+        images = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if options['limit']:
+            images = images[:options['limit']]
+        if not images:
+            raise CommandError(f"No label images found in {directory}")
+
+        full_pipeline = get_preprocessing_config(enabled=True, **{step: True for step in STEPS})
+        if options['compare_modes']:
+            variants = [
+                ("single call", full_pipeline, "single"),
+                ("tiled (parallel)", full_pipeline, "tiled"),
+            ]
+        else:
+            variants = [
+                ("no preprocessing", get_preprocessing_config(enabled=False), "single"),
+                ("full pipeline", full_pipeline, "single"),
+            ]
+            for step in STEPS:
+                overrides = {s: True for s in STEPS}
+                overrides[step] = False
+                variants.append((f"without {step}", get_preprocessing_config(enabled=True, **overrides), "single"))
+
+        self.stdout.write(f"Benchmarking {len(images)} image(s) from {directory}\n")
+        self.stdout.write(f"{'variant':<22}{'total s':>10}{'s/image':>10}{'fields':>12}{'rate':>8}")
+
+        for label, config, mode in variants:
+            found_total, fields_total = 0, 0
+            start = time.perf_counter()
+            for path in images:
+                raw_text = extract_label_text(path, preprocessing=config, mode=mode)
+                found, total = count_extracted_fields(raw_text)
+                found_total += found
+                fields_total += total
+            elapsed = time.perf_counter() - start
+
+            rate = found_total / fields_total if fields_total else 0.0
+            self.stdout.write(
+                f"{label:<22}{elapsed:>10.2f}{elapsed / len(images):>10.3f}"
+                f"{f'{found_total}/{fields_total}':>12}{rate:>8.1%}"
+            )
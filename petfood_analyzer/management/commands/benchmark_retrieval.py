@@ -0,0 +1,123 @@
+# petfood_analyzer/management/commands/benchmark_retrieval.py
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from petfood_analyzer.models import FoodLabelScan
+from petfood_analyzer.retrieval import get_bm25_index, normalize_product_name, search_food_labels
+
+MODES = ("bm25", "vector", "hybrid")
+
+
+class Command(BaseCommand):
+    help = ("Retrieval benchmark for agent food queries: recall@k and latency of BM25, vector and "
+            "hybrid (RRF) search. Uses a labelled query file, or generates queries from the scans "
+            "in the database (exact product names, partial names, distinctive ingredients).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries',
+                            help="JSON list of {\"query\": ..., \"relevant_products\": [...]} "
+                                 "and/or \"relevant_scan_ids\": [...].")
+        parser.add_argument('--sample', type=int, default=100,
+                            help="Scans to generate queries from when --queries is not given.")
+        parser.add_argument('--k', type=int, default=5)
+        parser.add_argument('--modes', default=','.join(MODES),
+                            help="Comma-separated subset of: " + ', '.join(MODES))
+        parser.add_argument('--seed', type=int, default=0)
+
+    # --- query sets ------------------------------------------------------------------------
+
+    def _load_queries(self, path):
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)
+
+        names = {}
+        for scan_id, product_name, parsed_data in FoodLabelScan.objects.values_list(
+                'id', 'product_name', 'parsed_data'):
+            for name in (product_name, (parsed_data or {}).get('product_name')):
+                if name:
+                    names.setdefault(normalize_product_name(name), set()).add(scan_id)
+
+        queries = []
+        for row in rows:
+            relevant = set(row.get('relevant_scan_ids', []))
+            for name in row.get('relevant_products', []):
+                relevant |= names.get(normalize_product_name(name), set())
+            if relevant:
+                queries.append((row['query'], relevant))
+            else:
+                self.stderr.write(f"  skipping (no matching scans in the database): {row['query']}")
+        return queries
+
+    def _generate_queries(self, sample, rng):
+        index = get_bm25_index()
+        scans = list(
+            FoodLabelScan.objects.filter(ingredient_count__gt=0).only('id', 'product_name', 'parsed_data')
+        )
+        rng.shuffle(scans)
+
+        queries = []
+        for scan in scans[:sample]:
+            name = scan.product_name or scan.parsed_data.get('product_name')
+            if name:
+                relevant = set(index.product_names.get(normalize_product_name(name), {scan.id}))
+                queries.append((f"What do you think of {name}?", relevant))
+                words = name.split()
+                if len(words) > 2:
+                    queries.append((f"{' '.join(words[:2])} {words[-1]} ingredients", relevant))
+
+            # The rarest ingredient of this label (fewest scans mention it).
+            ingredients = [i for i in scan.parsed_data.get('ingredients', []) if len(i) > 3]
+            if ingredients:
+                def frequency(ingredient):
+                    terms = ingredient.lower().split()
+                    return min(len(index.postings.get(t, ())) for t in terms) if terms else 0
+                rare = min(ingredients, key=frequency)
+                relevant = {
+                    s.id for s in scans if rare.lower() in
+                    [i.lower() for i in s.parsed_data.get('ingredients', [])]
+                }
+                queries.append((f"Which food contains {rare}?", relevant))
+        return queries
+
+    # --- run -------------------------------------------------------------------------------
+
+    def handle(self, *args, **options):
+        k = options['k']
+        modes = [m.strip() for m in options['modes'].split(',') if m.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+
+        if options['queries']:
+            queries = self._load_queries(options['queries'])
+        else:
+            queries = self._generate_queries(options['sample'], random.Random(options['seed']))
+        if not queries:
+            raise CommandError("No queries to run (empty query set or no indexed scans).")
+
+        start = time.perf_counter()
+        get_bm25_index()
+        self.stdout.write(f"{len(queries)} queries; BM25 index ready in {time.perf_counter() - start:.2f}s\n")
+        self.stdout.write(f"{'mode':<10}{f'recall@{k}':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+
+        for mode in modes:
+            recalls, latencies = [], []
+            try:
+                for query, relevant in queries:
+                    start = time.perf_counter()
+                    results = search_food_labels(query, k=k, mode=mode)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    found = {r['scan_id'] for r in results} & relevant
+                    recalls.append(len(found) / min(len(relevant), k))
+            except Exception as e:
+                self.stdout.write(f"{mode:<10}  failed: {e}")
+                continue
+
+            latencies.sort()
+            self.stdout.write(
+                f"{mode:<10}{sum(recalls) / len(recalls):>10.3f}{sum(latencies) / len(latencies):>10.2f}"
+                f"{latencies[len(latencies) // 2]:>10.2f}{latencies[int(len(latencies) * 0.95)]:>10.2f}"
+            )
@@ -0,0 +1,148 @@
+# petfood_analyzer/management/commands/benchmark_vector_backends.py
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from PetPalAI.vector_backends import NumpyVectorCollection
+
+
+def _rss_mb():
+    """Current resident set size in MB (Linux), else peak RSS."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _dir_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 1e6
+
+
+class Command(BaseCommand):
+    help = ("Compares the NumPy memory-mapped vector backend (exact and clustered search) with Chroma "
+            "as a synthetic collection grows: query latency, recall@k against exact search, RSS "
+            "growth and on-disk size. Embeddings are synthetic, so Ollama is not needed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000,1000000',
+                            help="Comma-separated collection sizes, measured as the collection grows.")
+        parser.add_argument('--dim', type=int, default=768, help="Embedding dimension (nomic-embed-text: 768).")
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--k', type=int, default=5)
+        parser.add_argument('--nprobe', type=int, default=8)
+        parser.add_argument('--skip-chroma-above', type=int, default=200000,
+                            help="Stop adding to Chroma beyond this size (its build time dominates).")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+        dim, k = options['dim'], options['k']
+        rng = np.random.default_rng(options['seed'])
+        # Clustered data, so coarse clustering faces a realistic (non-uniform) distribution.
+        centers = rng.normal(size=(256, dim)).astype(np.float32)
+
+        def make(n):
+            vectors = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        workdir = tempfile.mkdtemp(prefix='vector-bench-')
+        try:
+            numpy_collection = NumpyVectorCollection(os.path.join(workdir, 'numpy'), nprobe=options['nprobe'])
+            chroma_collection = self._open_chroma(os.path.join(workdir, 'chroma'))
+
+            self.stdout.write(f"dim={dim} k={k} queries={options['queries']} nprobe={options['nprobe']}")
+            self.stdout.write(
+                f"{'size':>9} {'backend':<12}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                f"{f'recall@{k}':>10}{'RSS +MB':>9}{'disk MB':>9}"
+            )
+
+            added = 0
+            chroma_added = 0
+            build = {'numpy': 0.0, 'chroma': 0.0}
+            rss = {'numpy': 0.0, 'chroma': 0.0}
+            for size in sizes:
+                # Grow both collections to `size` in chunks.
+                while added < size:
+                    n = min(50000, size - added)
+                    vectors = make(n)
+                    ids = [f"doc-{i}" for i in range(added, added + n)]
+
+                    before, start = _rss_mb(), time.perf_counter()
+                    numpy_collection.add(ids=ids, embeddings=vectors)
+                    build['numpy'] += time.perf_counter() - start
+                    rss['numpy'] += _rss_mb() - before
+
+                    if chroma_collection is not None and added < options['skip_chroma_above']:
+                        before, start = _rss_mb(), time.perf_counter()
+                        step = 5000
+                        for offset in range(0, n, step):
+                            chroma_collection.add(ids=ids[offset:offset + step],
+                                                  embeddings=vectors[offset:offset + step])
+                        build['chroma'] += time.perf_counter() - start
+                        rss['chroma'] += _rss_mb() - before
+                        chroma_added = added + n
+                    added += n
+
+                queries = make(options['queries'])
+                exact_ids, exact_times = self._run(
+                    lambda q: numpy_collection.search(q[None, :], k, exact=True)[0][0], queries)
+                self._row(size, 'numpy exact', build['numpy'], exact_times, 1.0, rss['numpy'],
+                          _dir_mb(numpy_collection.path))
+
+                start = time.perf_counter()
+                numpy_collection.train_clusters(seed=options['seed'])
+                train_time = time.perf_counter() - start
+                ivf_ids, ivf_times = self._run(
+                    lambda q: numpy_collection.search(q[None, :], k)[0][0], queries)
+                self._row(size, 'numpy ivf', build['numpy'] + train_time, ivf_times,
+                          self._recall(ivf_ids, exact_ids), rss['numpy'], _dir_mb(numpy_collection.path))
+                # Later sizes are measured on exact search first, so drop the cluster model again.
+                os.remove(numpy_collection._file(numpy_collection.CENTROIDS_FILE))
+
+                if chroma_collection is not None and chroma_added == size:
+                    chroma_ids, chroma_times = self._run(
+                        lambda q: [int(i.split('-')[1]) for i in chroma_collection.query(
+                            query_embeddings=[q], n_results=k, include=[])['ids'][0]],
+                        queries)
+                    self._row(size, 'chroma', build['chroma'], chroma_times,
+                              self._recall(chroma_ids, exact_ids), rss['chroma'],
+                              _dir_mb(os.path.join(workdir, 'chroma')))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _open_chroma(self, path):
+        try:
+            import chromadb
+        except ImportError:
+            self.stdout.write("chromadb not installed; benchmarking the NumPy backend only.")
+            return None
+        client = chromadb.PersistentClient(path=path)
+        return client.get_or_create_collection(
+            name='bench', embedding_function=None, configuration={'hnsw': {'space': 'cosine'}}
+        )
+
+    def _run(self, search, queries):
+        results, times = [], []
+        for query in queries:
+            start = time.perf_counter()
+            results.append(set(int(r) for r in search(query)))
+            times.append((time.perf_counter() - start) * 1000)
+        return results, sorted(times)
+
+    def _recall(self, found, truth):
+        return float(np.mean([len(f & t) / max(1, len(t)) for f, t in zip(found, truth)]))
+
+    def _row(self, size, backend, build_s, times, recall, rss_mb, disk_mb):
+        self.stdout.write(
+            f"{size:>9} {backend:<12}{build_s:>9.2f}{times[len(times) // 2]:>9.2f}"
+            f"{times[int(len(times) * 0.95)]:>9.2f}{recall:>10.3f}{rss_mb:>9.1f}{disk_mb:>9.1f}"
+        )
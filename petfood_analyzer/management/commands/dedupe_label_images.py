@@ -0,0 +1,79 @@
+# petfood_analyzer/management/commands/dedupe_label_images.py
+import os
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from petfood_analyzer.models import FoodLabelScan
+from petfood_analyzer.storage import VARIANTS_DIR, content_addressed_name, hash_image_file
+
+
+class Command(BaseCommand):
+    help = ("Moves legacy label images into content-addressed storage, deleting byte-identical "
+            "duplicates and re-pointing FoodLabelScan rows at the surviving file.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default='pet_food_labels',
+                            help="Upload directory, relative to the image storage root.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report what would change without touching files or rows.")
+
+    def handle(self, *args, **options):
+        storage = FoodLabelScan._meta.get_field('image').storage
+        directory = options['dir'].strip('/')
+        dry_run = options['dry_run']
+
+        if not storage.exists(directory):
+            raise CommandError(f"Directory not found in storage: {directory}")
+
+        # Only legacy files sit directly in the upload dir; hashed files live in <sha[:2]>/ shards.
+        _, filenames = storage.listdir(directory)
+        renames = {}
+        removed, bytes_saved = 0, 0
+
+        # Per file: make sure the content-addressed copy exists, re-point the rows and commit,
+        # and only then delete the legacy file. An interrupted run leaves the legacy file (and
+        # possibly its copy) in place, so the next run finishes the job.
+        updated = 0
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+            old_name = f"{directory}/{filename}"
+            with storage.open(old_name) as f:
+                digest = hash_image_file(f)
+            new_name = content_addressed_name(directory, digest, filename)
+            # In a dry run nothing is copied, so also treat earlier files in this pass as existing.
+            seen_in_dry_run = dry_run and new_name in renames.values()
+            renames[old_name] = new_name
+
+            if storage.exists(new_name) or seen_in_dry_run:
+                # Duplicate content: the canonical copy already exists.
+                bytes_saved += storage.size(old_name)
+                removed += 1
+                self.stdout.write(f"duplicate  {old_name} -> {new_name}")
+            else:
+                self.stdout.write(f"move       {old_name} -> {new_name}")
+                if not dry_run:
+                    new_path = storage.path(new_name)
+                    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                    # Copy under a temporary name first so new_name never holds a partial file.
+                    shutil.copyfile(storage.path(old_name), f"{new_path}.tmp")
+                    os.replace(f"{new_path}.tmp", new_path)
+
+            if dry_run:
+                updated += FoodLabelScan.objects.filter(image=old_name).count()
+                continue
+            with transaction.atomic():
+                updated += FoodLabelScan.objects.filter(image=old_name).update(
+                    image=new_name, updated_at=timezone.now()
+                )
+            storage.delete(old_name)
+
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{len(renames)} file(s) processed, {removed} duplicate(s) removed "
+            f"({bytes_saved / 1024 / 1024:.1f} MB saved), {updated} scan(s) re-pointed. "
+            f"Display/thumbnail variants will be rebuilt under {directory}/{VARIANTS_DIR}/ on demand."
+        ))
@@ -0,0 +1,282 @@
+# petfood_analyzer/management/commands/ingest_labels.py
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from petfood_analyzer.models import FoodLabelScan
+from petfood_analyzer.ocr import extract_label_text, get_tiling_config
+from petfood_analyzer.result_cache import apply_cached_result, get_cached_result, store_result
+from petfood_analyzer.storage import hash_image_file
+from petfood_analyzer.views import (
+    ANALYSIS_VERSION, analysis_failed, build_label_document, generate_pros_cons, label_document_metadata,
+    parse_nutritional_data,
+)
+from PetPalAI.utils import label_document_id
+from PetPalAI.vector_writer import VectorIngestWriter
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp')
+
+
+def _init_worker():
+    # Spawned workers (the default on macOS) start without Django configured.
+    django.setup()
+
+
+def ocr_and_parse(item):
+    """
+    Process-pool worker: OCRs and parses one label image.
+    Returns a plain dict so it pickles cheaply back to the parent.
+    """
+    path = item['path']
+    result = {'path': path, 'error': None}
+    try:
+        # The pool already runs one image per worker; tiled OCR gets one thread here instead of
+        # os.cpu_count() each, which would start up to workers * cores Tesseract processes.
+        tiling = dict(get_tiling_config(), workers=1)
+        raw_text = extract_label_text(path, mode=item.get('ocr_mode'), tiling=tiling)
+        parsed_data, kcal_per_kg, kcal_per_unit = parse_nutritional_data(raw_text)
+        result.update({
+            'raw_text': raw_text,
+            'parsed_data': parsed_data,
+            'calorie_content_kcal_per_kg': kcal_per_kg,
+            'calorie_content_per_unit': kcal_per_unit,
+        })
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+
+class Command(BaseCommand):
+    help = ("Bulk-ingests pet food label images from a directory or a manifest (CSV or JSON lines "
+            "with path, pet_type, food_type, product_name). OCR runs in a process pool, the LLM "
+            "analysis under a concurrency limit, and progress is checkpointed so an interrupted "
+            "run resumes where it stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Directory of label images, or a .csv/.jsonl manifest.")
+        parser.add_argument('--pet-type', default='other', help="Default pet_type for directory input.")
+        parser.add_argument('--food-type', default='OTHER', help="Default food_type for directory input.")
+        parser.add_argument('--user', help="Username to own the created scans.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="Process-pool size for OCR and parsing.")
+        parser.add_argument('--llm-concurrency', type=int, default=2,
+                            help="Maximum concurrent LLM analysis requests.")
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help="Images per batch (one bulk_create / vector-store add per batch).")
+        parser.add_argument('--ocr-mode', choices=['single', 'tiled', 'auto'],
+                            help="OCR mode (default: settings.LABEL_OCR_MODE).")
+        parser.add_argument('--skip-analysis', action='store_true',
+                            help="Only OCR and parse; leave ai_analysis empty.")
+        parser.add_argument('--checkpoint',
+                            help="Checkpoint file (default: <source>.ingest-checkpoint.json).")
+
+    # --- input -----------------------------------------------------------------------------
+
+    def _load_items(self, source, options):
+        defaults = {
+            'pet_type': options['pet_type'],
+            'food_type': options['food_type'],
+            'product_name': '',
+        }
+
+        if os.path.isdir(source):
+            return [
+                dict(defaults, path=os.path.join(source, name))
+                for name in sorted(os.listdir(source))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+
+        if not os.path.isfile(source):
+            raise CommandError(f"Source not found: {source}")
+
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, newline='') as f:
+            if source.lower().endswith('.csv'):
+                rows = list(csv.DictReader(f))
+            else:
+                rows = [json.loads(line) for line in f if line.strip()]
+
+        items = []
+        for row in rows:
+            if not row.get('path'):
+                raise CommandError(f"Manifest row without 'path': {row}")
+            item = dict(defaults)
+            item.update({k: v for k, v in row.items() if v})
+            item['path'] = os.path.join(base_dir, row['path'])
+            items.append(item)
+        return items
+
+    # --- checkpointing ---------------------------------------------------------------------
+
+    def _load_checkpoint(self, path):
+        if not os.path.exists(path):
+            return set()
+        with open(path) as f:
+            return set(json.load(f).get('done', []))
+
+    def _save_checkpoint(self, path, done):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'done': sorted(done)}, f)
+        os.replace(tmp_path, path)  # atomic, so a crash never leaves a half-written checkpoint
+
+    # --- main ------------------------------------------------------------------------------
+
+    def handle(self, *args, **options):
+        source = options['source'].rstrip('/')
+        checkpoint_path = options['checkpoint'] or f"{source}.ingest-checkpoint.json"
+        batch_size = max(1, options['batch_size'])
+
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if not user:
+                raise CommandError(f"User not found: {options['user']}")
+
+        items = self._load_items(source, options)
+        done = self._load_checkpoint(checkpoint_path)
+        pending = [item for item in items if item['path'] not in done]
+        for item in pending:
+            item['ocr_mode'] = options['ocr_mode']
+
+        self.stdout.write(f"{len(items)} image(s) found, {len(items) - len(pending)} already ingested, "
+                          f"{len(pending)} to go.")
+        if not pending:
+            return
+
+        # Flushed explicitly after each batch, so no background thread; max_batch only bounds memory.
+        writer = VectorIngestWriter(max_batch=max(batch_size, 1000), max_delay=None)
+        created_total, failed_total = 0, 0
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as ocr_pool, \
+                ThreadPoolExecutor(max_workers=max(1, options['llm_concurrency'])) as llm_pool:
+            for offset in range(0, len(pending), batch_size):
+                batch = pending[offset:offset + batch_size]
+                created, failed = self._ingest_batch(
+                    batch, ocr_pool, llm_pool, writer, user, checkpoint_path, done, options
+                )
+                created_total += created
+                failed_total += len(failed)
+
+                elapsed = time.perf_counter() - start
+                processed = offset + len(batch)
+                self.stdout.write(f"  {processed}/{len(pending)} processed "
+                                  f"({processed / elapsed:.1f} images/s), {failed_total} failed")
+
+        writer.close()  # last retry of any batch whose vector-store add failed
+        if writer.dropped:
+            self.stderr.write(f"{writer.dropped} document(s) could not be added to the vector index; "
+                              f"run 'python manage.py rebuild_vector_index'.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {created_total} scan(s) in {time.perf_counter() - start:.1f}s; "
+            f"{failed_total} failed. Checkpoint: {checkpoint_path}"
+        ))
+
+    def _ingest_batch(self, batch, ocr_pool, llm_pool, writer, user, checkpoint_path, done, options):
+        # 1. Hash every image; cache hits and repeats within the batch skip OCR entirely.
+        results, to_ocr = {}, {}
+        for item in batch:
+            with open(item['path'], 'rb') as f:
+                item['image_hash'] = hash_image_file(f)
+            image_hash = item['image_hash']
+            if image_hash in results or image_hash in to_ocr:
+                continue
+            cached = get_cached_result(image_hash, ANALYSIS_VERSION, mode=options['ocr_mode'])
+            if cached:
+                results[image_hash] = {'cached': cached, 'error': None, 'parsed_data': cached.parsed_data}
+            else:
+                to_ocr[image_hash] = item
+
+        # 2. OCR + parse in the process pool.
+        results.update(zip(to_ocr, ocr_pool.map(ocr_and_parse, to_ocr.values())))
+
+        # 3. LLM analysis under a concurrency limit, once per (image, pet type, food type): the
+        #    prompt depends on both types. Cached OCR results go through here too; answers are
+        #    cached per pet and food type in analysis_cache.
+        needs_analysis = {}
+        for item in batch:
+            result = results[item['image_hash']]
+            if not result['error'] and result['parsed_data'].get('ingredients'):
+                key = (item['image_hash'], item['pet_type'], item['food_type'])
+                needs_analysis.setdefault(key, result['parsed_data'])
+        analyses = {}
+        if not options['skip_analysis']:
+            answers = llm_pool.map(
+                lambda entry: generate_pros_cons(entry[1], entry[0][1], entry[0][2]),
+                needs_analysis.items(),
+            )
+            # Failures are left blank, i.e. pending, as in the web upload path: the scan's
+            # analysis stream retries them instead of showing a stored error.
+            analyses = {
+                key: '' if analysis_failed(answer) else answer
+                for key, answer in zip(needs_analysis, answers)
+            }
+
+        # 4. Store images and build the scan rows.
+        scans, fresh_scans, failed = [], {}, set()
+        for item in batch:
+            result = results[item['image_hash']]
+            if result['error']:
+                failed.add(item['path'])
+                self.stderr.write(f"  ✗ {item['path']}: {result['error']}")
+                continue
+
+            scan = FoodLabelScan(
+                user=user,
+                pet_type=item['pet_type'],
+                food_type=item['food_type'],
+                product_name=item.get('product_name', ''),
+            )
+            with open(item['path'], 'rb') as f:
+                scan.image.save(os.path.basename(item['path']), File(f), save=False)
+
+            if 'cached' in result:
+                apply_cached_result(result['cached'], scan)
+            else:
+                scan.raw_text = result['raw_text']
+                scan.parsed_data = result['parsed_data']
+                scan.calorie_content_kcal_per_kg = result['calorie_content_kcal_per_kg']
+                scan.calorie_content_per_unit = result['calorie_content_per_unit']
+                scan.apply_parsed_data()
+                fresh_scans.setdefault(item['image_hash'], scan)
+            if scan.parsed_data.get('ingredients'):
+                scan.ai_analysis = analyses.get((item['image_hash'], item['pet_type'], item['food_type']), '')
+            else:
+                scan.ai_analysis = "AI analysis skipped: No ingredient list found in the label."
+            scans.append(scan)
+
+        # 5. Insert the rows and checkpoint the batch in one step: the checkpoint is written
+        #    before the commit and put back if the commit fails, so a rerun never inserts a
+        #    batch twice. Failed images stay out of it so the next run retries them.
+        batch_done = done | {item['path'] for item in batch if item['path'] not in failed}
+        try:
+            with transaction.atomic():
+                FoodLabelScan.objects.bulk_create(scans, batch_size=500)
+                for image_hash, scan in fresh_scans.items():
+                    store_result(image_hash, ANALYSIS_VERSION, scan, mode=options['ocr_mode'])
+                self._save_checkpoint(checkpoint_path, batch_done)
+        except BaseException:
+            self._save_checkpoint(checkpoint_path, done)
+            raise
+        done.update(batch_done)
+
+        # 6. One embedding call and one vector-store add per batch; every scan with
+        #    ingredients gets its own document. The rows are already committed: documents
+        #    lost to a crash here are restored by 'python manage.py reconcile_vector_index'.
+        writer.submit_many(
+            (label_document_id(scan.pk), build_label_document(scan.parsed_data), label_document_metadata(scan))
+            for scan in scans if scan.parsed_data.get('ingredients')
+        )
+        writer.flush()
+
+        return len(scans), failed
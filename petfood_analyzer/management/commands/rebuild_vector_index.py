@@ -0,0 +1,75 @@
+# petfood_analyzer/management/commands/rebuild_vector_index.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from petfood_analyzer.models import FoodLabelScan
+from petfood_analyzer.views import build_label_document, label_document_metadata
+from PetPalAI.utils import (
+    active_index_version, get_food_label_collection, label_document_id, probe_dimension, report_food_label_index,
+    reset_food_label_collection, validate_food_label_index,
+)
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds the on-disk food label vector index from FoodLabelScan rows: drops the "
+            "collection and re-adds one document per scan with parsed ingredients. Queries see a "
+            "partial index meanwhile; reembed_vector_index rebuilds into a new version instead. "
+            "With --check, only compares the index with the database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Report missing/orphaned documents without changing the index.")
+        parser.add_argument('--batch-size', type=int, default=256,
+                            help="Documents per add (one embedding request per batch).")
+        parser.add_argument('--clusters', type=int, nargs='?', const=0, default=None,
+                            help="NumPy backend only: train the coarse clustering after the rebuild "
+                                 "(optionally with this many clusters; default ~sqrt(documents)).")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            report = validate_food_label_index(get_food_label_collection())
+            report_food_label_index(report)
+            return
+
+        batch_size = max(1, options['batch_size'])
+        collection = reset_food_label_collection()
+        queryset = FoodLabelScan.objects.filter(ingredient_count__gt=0).only(
+            'id', 'parsed_data', 'pet_type', 'food_type', 'user').order_by('id')
+
+        added = 0
+        start = time.perf_counter()
+        batch = []
+        for scan in queryset.iterator(chunk_size=batch_size):
+            batch.append(scan)
+            if len(batch) >= batch_size:
+                added += self._add(collection, batch)
+                batch = []
+        added += self._add(collection, batch)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Indexed {added} scans in {elapsed:.1f}s."))
+
+        version = active_index_version()
+        version.dimension = probe_dimension(collection)
+        version.document_count = collection.count()
+        version.save(update_fields=['dimension', 'document_count', 'updated_at'])
+
+        if options['clusters'] is not None:
+            if not hasattr(collection, 'train_clusters'):
+                self.stderr.write("--clusters only applies to the numpy vector backend; skipped.")
+            else:
+                nlist = collection.train_clusters(nlist=options['clusters'] or None)
+                self.stdout.write(f"Trained {nlist} clusters.")
+        report_food_label_index(validate_food_label_index(collection))
+
+    def _add(self, collection, scans):
+        if not scans:
+            return 0
+        collection.add(
+            documents=[build_label_document(scan.parsed_data) for scan in scans],
+            metadatas=[label_document_metadata(scan) for scan in scans],
+            ids=[label_document_id(scan.pk) for scan in scans],
+        )
+        self.stdout.write(f"  added up to scan {scans[-1].pk}")
+        return len(scans)
@@ -0,0 +1,39 @@
+# petfood_analyzer/management/commands/reconcile_vector_index.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from PetPalAI.vector_sync import reconcile_food_label_index
+
+
+class Command(BaseCommand):
+    help = ("Finds drift between FoodLabelScan rows and the active food label vector index and repairs "
+            "it: upserts missing documents and documents whose text or metadata are out of date, and "
+            "deletes documents whose scan is gone or has no ingredients.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without changing the index.")
+        parser.add_argument('--ids-only', action='store_true',
+                            help="Compare document ids only; skip reading documents to find stale content.")
+        parser.add_argument('--batch-size', type=int, default=256,
+                            help="Documents per read, embedding request and write.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        report = reconcile_food_label_index(
+            batch_size=max(1, options['batch_size']),
+            check_content=not options['ids_only'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(
+            f"{report['expected']} scans expected, {report['indexed']} documents indexed: "
+            f"{report['missing']} missing, {report['orphaned']} orphaned, {report['stale']} stale "
+            f"({time.perf_counter() - start:.1f}s)."
+        )
+        if options['dry_run']:
+            return
+        if report['repaired']:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {report['repaired']} document(s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Index is in sync."))
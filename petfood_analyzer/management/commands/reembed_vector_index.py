@@ -0,0 +1,51 @@
+# petfood_analyzer/management/commands/reembed_vector_index.py
+from django.core.management.base import BaseCommand
+
+from petfood_analyzer.models import VectorIndexVersion
+from PetPalAI.utils import get_vector_store_config, is_current_version
+from PetPalAI.vector_versions import collect_garbage, reembed_food_label_index
+
+
+class Command(BaseCommand):
+    help = ("Re-embeds the food label vector index into a new version when the configured embedding "
+            "model or label document schema has changed, while queries are served from the current "
+            "version; then switches over and deletes the old version after a grace period. "
+            "Interrupted builds resume from their checkpoint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=256,
+                            help="Scans per embedding request.")
+        parser.add_argument('--force', action='store_true',
+                            help="Build a new version even if the active one is current.")
+        parser.add_argument('--no-gc', action='store_true',
+                            help="Switch over without waiting to delete the old version "
+                                 "(a later run, or --gc, collects it).")
+        parser.add_argument('--gc', action='store_true',
+                            help="Only delete retired versions past the grace period.")
+        parser.add_argument('--status', action='store_true',
+                            help="List index versions and exit.")
+
+    def handle(self, *args, **options):
+        if options['status']:
+            config = get_vector_store_config()
+            for version in VectorIndexVersion.objects.order_by('backend', 'pk'):
+                current = "current" if is_current_version(version, config) else "stale"
+                self.stdout.write(
+                    f"{version.backend:<7}{version.collection_name:<32}{version.status:<10}{current:<9}"
+                    f"{version.embedding_model:<24}dim={version.dimension} schema={version.schema_version} "
+                    f"docs={version.document_count}"
+                )
+            return
+
+        log = self.stdout.write
+        if options['gc']:
+            deleted = collect_garbage(log=log)
+            self.stdout.write(f"Deleted {deleted} retired version(s).")
+            return
+
+        reembed_food_label_index(
+            batch_size=max(1, options['batch_size']),
+            force=options['force'],
+            wait_for_gc=not options['no_gc'],
+            log=log,
+        )
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petfood_analyzer', '0002_foodlabelscan_calorie_content_kcal_per_kg_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelResultCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_hash', models.CharField(help_text='SHA-256 hex digest of the uploaded image bytes.', max_length=64)),
+                ('ocr_config_key', models.CharField(help_text='Hash of the OCR preprocessing config used to produce raw_text.', max_length=64)),
+                ('analysis_version', models.CharField(help_text="Prompt version and model used to produce ai_analysis (e.g. 'v1:llama3.2').", max_length=100)),
+                ('raw_text', models.TextField(blank=True)),
+                ('parsed_data', models.JSONField(default=dict)),
+                ('ai_analysis', models.TextField(blank=True)),
+                ('calorie_content_kcal_per_kg', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('calorie_content_per_unit', models.CharField(blank=True, max_length=100, null=True)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Label Result Cache Entry',
+                'verbose_name_plural': 'Label Result Cache',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='labelresultcache',
+            constraint=models.UniqueConstraint(fields=('image_hash', 'ocr_config_key', 'analysis_version'), name='unique_label_result_cache_key'),
+        ),
+    ]
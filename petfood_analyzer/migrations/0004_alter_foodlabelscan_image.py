@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:53
+
+from django.db import migrations, models
+import petfood_analyzer.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petfood_analyzer', '0003_labelresultcache_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='foodlabelscan',
+            name='image',
+            field=models.ImageField(help_text='The uploaded image file of the pet food label.', storage=petfood_analyzer.storage.ContentAddressedStorage(), upload_to='pet_food_labels/'),
+        ),
+    ]
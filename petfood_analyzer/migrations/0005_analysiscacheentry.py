@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:59
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petfood_analyzer', '0004_alter_foodlabelscan_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(help_text='SHA-256 of the canonical parsed data, pet/food type, prompt version, model and options.', max_length=64, unique=True)),
+                ('pet_type', models.CharField(blank=True, max_length=20)),
+                ('food_type', models.CharField(blank=True, max_length=20)),
+                ('analysis_version', models.CharField(max_length=100)),
+                ('ai_analysis', models.TextField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'AI Analysis Cache Entry',
+                'verbose_name_plural': 'AI Analysis Cache',
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petfood_analyzer', '0005_analysiscacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodlabelscan',
+            name='fat_percent',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Crude fat (%, as fed) from the guaranteed analysis.', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='foodlabelscan',
+            name='fiber_percent',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Crude fiber (%, as fed) from the guaranteed analysis.', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='foodlabelscan',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(blank=True, help_text='Number of top-level ingredients parsed from the label.', null=True),
+        ),
+        migrations.AddField(
+            model_name='foodlabelscan',
+            name='moisture_percent',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Moisture (%) from the guaranteed analysis.', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='foodlabelscan',
+            name='protein_percent',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Crude protein (%, as fed) from the guaranteed analysis.', max_digits=5, null=True),
+        ),
+        migrations.AlterField(
+            model_name='foodlabelscan',
+            name='product_name',
+            field=models.CharField(blank=True, db_index=True, help_text='User-provided or AI-extracted name of the pet food product.', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='foodlabelscan',
+            index=models.Index(fields=['pet_type', 'food_type', 'protein_percent'], name='scan_type_protein_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodlabelscan',
+            index=models.Index(fields=['pet_type', 'food_type', 'fat_percent'], name='scan_type_fat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodlabelscan',
+            index=models.Index(fields=['pet_type', 'food_type', 'fiber_percent'], name='scan_type_fiber_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodlabelscan',
+            index=models.Index(fields=['pet_type', 'food_type', 'moisture_percent'], name='scan_type_moisture_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodlabelscan',
+            index=models.Index(fields=['pet_type', 'food_type', 'ingredient_count'], name='scan_type_ingr_count_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petfood_analyzer', '0006_foodlabelscan_fat_percent_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorIndexVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('backend', models.CharField(help_text="Vector backend holding the collection ('chroma' or 'numpy').", max_length=20)),
+                ('collection_name', models.CharField(help_text='Name of the physical collection (Chroma collection or NumPy index directory).', max_length=255)),
+                ('embedding_model', models.CharField(help_text="Embedding model that produced the vectors (e.g. 'nomic-embed-text').", max_length=100)),
+                ('dimension', models.PositiveIntegerField(blank=True, help_text='Vector dimension; recorded from the first embedded batch.', null=True)),
+                ('schema_version', models.PositiveIntegerField(help_text='Version of the label document text and metadata (views.LABEL_DOCUMENT_SCHEMA).')),
+                ('status', models.CharField(choices=[('building', 'Building'), ('active', 'Active'), ('retired', 'Retired')], db_index=True, default='building', max_length=20)),
+                ('last_scan_id', models.BigIntegerField(default=0, help_text='Re-embedding checkpoint: scans up to this id have been written to the collection.')),
+                ('document_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+                ('retired_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Vector Index Version',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vectorindexversion',
+            constraint=models.UniqueConstraint(fields=('backend', 'collection_name'), name='unique_vector_index_collection'),
+        ),
+        migrations.AddConstraint(
+            model_name='vectorindexversion',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('backend',), name='one_active_vector_index_per_backend'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petfood_analyzer', '0007_vectorindexversion_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodlabelscan',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Last save; in-memory indexes in other processes re-read scans changed since their last sync.'),
+        ),
+    ]
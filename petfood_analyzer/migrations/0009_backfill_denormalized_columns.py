@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+from petfood_analyzer.label_parser import percent_value
+
+# FoodLabelScan.NUTRIENT_COLUMNS at the time of this migration.
+NUTRIENT_COLUMNS = {
+    'protein_percent': 'crude_protein',
+    'fat_percent': 'crude_fat',
+    'fiber_percent': 'crude_fiber',
+    'moisture_percent': 'moisture',
+}
+FIELDS = list(NUTRIENT_COLUMNS) + ['ingredient_count', 'product_name', 'updated_at']
+
+
+def backfill(apps, schema_editor):
+    """
+    Fills the columns added in 0006 for scans saved before it (the same values as
+    FoodLabelScan.apply_parsed_data). The vector index decides which scans have a
+    document from ingredient_count, so it must not stay NULL for legacy rows.
+    """
+    FoodLabelScan = apps.get_model('petfood_analyzer', 'FoodLabelScan')
+    last_id, now = 0, timezone.now()
+    while True:
+        chunk = list(
+            FoodLabelScan.objects.filter(id__gt=last_id, ingredient_count__isnull=True)
+            .order_by('id').only('id', 'parsed_data', *FIELDS)[:1000]
+        )
+        if not chunk:
+            break
+        updates = []
+        for scan in chunk:
+            parsed_data = scan.parsed_data or {}
+            ingredients = parsed_data.get('ingredients')
+            if not ingredients:
+                continue
+            analysis = parsed_data.get('guaranteed_analysis') or {}
+            for column, key in NUTRIENT_COLUMNS.items():
+                value = percent_value(analysis.get(key))
+                setattr(scan, column, Decimal(f"{value:.2f}") if value is not None else None)
+            scan.ingredient_count = len(ingredients)
+            if not scan.product_name and parsed_data.get('product_name'):
+                scan.product_name = parsed_data['product_name'][:255]
+            scan.updated_at = now
+            updates.append(scan)
+        FoodLabelScan.objects.bulk_update(updates, FIELDS)
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petfood_analyzer', '0008_foodlabelscan_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
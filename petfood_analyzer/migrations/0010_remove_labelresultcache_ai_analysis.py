@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:46
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petfood_analyzer', '0009_backfill_denormalized_columns'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='labelresultcache',
+            name='ai_analysis',
+        ),
+    ]
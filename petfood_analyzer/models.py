@@ -1,7 +1,12 @@
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth import get_user_model # To get the User model
 from django.utils import timezone # For default datetime values
 
+from .label_parser import percent_value
+from .storage import label_image_storage
+
 # Get the custom user model if defined, or Django's default User model
 # This makes the model flexible to use with custom user models later.
 User = get_user_model()
@@ -36,9 +41,11 @@ class FoodLabelScan(models.Model):
         help_text="The type of pet type (e.g., Dog, Cat, Bird)."
     )
     # Original Image File
-    # Stores the uploaded image file. Images will be saved in MEDIA_ROOT/pet_food_labels/
+    # Stores the uploaded image file. Images are content-addressed under
+    # MEDIA_ROOT/pet_food_labels/<sha[:2]>/<sha256>.<ext>, so identical uploads share one file.
     image = models.ImageField(
         upload_to='pet_food_labels/',
+        storage=label_image_storage,
         help_text="The uploaded image file of the pet food label."
     )
 
@@ -85,6 +92,7 @@ class FoodLabelScan(models.Model):
     product_name = models.CharField(
         max_length=255, # Max length for the name
         blank=True,     # Allow empty if not provided or extracted
+        db_index=True,
         help_text="User-provided or AI-extracted name of the pet food product."
     )
 
@@ -104,12 +112,87 @@ class FoodLabelScan(models.Model):
         help_text="The type of pet food product (e.g., Dry, Wet, Treat)."
     )
 
+    # Denormalized Guaranteed Analysis
+    # Copies of the main parsed_data values as real columns, so filters such as
+    # "protein >= 30%" and sorting run in the database. Set by apply_parsed_data(), which
+    # save() calls whenever it writes parsed_data.
+    protein_percent = models.DecimalField(
+        max_digits=5, decimal_places=2, blank=True, null=True,
+        help_text="Crude protein (%, as fed) from the guaranteed analysis."
+    )
+    fat_percent = models.DecimalField(
+        max_digits=5, decimal_places=2, blank=True, null=True,
+        help_text="Crude fat (%, as fed) from the guaranteed analysis."
+    )
+    fiber_percent = models.DecimalField(
+        max_digits=5, decimal_places=2, blank=True, null=True,
+        help_text="Crude fiber (%, as fed) from the guaranteed analysis."
+    )
+    moisture_percent = models.DecimalField(
+        max_digits=5, decimal_places=2, blank=True, null=True,
+        help_text="Moisture (%) from the guaranteed analysis."
+    )
+    ingredient_count = models.PositiveIntegerField(
+        blank=True, null=True,
+        help_text="Number of top-level ingredients parsed from the label."
+    )
+
     # Timestamp of Scan
     # Automatically records when the label was uploaded/scanned.
     scanned_at = models.DateTimeField(
         default=timezone.now, # Sets the current time when the object is first created
         help_text="The date and time when the label was scanned."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True,
+        help_text="Last save; in-memory indexes in other processes re-read scans changed since their last sync."
+    )
+
+    # parsed_data["guaranteed_analysis"] key for each denormalized column
+    NUTRIENT_COLUMNS = {
+        'protein_percent': 'crude_protein',
+        'fat_percent': 'crude_fat',
+        'fiber_percent': 'crude_fiber',
+        'moisture_percent': 'moisture',
+    }
+    # Columns written by apply_parsed_data()
+    DENORMALIZED_FIELDS = tuple(NUTRIENT_COLUMNS) + ('ingredient_count', 'product_name')
+
+    def apply_parsed_data(self):
+        """
+        Copies the filterable values out of parsed_data into their columns.
+        save() does this itself; call it after setting parsed_data on instances written
+        with bulk_create/bulk_update, which do not call save(). A user-provided
+        product_name is kept.
+        """
+        parsed_data = self.parsed_data or {}
+        analysis = parsed_data.get('guaranteed_analysis') or {}
+        for column, key in self.NUTRIENT_COLUMNS.items():
+            value = percent_value(analysis.get(key))
+            setattr(self, column, Decimal(f"{value:.2f}") if value is not None else None)
+        ingredients = parsed_data.get('ingredients')
+        self.ingredient_count = len(ingredients) if ingredients else None
+        if not self.product_name and parsed_data.get('product_name'):
+            self.product_name = parsed_data['product_name'][:255]
+        return self
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if 'parsed_data' not in self.get_deferred_fields() and (
+                update_fields is None or 'parsed_data' in update_fields):
+            self.apply_parsed_data()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.DENORMALIZED_FIELDS)
+        super().save(*args, **kwargs)
+
+    # Downscaled copies of the label image, generated on first access.
+    @property
+    def display_image_url(self):
+        return self.image.storage.variant_url(self.image.name, "display") if self.image else ""
+
+    @property
+    def thumbnail_url(self):
+        return self.image.storage.variant_url(self.image.name, "thumbnail") if self.image else ""
 
     # Readable string representation of the object
     def __str__(self):
@@ -121,4 +204,137 @@ class FoodLabelScan(models.Model):
     class Meta:
         verbose_name = "Food Label Scan"
         verbose_name_plural = "Food Label Scans"
-        ordering = ['-scanned_at'] # Default ordering: most recent first
\ No newline at end of file
+        ordering = ['-scanned_at'] # Default ordering: most recent first
+        # Common catalogue filters: "dry dog foods with protein >= 30%, highest first".
+        indexes = [
+            models.Index(fields=['pet_type', 'food_type', 'protein_percent'], name='scan_type_protein_idx'),
+            models.Index(fields=['pet_type', 'food_type', 'fat_percent'], name='scan_type_fat_idx'),
+            models.Index(fields=['pet_type', 'food_type', 'fiber_percent'], name='scan_type_fiber_idx'),
+            models.Index(fields=['pet_type', 'food_type', 'moisture_percent'], name='scan_type_moisture_idx'),
+            models.Index(fields=['pet_type', 'food_type', 'ingredient_count'], name='scan_type_ingr_count_idx'),
+        ]
+
+class LabelResultCache(models.Model):
+    """
+    Cached OCR and parse output for a label image, keyed on the SHA-256 of the
+    uploaded bytes plus the OCR config and the analysis prompt/model version.
+    Re-uploads of the same photo are served from here without running
+    Tesseract again. The AI analysis depends on the pet and food type as well,
+    so it lives in AnalysisCacheEntry (analysis_cache.py) instead.
+    """
+    image_hash = models.CharField(
+        max_length=64,
+        help_text="SHA-256 hex digest of the uploaded image bytes."
+    )
+    ocr_config_key = models.CharField(
+        max_length=64,
+        help_text="Hash of the OCR preprocessing config used to produce raw_text."
+    )
+    analysis_version = models.CharField(
+        max_length=100,
+        help_text="Prompt version and model used to produce ai_analysis (e.g. 'v1:llama3.2')."
+    )
+    raw_text = models.TextField(blank=True)
+    parsed_data = models.JSONField(default=dict)
+    calorie_content_kcal_per_kg = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    calorie_content_per_unit = models.CharField(max_length=100, blank=True, null=True)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.image_hash[:12]} ({self.analysis_version}, {self.hit_count} hits)"
+
+    class Meta:
+        verbose_name = "Label Result Cache Entry"
+        verbose_name_plural = "Label Result Cache"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['image_hash', 'ocr_config_key', 'analysis_version'],
+                name='unique_label_result_cache_key',
+            ),
+        ]
+
+
+class AnalysisCacheEntry(models.Model):
+    """
+    Cached AI pros/cons for a canonicalized set of parsed nutrition data.
+    Different photos of the same product (same normalized data, pet type and
+    food type) reuse one LLM answer. Entries expire after a TTL and the table
+    is trimmed to a maximum size, least recently used first.
+    """
+    cache_key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 of the canonical parsed data, pet/food type, prompt version, model and options."
+    )
+    pet_type = models.CharField(max_length=20, blank=True)
+    food_type = models.CharField(max_length=20, blank=True)
+    analysis_version = models.CharField(max_length=100)
+    ai_analysis = models.TextField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.cache_key[:12]} ({self.pet_type}/{self.food_type}, {self.hit_count} hits)"
+
+    class Meta:
+        verbose_name = "AI Analysis Cache Entry"
+        verbose_name_plural = "AI Analysis Cache"
+
+
+class VectorIndexVersion(models.Model):
+    """
+    One physical collection of the food label vector index, with the embedding
+    model, vector dimension and label document schema it was built with. Exactly
+    one version per backend is active and serves queries; a model or schema
+    change builds a new version in the background, switches to it in one
+    transaction and garbage-collects the old one (see PetPalAI/vector_versions.py).
+    """
+    STATUS_CHOICES = [
+        ('building', 'Building'),
+        ('active', 'Active'),
+        ('retired', 'Retired'),
+    ]
+    backend = models.CharField(
+        max_length=20,
+        help_text="Vector backend holding the collection ('chroma' or 'numpy')."
+    )
+    collection_name = models.CharField(
+        max_length=255,
+        help_text="Name of the physical collection (Chroma collection or NumPy index directory)."
+    )
+    embedding_model = models.CharField(
+        max_length=100,
+        help_text="Embedding model that produced the vectors (e.g. 'nomic-embed-text')."
+    )
+    dimension = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Vector dimension; recorded from the first embedded batch."
+    )
+    schema_version = models.PositiveIntegerField(
+        help_text="Version of the label document text and metadata (views.LABEL_DOCUMENT_SCHEMA)."
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='building', db_index=True)
+    last_scan_id = models.BigIntegerField(
+        default=0,
+        help_text="Re-embedding checkpoint: scans up to this id have been written to the collection."
+    )
+    document_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+    retired_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.collection_name} ({self.backend}, {self.embedding_model}, schema {self.schema_version}, {self.status})"
+
+    class Meta:
+        verbose_name = "Vector Index Version"
+        constraints = [
+            models.UniqueConstraint(fields=['backend', 'collection_name'], name='unique_vector_index_collection'),
+            models.UniqueConstraint(
+                fields=['backend'], condition=models.Q(status='active'), name='one_active_vector_index_per_backend'
+            ),
+        ]
@@ -0,0 +1,181 @@
+# petfood_analyzer/nutrient_matrix.py
+"""
+In-memory nutrient matrix over all FoodLabelScan rows.
+
+Guaranteed-analysis values are read from the denormalized FoodLabelScan
+columns (protein_percent etc., filled from parsed_data on save) and kept as
+NumPy float arrays (one row per scan, NaN where a value is missing) so
+dry-matter conversion, per-1000-kcal density and ranking across the whole
+catalogue are single vectorized expressions.
+
+The matrix is loaded once per process and refreshed incrementally: each
+refresh re-reads the scans saved or deleted since the last one, in any
+process (see scan_sync.py), and the post_save/post_delete signals keep rows
+that change in this process current in between.
+"""
+import threading
+
+import numpy as np
+
+from .scan_sync import ScanSync
+
+NUTRIENTS = ("protein", "fat", "fiber", "moisture")
+
+# FoodLabelScan column for each matrix column
+NUTRIENT_COLUMNS = {
+    "protein": "protein_percent",
+    "fat": "fat_percent",
+    "fiber": "fiber_percent",
+    "moisture": "moisture_percent",
+}
+
+SCAN_FIELDS = ("id", "pet_type", "food_type", "product_name", "calorie_content_kcal_per_kg") + tuple(
+    NUTRIENT_COLUMNS.values()
+)
+
+
+def _scan_row(scan):
+    values = [getattr(scan, NUTRIENT_COLUMNS[n]) for n in NUTRIENTS] + [scan.calorie_content_kcal_per_kg]
+    return [np.nan if value is None else float(value) for value in values]
+
+
+class NutrientMatrix:
+    """
+    Columns: protein, fat, fiber, moisture (% as fed) and kcal_per_kg.
+    Row order is arbitrary; `ids` maps rows to FoodLabelScan primary keys.
+    """
+    COLUMNS = NUTRIENTS + ("kcal_per_kg",)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, len(self.COLUMNS)), dtype=np.float64)
+        self.pet_types = np.empty(0, dtype=object)
+        self.food_types = np.empty(0, dtype=object)
+        self.product_names = np.empty(0, dtype=object)
+        self.sync = ScanSync(SCAN_FIELDS)
+
+    # --- maintenance --------------------------------------------------------------------
+
+    def _add_scans(self, scans):
+        self.ids = np.concatenate([self.ids, np.array([s.id for s in scans], dtype=np.int64)])
+        self.values = np.vstack([self.values, np.array([_scan_row(s) for s in scans], dtype=np.float64)])
+        self.pet_types = np.concatenate([self.pet_types, np.array([s.pet_type for s in scans], dtype=object)])
+        self.food_types = np.concatenate([self.food_types, np.array([s.food_type for s in scans], dtype=object)])
+        self.product_names = np.concatenate([
+            self.product_names, np.array([s.product_name for s in scans], dtype=object),
+        ])
+
+    def _drop_scans(self, scan_ids):
+        keep = ~np.isin(self.ids, np.asarray(list(scan_ids), dtype=np.int64))
+        self.ids = self.ids[keep]
+        self.values = self.values[keep]
+        self.pet_types = self.pet_types[keep]
+        self.food_types = self.food_types[keep]
+        self.product_names = self.product_names[keep]
+
+    def refresh(self, batch_size=2000):
+        """Loads scans saved or deleted (in any process) since the last refresh."""
+        with self._lock:
+            self.sync.refresh(self, batch_size)
+
+    def upsert(self, scan):
+        """Replaces (or appends) the row for one scan. Called from post_save."""
+        with self._lock:
+            self.sync.replace(self, [scan])
+
+    def remove(self, scan_id):
+        with self._lock:
+            self.sync.drop(self, [scan_id])
+
+    # --- computation --------------------------------------------------------------------
+
+    def compute(self, mask=None):
+        """
+        Returns a dict of column arrays for the selected rows:
+        as-fed %, dry-matter %, and grams per 1000 kcal.
+        """
+        values = self.values if mask is None else self.values[mask]
+        protein, fat, fiber, moisture, kcal = values.T
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dry_matter = 100.0 - moisture
+            dm_factor = np.where(dry_matter > 0, 100.0 / dry_matter, np.nan)
+            # g per 1000 kcal = (% * 10 g/kg) / (kcal/kg) * 1000
+            kcal_factor = np.where(kcal > 0, 10000.0 / kcal, np.nan)
+
+            nutrients = np.stack([protein, fat, fiber])
+            dm = nutrients * dm_factor
+            per_1000_kcal = nutrients * kcal_factor
+
+        result = {"moisture": moisture, "kcal_per_kg": kcal, "dry_matter": dry_matter}
+        for i, name in enumerate(("protein", "fat", "fiber")):
+            result[name] = nutrients[i]
+            result[f"{name}_dm"] = dm[i]
+            result[f"{name}_per_1000kcal"] = per_1000_kcal[i]
+        return result
+
+    def select(self, ids=None, pet_type=None, food_type=None):
+        mask = np.ones(len(self.ids), dtype=bool)
+        if ids is not None:
+            mask &= np.isin(self.ids, np.asarray(list(ids), dtype=np.int64))
+        if pet_type:
+            mask &= self.pet_types == pet_type
+        if food_type:
+            mask &= self.food_types == food_type
+        return mask
+
+    def compare(self, ids=None, pet_type=None, food_type=None, sort="protein_dm", descending=True, limit=50):
+        """
+        Ranks the selected scans by `sort` (any key of compute()). Rows with no
+        value for the sort metric are ranked last. Returns a list of dicts.
+        """
+        with self._lock:
+            mask = self.select(ids, pet_type, food_type)
+            metrics = self.compute(mask)
+            if sort not in metrics:
+                raise ValueError(f"Unknown sort metric '{sort}'. Choose one of: {', '.join(sorted(metrics))}.")
+
+            key = metrics[sort]
+            key = np.where(np.isnan(key), -np.inf if descending else np.inf, key)
+            order = np.argsort(-key if descending else key, kind="stable")[:limit]
+
+            selected_ids = self.ids[mask][order]
+            names = self.product_names[mask][order]
+            columns = {name: column[order] for name, column in metrics.items()}
+
+        results = []
+        for rank, (scan_id, name) in enumerate(zip(selected_ids, names), start=1):
+            row = {name_: _json_float(col[rank - 1]) for name_, col in columns.items()}
+            results.append({
+                "rank": rank,
+                "scan_id": int(scan_id),
+                "product_name": name,
+                "as_fed": {k: row[k] for k in ("protein", "fat", "fiber", "moisture", "kcal_per_kg")},
+                "dry_matter": {k: row[f"{k}_dm"] for k in ("protein", "fat", "fiber")},
+                "per_1000_kcal_g": {k: row[f"{k}_per_1000kcal"] for k in ("protein", "fat", "fiber")},
+            })
+        return results
+
+
+def _json_float(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+_matrix = None
+_matrix_lock = threading.Lock()
+
+
+def get_nutrient_matrix():
+    """Process-wide matrix, loaded lazily and synced with the table on every call."""
+    global _matrix
+    with _matrix_lock:
+        if _matrix is None:
+            _matrix = NutrientMatrix()
+    _matrix.refresh()
+    return _matrix
+
+
+def loaded_nutrient_matrix():
+    """The matrix if this process has already built it, else None (used by signal handlers)."""
+    return _matrix
@@ -0,0 +1,146 @@
+# petfood_analyzer/ocr.py
+"""
+OCR entry point for pet food label images.
+
+Two modes are available:
+- "single": one pytesseract.image_to_string call on the whole (preprocessed) image.
+- "tiled":  the image is cut into overlapping horizontal bands that are OCR'd in
+            parallel, and the band texts are stitched back together with the lines
+            duplicated by the overlaps removed.
+"auto" picks "tiled" only when the image is tall enough to yield several bands.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+import numpy as np
+from PIL import Image
+import pytesseract
+from django.conf import settings
+
+from .preprocessing import get_preprocessing_config, preprocess_for_ocr
+
+pytesseract.pytesseract.tesseract_cmd = r'/usr/local/bin/tesseract' # local machine path
+
+OCR_MODES = ("single", "tiled", "auto")
+
+DEFAULT_TILING = {
+    "band_height": 600,  # nominal band height in pixels (after preprocessing)
+    "overlap": 80,       # pixels shared by neighbouring bands
+    "workers": None,     # None -> os.cpu_count()
+}
+
+
+def get_ocr_mode(mode=None):
+    mode = mode or getattr(settings, "LABEL_OCR_MODE", "single")
+    if mode not in OCR_MODES:
+        raise ValueError(f"Unknown OCR mode '{mode}'. Expected one of {', '.join(OCR_MODES)}.")
+    return mode
+
+
+def get_tiling_config(**overrides):
+    config = dict(DEFAULT_TILING)
+    config.update(getattr(settings, "LABEL_OCR_TILING", {}))
+    config.update(overrides)
+    return config
+
+
+def split_into_bands(image, band_height, overlap):
+    """
+    Returns (top, bottom) row ranges covering the image in overlapping bands.
+    Each cut is nudged to the emptiest row near its nominal position so that
+    bands tend to start and end in the whitespace between text lines.
+    """
+    height = image.height
+    if height <= band_height + overlap:
+        return [(0, height)]
+
+    gray = np.asarray(image.convert("L"), dtype=np.float32)
+    ink_per_row = (gray < 128).sum(axis=1)
+    search = max(1, overlap // 2)
+
+    bands = []
+    top = 0
+    while top < height:
+        nominal = top + band_height
+        if nominal + overlap >= height:
+            bands.append((top, height))
+            break
+        lo, hi = nominal - search, min(height, nominal + search)
+        cut = lo + int(np.argmin(ink_per_row[lo:hi]))
+        bands.append((top, min(height, cut + overlap)))
+        top = cut
+    return bands
+
+
+def _ocr_band(image):
+    return pytesseract.image_to_string(image)
+
+
+def _normalize_line(line):
+    return re.sub(r"\s+", " ", line).strip().lower()
+
+
+def _lines_match(a, b):
+    a, b = _normalize_line(a), _normalize_line(b)
+    if not a or not b:
+        return a == b
+    return a == b or SequenceMatcher(None, a, b).ratio() >= 0.8
+
+
+def _overlap_length(previous, current, max_lines=6):
+    """Number of leading lines of `current` that repeat the trailing lines of `previous`."""
+    for k in range(min(len(previous), len(current), max_lines), 0, -1):
+        if all(_lines_match(p, c) for p, c in zip(previous[-k:], current[:k])):
+            return k
+    return 0
+
+
+def stitch_band_texts(texts):
+    """Joins band OCR output top to bottom, dropping lines repeated by the band overlaps."""
+    lines = []
+    for text in texts:
+        band_lines = [line for line in text.splitlines() if line.strip()]
+        lines.extend(band_lines[_overlap_length(lines, band_lines):])
+    return "\n".join(lines)
+
+
+def ocr_tiled(image, tiling=None):
+    """
+    OCRs the bands of `image` in parallel. Tesseract runs as a child process per
+    call, so a thread pool is enough to keep every core busy without pickling
+    image data between Python processes. Run with OMP_THREAD_LIMIT=1 so each
+    Tesseract process sticks to one core.
+    """
+    tiling = tiling or get_tiling_config()
+    bands = split_into_bands(image, tiling["band_height"], tiling["overlap"])
+    if len(bands) == 1:
+        return pytesseract.image_to_string(image)
+
+    crops = [image.crop((0, top, image.width, bottom)) for top, bottom in bands]
+    workers = min(len(crops), tiling["workers"] or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        texts = list(executor.map(_ocr_band, crops))
+    return stitch_band_texts(texts)
+
+
+def extract_label_text(image_path, preprocessing=None, mode=None, tiling=None):
+    """
+    Opens the label image, runs the preprocessing pipeline and returns the OCR text.
+    `preprocessing` is a config dict (see preprocessing.get_preprocessing_config);
+    None means "use the project settings". `mode` selects single/tiled/auto OCR
+    (default: settings.LABEL_OCR_MODE).
+    """
+    config = preprocessing if preprocessing is not None else get_preprocessing_config()
+    mode = get_ocr_mode(mode)
+    tiling = tiling or get_tiling_config()
+
+    with Image.open(image_path) as image:
+        processed = preprocess_for_ocr(image, config)
+
+    if mode == "auto":
+        mode = "tiled" if processed.height >= 2 * tiling["band_height"] else "single"
+    if mode == "tiled":
+        return ocr_tiled(processed, tiling).strip()
+    return pytesseract.image_to_string(processed).strip()
@@ -0,0 +1,219 @@
+# petfood_analyzer/rag_context.py
+"""
+Builds the label context pasted into the agent's food-question prompt.
+
+Retrieval often returns several scans of the same product, which cost prompt
+tokens (prompt evaluation is the slow part on a CPU Ollama) without adding
+anything. assemble_context():
+
+  1. drops near-duplicate passages: MinHash signatures over word shingles,
+     keeping the best-ranked copy of each cluster;
+  2. ranks what is left by how many of the question's terms each passage
+     covers, with retrieval order as the tie-break;
+  3. keeps only the label fields the question is about (ingredients or the
+     guaranteed analysis) and shortens long ingredient lists;
+  4. packs passages into a token budget, cutting the last one to fit.
+
+Token counts are estimated from characters (no tokenizer is needed); the
+returned stats are logged per query by the orchestrator.
+"""
+import hashlib
+import math
+import re
+
+import numpy as np
+from django.conf import settings
+
+from .retrieval import tokenize
+
+DEFAULT_RAG_CONTEXT = {
+    "max_tokens": 1200,          # budget for the label context, not the whole prompt
+    "chars_per_token": 4.0,      # rough average for English text with Llama tokenizers
+    "shingle_size": 3,           # words per shingle
+    "num_perm": 64,              # MinHash permutations
+    "duplicate_threshold": 0.8,  # estimated Jaccard similarity at which passages are merged
+    "max_ingredients": 25,       # longer ingredient lists are cut, the first ones matter most
+    "min_passage_tokens": 40,    # don't pack a cut-down passage smaller than this
+}
+
+SEPARATOR = "\n---\n"
+
+_FIELD_RE = re.compile(r"^([A-Za-z ]+):\s?(.*)$")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Question words that say which part of a label is being asked about.
+INGREDIENT_TERMS = frozenset(
+    "ingredient ingredients contain contains containing made grain grains gluten allergy allergic "
+    "allergies allergen allergens additive additives preservative preservatives byproduct by-product "
+    "meal filler fillers corn soy wheat".split()
+)
+ANALYSIS_TERMS = frozenset(
+    "protein fat fats fiber fibre moisture calorie calories kcal energy analysis nutrient nutrients "
+    "nutrition nutritional ash carbohydrate carbohydrates carbs percent".split()
+)
+
+
+def get_rag_context_config():
+    config = dict(DEFAULT_RAG_CONTEXT)
+    config.update(getattr(settings, "RAG_CONTEXT", {}))
+    return config
+
+
+def estimate_tokens(text, chars_per_token=DEFAULT_RAG_CONTEXT["chars_per_token"]):
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+# --- near-duplicate detection ---------------------------------------------------------------
+
+def shingles(text, size=3):
+    """Set of word n-grams of `text` (the whole text when it is shorter than `size`)."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _permutations(num_perm):
+    # Fixed seed: signatures must be comparable across calls.
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signature(shingle_set, num_perm=64):
+    """MinHash signature (num_perm uint64 values) of a set of strings."""
+    if not shingle_set:
+        return np.full(num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+         for s in shingle_set),
+        dtype=np.uint64, count=len(shingle_set),
+    )
+    a, b = _permutations(num_perm)
+    # a, hash < 2**32 and b < 2**32, so a * hash + b stays below 2**64.
+    return ((hashes[:, None] * a + b) % np.uint64(_MERSENNE_PRIME)).min(axis=0)
+
+
+def estimated_jaccard(signature_a, signature_b):
+    return float(np.mean(signature_a == signature_b))
+
+
+def remove_near_duplicates(passages, config):
+    """
+    passages: texts in retrieval order. Returns (indexes of the passages kept, number dropped).
+    A passage is dropped when it is a near-duplicate of one kept earlier.
+    """
+    kept, signatures = [], []
+    for i, text in enumerate(passages):
+        signature = minhash_signature(shingles(text, config["shingle_size"]), config["num_perm"])
+        if any(estimated_jaccard(signature, other) >= config["duplicate_threshold"] for other in signatures):
+            continue
+        kept.append(i)
+        signatures.append(signature)
+    return kept, len(passages) - len(kept)
+
+
+# --- trimming and packing -------------------------------------------------------------------
+
+def parse_fields(document):
+    """Label document ("Field: value" lines) -> [(field, value)]."""
+    fields = []
+    for line in document.splitlines():
+        match = _FIELD_RE.match(line.strip())
+        if match:
+            fields.append((match.group(1).strip(), match.group(2).strip()))
+        elif line.strip() and fields:
+            field, value = fields[-1]
+            fields[-1] = (field, f"{value} {line.strip()}")
+    return fields
+
+
+def relevant_fields(query):
+    """Fields to keep for the question: None means all of them."""
+    words = set(re.findall(r"[a-z-]+", (query or "").lower()))
+    wants_ingredients = bool(words & INGREDIENT_TERMS)
+    wants_analysis = bool(words & ANALYSIS_TERMS)
+    if wants_ingredients == wants_analysis:
+        return None
+    return {"Product Name", "Ingredients"} if wants_ingredients else {"Product Name", "Analysis"}
+
+
+def _shorten_ingredients(value, limit):
+    ingredients = [i.strip() for i in value.split(",") if i.strip()]
+    if len(ingredients) <= limit:
+        return value
+    return f"{', '.join(ingredients[:limit])}, ... ({len(ingredients) - limit} more)"
+
+
+def trim_passage(document, keep_fields, config, max_ingredients=None):
+    max_ingredients = config["max_ingredients"] if max_ingredients is None else max_ingredients
+    lines = []
+    for field, value in parse_fields(document) or [("", document)]:
+        if keep_fields is not None and field and field not in keep_fields:
+            continue
+        if field == "Ingredients":
+            value = _shorten_ingredients(value, max_ingredients)
+        lines.append(f"{field}: {value}" if field else value)
+    return "\n".join(lines)
+
+
+def _fit(document, keep_fields, config, budget):
+    """The passage cut down (fewer ingredients, then characters) to fit `budget` tokens, or None."""
+    if budget < config["min_passage_tokens"]:
+        return None
+    limit = config["max_ingredients"]
+    text = trim_passage(document, keep_fields, config, limit)
+    while limit > 5 and estimate_tokens(text, config["chars_per_token"]) > budget:
+        limit //= 2
+        text = trim_passage(document, keep_fields, config, limit)
+    if estimate_tokens(text, config["chars_per_token"]) <= budget:
+        return text
+    max_chars = int(budget * config["chars_per_token"]) - 3
+    return text[:max_chars].rstrip() + "..."
+
+
+def assemble_context(query, documents, config=None):
+    """
+    documents: label documents in retrieval order.
+    Returns {"context", "tokens", "budget", "passages", "duplicates", "truncated"}.
+    """
+    config = config or get_rag_context_config()
+    budget = config["max_tokens"]
+    chars_per_token = config["chars_per_token"]
+
+    kept, duplicates = remove_near_duplicates(documents, config)
+
+    query_terms = set(tokenize(query))
+
+    def coverage(i):
+        return len(query_terms & set(tokenize(documents[i])))
+
+    ranked = sorted(kept, key=lambda i: (-coverage(i), i))
+    keep_fields = relevant_fields(query)
+
+    parts, used, truncated = [], 0, False
+    separator_tokens = estimate_tokens(SEPARATOR, chars_per_token)
+    for i in ranked:
+        overhead = separator_tokens if parts else 0
+        text = trim_passage(documents[i], keep_fields, config)
+        tokens = estimate_tokens(text, chars_per_token)
+        if used + overhead + tokens > budget:
+            text = _fit(documents[i], keep_fields, config, budget - used - overhead)
+            truncated = True
+            if text is None:
+                break
+            tokens = estimate_tokens(text, chars_per_token)
+        parts.append(text)
+        used += overhead + tokens
+        if truncated:
+            break
+
+    return {
+        "context": SEPARATOR.join(parts),
+        "tokens": used,
+        "budget": budget,
+        "passages": len(parts),
+        "duplicates": duplicates,
+        "truncated": truncated,
+    }
@@ -0,0 +1,72 @@
+# petfood_analyzer/result_cache.py
+"""
+Content-hash cache for label processing results (OCR text and parsed data).
+The AI analysis is cached separately per pet and food type (analysis_cache.py).
+"""
+import hashlib
+import json
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LabelResultCache
+from .ocr import get_ocr_mode, get_tiling_config
+from .preprocessing import get_preprocessing_config
+from .storage import hash_image_file
+
+
+def ocr_config_key(config=None, mode=None):
+    """Stable hash of the OCR preprocessing config and mode, so config changes miss the cache."""
+    key = {
+        'preprocessing': config if config is not None else get_preprocessing_config(),
+        'mode': get_ocr_mode(mode),
+    }
+    if key['mode'] != 'single':
+        key['tiling'] = get_tiling_config()
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_cached_result(image_hash, analysis_version, config=None, mode=None):
+    """Returns the cached LabelResultCache entry for this image and OCR mode, or None."""
+    entry = LabelResultCache.objects.filter(
+        image_hash=image_hash,
+        ocr_config_key=ocr_config_key(config, mode),
+        analysis_version=analysis_version,
+    ).first()
+    if entry:
+        LabelResultCache.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1, last_hit_at=timezone.now()
+        )
+    return entry
+
+
+def apply_cached_result(entry, food_scan):
+    """
+    Copies a cached result onto an (unsaved or saved) FoodLabelScan instance. ai_analysis is
+    left for the caller (it depends on the scan's pet and food type), except for labels with
+    no ingredient list, which have nothing to analyze.
+    """
+    food_scan.raw_text = entry.raw_text
+    food_scan.parsed_data = entry.parsed_data
+    if not (entry.parsed_data or {}).get('ingredients'):
+        food_scan.ai_analysis = "AI analysis skipped: No ingredient list found in the label."
+    food_scan.calorie_content_kcal_per_kg = entry.calorie_content_kcal_per_kg
+    food_scan.calorie_content_per_unit = entry.calorie_content_per_unit
+    food_scan.apply_parsed_data()
+    return food_scan
+
+
+def store_result(image_hash, analysis_version, food_scan, config=None, mode=None):
+    """Caches the processed output of a FoodLabelScan under its image hash and OCR mode."""
+    entry, _ = LabelResultCache.objects.update_or_create(
+        image_hash=image_hash,
+        ocr_config_key=ocr_config_key(config, mode),
+        analysis_version=analysis_version,
+        defaults={
+            'raw_text': food_scan.raw_text,
+            'parsed_data': food_scan.parsed_data,
+            'calorie_content_kcal_per_kg': food_scan.calorie_content_kcal_per_kg,
+            'calorie_content_per_unit': food_scan.calorie_content_per_unit,
+        },
+    )
+    return entry
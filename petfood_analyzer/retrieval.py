@@ -0,0 +1,429 @@
+# petfood_analyzer/retrieval.py
+"""
+Hybrid retrieval over scanned labels for the agent's food questions.
+
+Dense similarity alone (the Chroma index) is weak on exact product names,
+brands and specific ingredient terms. This module adds an in-process BM25
+index over each scan's label document plus its OCR raw_text, and fuses the
+two rankings with reciprocal rank fusion (RRF). A query that names a known
+product exactly skips ranking and returns that product's label.
+
+Like the ingredient index, the BM25 index is built once per process, synced
+with scans saved or deleted in any process on each refresh (scan_sync.py),
+and kept current in between by the FoodLabelScan save/delete signals.
+
+Searches can be restricted to a slice of the catalogue with filters
+({"pet_type": [...], "food_type": [...], "user_id": [...]}). They are pushed
+into the vector query as a metadata `where` clause and into BM25 as a set of
+allowed scan ids, so only the matching labels are ranked. For agent queries,
+search_food_labels_for_user scopes by the species of the user's pets, plus
+any species, food type or "my scans" named in the question.
+"""
+import math
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from .models import FoodLabelScan
+from .scan_sync import ScanSync
+
+DEFAULT_RETRIEVAL = {
+    "k1": 1.2,
+    "b": 0.75,
+    "rrf_k": 60,
+    "candidates": 20,          # results taken from each ranker before fusion
+    "min_product_name_chars": 6,
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+_NAME_NORMALIZE_RE = re.compile(r"[^a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its me my of on or "
+    "that the their this to what which with you your any food foods pet".split()
+)
+
+
+# Pet.species -> FoodLabelScan.pet_type values for that species.
+SPECIES_PET_TYPES = {
+    "dog": ["dog"],
+    "cat": ["cat"],
+    "bird": ["bird"],
+    "reptile": ["Snake, Lizards"],
+    "rabbit": ["other"],
+    "other": ["other"],
+}
+# Labels that may suit any species: the model default "OTHER" (the uploader never picked a pet
+# type) and the "other" choice (also the ingest_labels --pet-type default).
+UNCLASSIFIED_PET_TYPES = frozenset(("OTHER", "other"))
+
+_QUERY_PET_TYPES = {
+    "dog": "dog", "dogs": "dog", "puppy": "dog", "puppies": "dog", "canine": "dog",
+    "cat": "cat", "cats": "cat", "kitten": "cat", "kittens": "cat", "feline": "cat",
+    "fish": "fish", "bird": "bird", "birds": "bird", "parrot": "bird", "parrots": "bird",
+    "reptile": "Snake, Lizards", "reptiles": "Snake, Lizards", "snake": "Snake, Lizards",
+    "snakes": "Snake, Lizards", "lizard": "Snake, Lizards", "lizards": "Snake, Lizards",
+}
+_QUERY_FOOD_TYPES = {
+    "dry": "DRY", "kibble": "DRY", "wet": "WET", "canned": "WET", "pouch": "WET", "pouches": "WET",
+    "treat": "TREAT", "treats": "TREAT", "snack": "TREAT", "snacks": "TREAT",
+    "supplement": "SUPPLEMENT", "supplements": "SUPPLEMENT",
+}
+_MY_SCANS_RE = re.compile(
+    r"\b(?:my (?:own )?(?:scans?|labels?|uploads?)|i (?:have |had |'ve )?(?:scanned|uploaded))\b"
+)
+
+FILTER_FIELDS = ("pet_type", "food_type", "user_id")
+
+
+def get_retrieval_config():
+    config = dict(DEFAULT_RETRIEVAL)
+    config.update(getattr(settings, "FOOD_RETRIEVAL", {}))
+    return config
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def normalize_product_name(name):
+    return _NAME_NORMALIZE_RE.sub(" ", (name or "").lower()).strip()
+
+
+def label_document(scan):
+    """Text the agent sees for a scan; same format as the vector store documents."""
+    # Imported here: views imports this app's models and the vector store at module load.
+    from .views import build_label_document
+    return build_label_document(scan.parsed_data or {})
+
+
+def _product_names(scan):
+    names = {normalize_product_name(scan.product_name),
+             normalize_product_name((scan.parsed_data or {}).get("product_name"))}
+    return {name for name in names if name}
+
+
+# --- filters ------------------------------------------------------------------------------
+
+def parse_query_filters(query, user=None):
+    """
+    Filters named explicitly in the question: species ("puppy", "cats"), food type
+    ("kibble", "wet") and, for a signed-in user, "my scans" / "I scanned".
+    """
+    filters = {}
+    words = _TOKEN_RE.findall((query or "").lower())
+    pet_types = sorted({_QUERY_PET_TYPES[w] for w in words if w in _QUERY_PET_TYPES})
+    if pet_types:
+        filters["pet_type"] = pet_types
+    food_types = sorted({_QUERY_FOOD_TYPES[w] for w in words if w in _QUERY_FOOD_TYPES})
+    if food_types:
+        filters["food_type"] = food_types
+    if _is_signed_in(user) and _MY_SCANS_RE.search((query or "").lower()):
+        filters["user_id"] = [user.id]
+    return filters
+
+
+def user_species_filters(user):
+    """{"pet_type": [...]} for the species of the user's pets (plus unclassified labels), or {}."""
+    if not _is_signed_in(user):
+        return {}
+    # Imported here: pet_manager is a separate app and only agent queries need it.
+    from pet_manager.models import Pet
+    species = set(Pet.objects.filter(user=user).values_list("species", flat=True))
+    pet_types = {t for s in species for t in SPECIES_PET_TYPES.get(s, ["other"])}
+    if not pet_types:
+        return {}
+    return {"pet_type": sorted(pet_types | UNCLASSIFIED_PET_TYPES)}
+
+
+def _is_signed_in(user):
+    return user is not None and getattr(user, "is_authenticated", False) and user.username != "guest"
+
+
+def filters_to_where(filters):
+    """Filters -> a Chroma-style metadata `where` clause (None when unfiltered)."""
+    clauses = [
+        {field: {"$in": list(values)}}
+        for field, values in sorted((filters or {}).items()) if values
+    ]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _scan_facets(scan):
+    return {"pet_type": scan.pet_type, "food_type": scan.food_type, "user_id": scan.user_id or 0}
+
+
+class BM25Index:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}        # term -> {scan id: term frequency}
+        self.doc_lengths = {}     # scan id -> token count
+        self.doc_terms = {}       # scan id -> terms (for updates/deletes)
+        self.total_length = 0
+        self.product_names = {}   # normalized product name -> set of scan ids
+        self.scan_names = {}      # scan id -> normalized product names
+        self.facets = {}          # (field, value) -> set of scan ids, for filtered searches
+        self.scan_facets = {}     # scan id -> {field: value}
+        self.sync = ScanSync(("id", "product_name", "parsed_data", "raw_text", "pet_type", "food_type", "user"))
+
+    # --- maintenance --------------------------------------------------------------------
+
+    def _add(self, scan):
+        if not (scan.parsed_data or {}).get("ingredients"):
+            return
+        tokens = tokenize(f"{scan.product_name}\n{label_document(scan)}\n{scan.raw_text}")
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[scan.id] = tf
+        self.doc_terms[scan.id] = tuple(counts)
+        self.doc_lengths[scan.id] = len(tokens)
+        self.total_length += len(tokens)
+
+        names = _product_names(scan)
+        self.scan_names[scan.id] = names
+        for name in names:
+            self.product_names.setdefault(name, set()).add(scan.id)
+
+        facets = _scan_facets(scan)
+        self.scan_facets[scan.id] = facets
+        for field, value in facets.items():
+            self.facets.setdefault((field, value), set()).add(scan.id)
+
+    def _discard(self, scan_id):
+        for term in self.doc_terms.pop(scan_id, ()):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(scan_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(scan_id, 0)
+        for name in self.scan_names.pop(scan_id, ()):
+            ids = self.product_names.get(name)
+            if ids is not None:
+                ids.discard(scan_id)
+                if not ids:
+                    del self.product_names[name]
+        for field, value in self.scan_facets.pop(scan_id, {}).items():
+            ids = self.facets.get((field, value))
+            if ids is not None:
+                ids.discard(scan_id)
+                if not ids:
+                    del self.facets[(field, value)]
+
+    def _add_scans(self, scans):
+        for scan in scans:
+            self._add(scan)
+
+    def _drop_scans(self, scan_ids):
+        for scan_id in scan_ids:
+            self._discard(scan_id)
+
+    def refresh(self, batch_size=1000):
+        """Indexes scans saved or deleted (in any process) since the last refresh."""
+        with self._lock:
+            self.sync.refresh(self, batch_size)
+
+    def upsert(self, scan):
+        """Re-indexes one scan. Called from post_save."""
+        with self._lock:
+            self.sync.replace(self, [scan])
+
+    def remove(self, scan_id):
+        with self._lock:
+            self.sync.drop(self, [scan_id])
+
+    # --- queries ------------------------------------------------------------------------
+
+    def _allowed_ids(self, filters):
+        """Scan ids matching every filtered field (any listed value), or None when unfiltered."""
+        allowed = None
+        for field, values in (filters or {}).items():
+            if not values:
+                continue
+            ids = set().union(*(self.facets.get((field, value), ()) for value in values))
+            allowed = ids if allowed is None else allowed & ids
+            if not allowed:
+                return set()
+        return allowed
+
+    def search(self, query, k=10, config=None, filters=None):
+        """
+        Top-k [(scan id, score)] by Okapi BM25, among the scans matching `filters`.
+        Term statistics (idf, average length) stay those of the whole index.
+        """
+        config = config or get_retrieval_config()
+        k1, b = config["k1"], config["b"]
+        terms = set(tokenize(query))
+
+        with self._lock:
+            n_docs = len(self.doc_lengths)
+            if not n_docs or not terms:
+                return []
+            allowed = self._allowed_ids(filters)
+            if allowed is not None and not allowed:
+                return []
+            avg_length = self.total_length / n_docs
+            scores = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                if allowed is None:
+                    ids = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+                    tfs = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+                else:
+                    # Walk whichever side is smaller: the filtered slice or the term's postings.
+                    if len(allowed) < len(postings):
+                        matched = [i for i in allowed if i in postings]
+                    else:
+                        matched = [i for i in postings if i in allowed]
+                    if not matched:
+                        continue
+                    ids = np.array(matched, dtype=np.int64)
+                    tfs = np.fromiter((postings[i] for i in matched), dtype=np.float64, count=len(matched))
+                lengths = np.fromiter((self.doc_lengths[i] for i in ids), dtype=np.float64, count=len(ids))
+                term_scores = idf * tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * lengths / avg_length))
+                for scan_id, score in zip(ids.tolist(), term_scores.tolist()):
+                    scores[scan_id] = scores.get(scan_id, 0.0) + score
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def match_product_name(self, query, config=None):
+        """
+        Scan ids whose product name is the whole query or appears in it verbatim
+        (after normalization). Longest matching name wins.
+        """
+        config = config or get_retrieval_config()
+        words = normalize_product_name(query).split()
+        # Every contiguous word run of the query, longest first: O(words^2) dict lookups.
+        spans = sorted(
+            ((i, j) for i in range(len(words)) for j in range(i + 1, len(words) + 1)),
+            key=lambda span: span[0] - span[1],
+        )
+        with self._lock:
+            for i, j in spans:
+                candidate = " ".join(words[i:j])
+                if len(candidate) >= config["min_product_name_chars"] and candidate in self.product_names:
+                    return sorted(self.product_names[candidate])
+        return []
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_bm25_index():
+    """Process-wide BM25 index, built lazily and synced with the table on every call."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = BM25Index()
+    _index.refresh()
+    return _index
+
+
+def loaded_bm25_index():
+    """The index if this process has already built it, else None (used by signal handlers)."""
+    return _index
+
+
+# --- fusion -------------------------------------------------------------------------------
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """Fuses ranked id lists: score(id) = sum over lists of 1 / (rrf_k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank)
+    return [item for item, _ in sorted(scores.items(), key=lambda pair: (-pair[1], str(pair[0])))]
+
+
+def _scan_id_from_document_id(document_id):
+    try:
+        return int(str(document_id).rsplit("-", 1)[-1])
+    except ValueError:
+        return None
+
+
+def vector_search(query, k, filters=None):
+    """[(scan id, document)] from the vector index, best first, among documents matching `filters`."""
+    # Imported here so the lexical path works without touching the vector store.
+    from PetPalAI.utils import get_food_label_collection
+    results = get_food_label_collection().query(
+        query_texts=[query], n_results=k, where=filters_to_where(filters)
+    )
+    hits = []
+    for document_id, document in zip(results["ids"][0], results["documents"][0]):
+        scan_id = _scan_id_from_document_id(document_id)
+        if scan_id is not None:
+            hits.append((scan_id, document))
+    return hits
+
+
+def search_food_labels(query, k=5, mode="hybrid", config=None, filters=None):
+    """
+    Returns up to k {"scan_id", "document", "source"} dicts for a food question.
+    mode: "hybrid" (BM25 + vector, RRF), "bm25" or "vector".
+    Source is "product_name" for an exact name match, otherwise the mode.
+    `filters` restricts ranking to matching scans; a product named exactly is
+    returned regardless, since naming it is the most specific filter there is.
+    """
+    config = config or get_retrieval_config()
+    index = get_bm25_index() if mode != "vector" else None
+    documents = {}
+
+    if index is not None:
+        exact = index.match_product_name(query, config)
+        if exact:
+            return _with_documents(exact[:k], documents, "product_name")
+
+    rankings = []
+    if mode in ("hybrid", "vector"):
+        try:
+            vector_hits = vector_search(query, config["candidates"] if mode == "hybrid" else k, filters)
+        except Exception as e:
+            if mode == "vector":
+                raise
+            # The lexical half still answers if the embedding server is down.
+            print(f"Vector search failed, using BM25 only: {e}")
+            vector_hits = []
+        documents.update(vector_hits)
+        rankings.append([scan_id for scan_id, _ in vector_hits])
+    if index is not None:
+        rankings.append([scan_id for scan_id, _ in index.search(query, config["candidates"], config, filters)])
+
+    fused = reciprocal_rank_fusion(rankings, config["rrf_k"]) if len(rankings) > 1 else rankings[0]
+    return _with_documents(fused[:k], documents, mode)
+
+
+def search_food_labels_for_user(query, user, k=5, mode="hybrid", config=None):
+    """
+    search_food_labels scoped to `user`: by default to the species of their pets,
+    with species, food type or "my scans" named in the question taking precedence.
+    If the species scope finds nothing, the search is repeated across all species
+    (explicit filters are kept).
+    """
+    explicit = parse_query_filters(query, user)
+    scope = {} if "pet_type" in explicit else user_species_filters(user)
+    results = search_food_labels(query, k, mode, config, {**scope, **explicit})
+    if not results and scope:
+        results = search_food_labels(query, k, mode, config, explicit)
+    return results
+
+
+def _with_documents(scan_ids, documents, source):
+    missing = [scan_id for scan_id in scan_ids if scan_id not in documents]
+    if missing:
+        for scan in FoodLabelScan.objects.filter(id__in=missing).only("id", "parsed_data"):
+            documents[scan.id] = label_document(scan)
+    return [
+        {"scan_id": scan_id, "document": documents[scan_id], "source": source}
+        for scan_id in scan_ids if scan_id in documents
+    ]
@@ -0,0 +1,88 @@
+# petfood_analyzer/scan_sync.py
+"""
+Keeps the in-memory scan indexes (nutrient matrix, ingredient index, BM25)
+in step with the FoodLabelScan table across processes.
+
+The post_save/post_delete signals only reach the indexes of the process that
+made the change, so every refresh also asks the database:
+
+  * scans whose updated_at is at or after the last sync (less an overlap, so
+    rows saved just before the sync but committed after it are not missed)
+    are re-read and replace their rows;
+  * deleted scans leave nothing to find by updated_at, so the number of scans
+    up to the highest id loaded is compared with the number loaded; when they
+    differ, the ids that are gone are dropped.
+
+Writes that bypass auto_now (queryset.update, bulk_update) must set
+updated_at themselves to be picked up, as the backfill_nutrient_columns and
+dedupe_label_images commands do.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import FoodLabelScan
+
+DEFAULT_SCAN_INDEX_SYNC = {
+    "overlap_seconds": 30,  # longer than the slowest transaction that saves scans
+}
+
+
+def get_scan_index_sync_config():
+    config = dict(DEFAULT_SCAN_INDEX_SYNC)
+    config.update(getattr(settings, "SCAN_INDEX_SYNC", {}))
+    return config
+
+
+class ScanSync:
+    """
+    Sync state of one index. The index implements _add_scans(scans) and
+    _drop_scans(scan_ids); every method here is called with the index's lock held.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.synced_at = None
+        self.scan_ids = set()
+        self.max_id = 0
+
+    def replace(self, index, scans):
+        """Adds `scans` to the index, replacing the rows of those already loaded."""
+        if not scans:
+            return
+        known = [scan.id for scan in scans if scan.id in self.scan_ids]
+        if known:
+            index._drop_scans(known)
+        index._add_scans(scans)
+        self.scan_ids.update(scan.id for scan in scans)
+        self.max_id = max(self.max_id, max(scan.id for scan in scans))
+
+    def drop(self, index, scan_ids):
+        scan_ids = [scan_id for scan_id in scan_ids if scan_id in self.scan_ids]
+        if scan_ids:
+            index._drop_scans(scan_ids)
+            self.scan_ids.difference_update(scan_ids)
+
+    def refresh(self, index, batch_size):
+        """Loads scans changed since the last refresh (all of them the first time) and drops deleted ones."""
+        config = get_scan_index_sync_config()
+        started = timezone.now()
+        queryset = FoodLabelScan.objects.only(*self.fields).order_by("id")
+        if self.synced_at is not None:
+            queryset = queryset.filter(
+                updated_at__gte=self.synced_at - timedelta(seconds=config["overlap_seconds"])
+            )
+        batch = []
+        for scan in queryset.iterator(chunk_size=batch_size):
+            batch.append(scan)
+            if len(batch) >= batch_size:
+                self.replace(index, batch)
+                batch = []
+        self.replace(index, batch)
+
+        if self.scan_ids:
+            below = FoodLabelScan.objects.filter(id__lte=self.max_id)
+            if below.count() != len(self.scan_ids):
+                self.drop(index, self.scan_ids - set(below.values_list("id", flat=True)))
+        self.synced_at = started
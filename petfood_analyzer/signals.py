@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import FoodLabelScan
+from .ingredient_index import loaded_ingredient_index
+from .nutrient_matrix import loaded_nutrient_matrix
+from .retrieval import loaded_bm25_index
+
+
+@receiver(post_save, sender=FoodLabelScan)
+def update_nutrient_matrix(sender, instance, **kwargs):
+    matrix = loaded_nutrient_matrix()
+    if matrix is not None:
+        matrix.upsert(instance)
+
+
+@receiver(post_delete, sender=FoodLabelScan)
+def remove_from_nutrient_matrix(sender, instance, **kwargs):
+    matrix = loaded_nutrient_matrix()
+    if matrix is not None:
+        matrix.remove(instance.id)
+
+
+@receiver(post_save, sender=FoodLabelScan)
+def update_ingredient_index(sender, instance, **kwargs):
+    index = loaded_ingredient_index()
+    if index is not None:
+        index.upsert(instance)
+
+
+@receiver(post_delete, sender=FoodLabelScan)
+def remove_from_ingredient_index(sender, instance, **kwargs):
+    index = loaded_ingredient_index()
+    if index is not None:
+        index.remove(instance.id)
+
+
+@receiver(post_save, sender=FoodLabelScan)
+def update_bm25_index(sender, instance, **kwargs):
+    index = loaded_bm25_index()
+    if index is not None:
+        index.upsert(instance)
+
+
+@receiver(post_delete, sender=FoodLabelScan)
+def remove_from_bm25_index(sender, instance, **kwargs):
+    index = loaded_bm25_index()
+    if index is not None:
+        index.remove(instance.id)
+
+
+@receiver(post_save, sender=FoodLabelScan)
+def sync_vector_document(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # Imported here: views pulls in OCR and the vector store, which signals must not load eagerly.
+    from PetPalAI.vector_sync import DOCUMENT_FIELDS, is_indexed
+    if raw or (update_fields and not DOCUMENT_FIELDS & set(update_fields)):
+        return
+    if created and not is_indexed(instance):
+        return  # nothing indexed yet, nothing to remove
+    from .views import sync_label_document
+    transaction.on_commit(lambda: sync_label_document(instance))
+
+
+@receiver(post_delete, sender=FoodLabelScan)
+def remove_vector_document(sender, instance, **kwargs):
+    from PetPalAI.utils import label_document_id
+    from PetPalAI.vector_writer import get_vector_writer
+    document_id = label_document_id(instance.pk)
+    transaction.on_commit(lambda: get_vector_writer().submit_delete(document_id))
@@ -0,0 +1,112 @@
+# petfood_analyzer/storage.py
+"""
+Content-addressed storage for label images.
+
+Every distinct image is stored exactly once, under the SHA-256 of its bytes:
+    pet_food_labels/ab/abcdef0123...jpg
+Re-uploading the same photo returns the existing name instead of writing a
+new copy. Downscaled display/thumbnail variants are generated on first access
+and cached next to the originals under pet_food_labels/variants/.
+"""
+import hashlib
+import io
+import os
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from PIL import Image
+
+DEFAULT_IMAGE_VARIANTS = {
+    # name: longest edge in pixels
+    "display": 1024,
+    "thumbnail": 256,
+}
+
+VARIANTS_DIR = "variants"
+
+_EXTENSION_ALIASES = {".jpeg": ".jpg", ".tif": ".tiff"}
+
+
+def get_image_variants():
+    variants = dict(DEFAULT_IMAGE_VARIANTS)
+    variants.update(getattr(settings, "LABEL_IMAGE_VARIANTS", {}))
+    return variants
+
+
+def hash_image_file(file_obj):
+    """SHA-256 hex digest of an uploaded/opened file. Leaves the file rewound."""
+    digest = hashlib.sha256()
+    if hasattr(file_obj, 'chunks'):
+        file_obj.seek(0)
+        for chunk in file_obj.chunks():
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: file_obj.read(1024 * 1024), b''):
+            digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_name(directory, digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()
+    ext = _EXTENSION_ALIASES.get(ext, ext)
+    return posixpath.join(directory, digest[:2], f"{digest}{ext}")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by their SHA-256 and never stores a duplicate."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = ContentFile(content.read(), name=name)
+
+        directory = posixpath.dirname(name.replace("\\", "/"))
+        name = content_addressed_name(directory, hash_image_file(content), name)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def variant_name(self, name, variant):
+        directory, filename = posixpath.split(name)
+        stem = os.path.splitext(filename)[0]
+        # Keep variants beside the top-level upload directory, not inside the hash shards.
+        root = directory.split("/", 1)[0] if directory else ""
+        return posixpath.join(root, VARIANTS_DIR, f"{stem}_{variant}.jpg")
+
+    def get_variant(self, name, variant):
+        """
+        Returns the storage name of a downscaled variant of `name`, generating
+        and caching it on first access. Falls back to the original on failure.
+        """
+        max_edge = get_image_variants().get(variant)
+        if not max_edge:
+            return name
+
+        variant_name = self.variant_name(name, variant)
+        if self.exists(variant_name):
+            return variant_name
+
+        try:
+            with self.open(name) as source, Image.open(source) as image:
+                image = image.convert("RGB")
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=85, optimize=True)
+        except (OSError, ValueError) as e:
+            print(f"Could not build '{variant}' variant for {name}: {e}")
+            return name
+
+        # Bypass content addressing: variants are keyed on their source image.
+        return FileSystemStorage.save(self, variant_name, ContentFile(buffer.getvalue()))
+
+    def variant_url(self, name, variant):
+        return self.url(self.get_variant(name, variant))
+
+
+label_image_storage = ContentAddressedStorage()
@@ -1,3 +1,188 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .analysis_cache import analysis_cache_key, canonical_analysis_payload
+from .ingredient_index import IngredientIndex
+from .ingredients import canonicalize_ingredient
+from .label_parser import parse_label, tokenize_sections
+from .models import FoodLabelScan
+from .result_cache import ocr_config_key
+
+LABEL_TESTDATA_DIR = os.path.join(os.path.dirname(__file__), 'testdata', 'labels')
+
+
+class LabelParserGoldenTests(SimpleTestCase):
+    """
+    Each testdata/labels/<name>.txt is OCR text; <name>.json is the expected parse.
+    When the parser output changes on purpose, regenerate the .json and review the diff.
+    """
+
+    def test_golden_outputs(self):
+        names = sorted(f[:-4] for f in os.listdir(LABEL_TESTDATA_DIR) if f.endswith('.txt'))
+        self.assertTrue(names)
+        for name in names:
+            with self.subTest(label=name):
+                with open(os.path.join(LABEL_TESTDATA_DIR, f'{name}.txt'), encoding='utf-8') as f:
+                    data, kcal_per_kg, kcal_per_unit = parse_label(f.read())
+                with open(os.path.join(LABEL_TESTDATA_DIR, f'{name}.json'), encoding='utf-8') as f:
+                    expected = json.load(f)
+                self.assertEqual(
+                    {'data': data, 'kcal_per_kg': kcal_per_kg, 'kcal_per_unit': kcal_per_unit},
+                    expected,
+                )
+
+
+class LabelParserTests(SimpleTestCase):
+
+    def test_tolerates_ocr_misspelled_headers(self):
+        sections = tokenize_sections(
+            "Inaredients: Chicken, Rice. Guarantced Analysis: Crude Protein, Min. 30%"
+        )
+        self.assertEqual(sections['ingredients'], 'Chicken, Rice.')
+        self.assertEqual(sections['guaranteed_analysis'], 'Crude Protein, Min. 30%')
+
+    def test_ingredient_sub_lists_stay_together(self):
+        data, _, _ = parse_label("Ingredients: Chicken, minerals (Zinc Oxide, Iron), Salt.")
+        self.assertEqual(data['ingredients'], ['Chicken', 'minerals (Zinc Oxide, Iron)', 'Salt'])
+
+    def test_ocr_zero_in_values_and_thousands_separators(self):
+        data, kcal_per_kg, _ = parse_label(
+            "Guaranteed Analysis: Crude Protein (Min) 26.O%\nCalorie Content: 3,612 kcal ME/kg"
+        )
+        self.assertEqual(data['guaranteed_analysis']['crude_protein'], '26%')
+        self.assertEqual(kcal_per_kg, 3612.0)
+
+    def test_long_noisy_text_parses_in_linear_time(self):
+        noise = "Crude Protein, Min. lorem ipsum (Ingredients? no) kcal per " * 5000
+        start = time.perf_counter()
+        parse_label(noise + "Ingredients: Chicken, Rice.")
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+
+class CacheKeyTests(SimpleTestCase):
+
+    def test_analysis_key_depends_on_pet_and_food_type(self):
+        payload = canonical_analysis_payload({'ingredients': ['Chicken', 'Rice']})
+        dog_dry = analysis_cache_key(payload, 'dog', 'DRY', 1, {})
+        self.assertEqual(dog_dry, analysis_cache_key(payload, 'Dog', 'dry', 1, {}))
+        self.assertNotEqual(dog_dry, analysis_cache_key(payload, 'cat', 'DRY', 1, {}))
+        self.assertNotEqual(dog_dry, analysis_cache_key(payload, 'dog', 'WET', 1, {}))
+
+    @override_settings(LABEL_OCR_MODE='single')
+    def test_ocr_key_depends_on_mode(self):
+        self.assertEqual(ocr_config_key(mode=None), ocr_config_key(mode='single'))
+        self.assertNotEqual(ocr_config_key(mode='single'), ocr_config_key(mode='tiled'))
+
+
+class IngredientTests(SimpleTestCase):
+
+    def test_canonical_ids_keep_vitamin_digits(self):
+        self.assertEqual(canonicalize_ingredient('Vitamin B12 Supplement'), 'vitamin_b12_supplement')
+        self.assertEqual(canonicalize_ingredient('Vitamin B-12'), 'vitamin_b12')
+        self.assertEqual(canonicalize_ingredient('Chicken Mea1'), 'chicken_meal')
+
+    def test_exclusion_covers_the_ingredient_family(self):
+        index = IngredientIndex()
+        labels = {
+            1: ['Chicken', 'Corn Gluten Meal'],
+            2: ['Chicken', 'Ground Whole Grain Corn'],
+            3: ['Chicken', 'Corn Starch'],
+            4: ['Chicken', 'Chickpeas', 'Peppercorn'],
+            5: ['Chicken', 'Brown Rice'],
+        }
+        index.sync.replace(index, [
+            FoodLabelScan(id=scan_id, parsed_data={'ingredients': ingredients})
+            for scan_id, ingredients in labels.items()
+        ])
+        self.assertEqual(index.query(include=['chicken'], exclude=['corn']).tolist(), [4, 5])
+        self.assertEqual(index.query(exclude=['rice']).tolist(), [1, 2, 3, 4])
+
+
+class ScanSyncTests(TestCase):
+    """An index built here stands in for another process: the save signals never reach it."""
+
+    def test_refresh_picks_up_updates_and_deletes(self):
+        kept = FoodLabelScan.objects.create(parsed_data={'ingredients': ['Chicken', 'Rice']})
+        deleted = FoodLabelScan.objects.create(parsed_data={'ingredients': ['Beef']})
+        index = IngredientIndex()
+        index.refresh()
+        self.assertEqual(index.query(include=['rice']).tolist(), [kept.id])
+
+        FoodLabelScan.objects.filter(id=kept.id).update(
+            parsed_data={'ingredients': ['Chicken', 'Barley']}, updated_at=timezone.now()
+        )
+        FoodLabelScan.objects.filter(id=deleted.id).delete()
+        index.refresh()
+        self.assertEqual(index.query(include=['rice']).tolist(), [])
+        self.assertEqual(index.query(include=['barley']).tolist(), [kept.id])
+        self.assertEqual(index.query(include=['beef']).tolist(), [])
+
+
+def _length_embedding(texts):
+    """Deterministic stand-in for the embedding model."""
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+class VectorCatchUpTests(TestCase):
+
+    def setUp(self):
+        from PetPalAI.vector_backends import NumpyVectorCollection
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.collection = NumpyVectorCollection(directory.name, _length_embedding)
+
+    def test_ids_only_catch_up_rewrites_scans_changed_since(self):
+        from PetPalAI.vector_sync import reconcile_food_label_index, write_scan_documents
+        scan = FoodLabelScan.objects.create(parsed_data={'ingredients': ['Chicken']})
+        write_scan_documents(self.collection, _length_embedding, [scan])
+        build_started = timezone.now() - timedelta(seconds=1)
+        scan.parsed_data = {'ingredients': ['Chicken', 'Rice']}
+        scan.save()
+
+        def catch_up(**kwargs):
+            return reconcile_food_label_index(
+                self.collection, _length_embedding, check_content=False, log=lambda message: None, **kwargs
+            )
+
+        self.assertEqual(catch_up()['stale'], 0)
+        self.assertEqual(catch_up(changed_since=build_started)['stale'], 1)
+        document = self.collection.get(ids=[f'scan-{scan.id}'])['documents'][0]
+        self.assertIn('Chicken, Rice', document)
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        from PetPalAI.embedding_cache import EmbeddingCache
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = EmbeddingCache(os.path.join(directory.name, 'embeddings.sqlite3'), max_entries=2)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return _length_embedding(texts)
+
+    def test_embeds_each_text_once_per_model(self):
+        from PetPalAI.embedding_cache import CachedEmbeddingFunction
+        first = CachedEmbeddingFunction(self.embed, 'model-a', self.cache)
+        self.assertEqual([list(v) for v in first(['ab', 'ab', 'abc'])], [[2.0, 1.0], [2.0, 1.0], [3.0, 1.0]])
+        first(['abc'])
+        CachedEmbeddingFunction(self.embed, 'model-b', self.cache)(['abc'])
+        self.assertEqual(self.embedded, ['ab', 'abc', 'abc'])
+
+    def test_evicts_least_recently_used(self):
+        from PetPalAI.embedding_cache import CachedEmbeddingFunction
+        embed = CachedEmbeddingFunction(self.embed, 'model-a', self.cache)
+        embed(['a'])
+        embed(['b'])
+        embed(['a'])
+        embed(['c'])
+        embed(['a', 'b'])
+        self.assertEqual(self.embedded, ['a', 'b', 'c', 'b'])
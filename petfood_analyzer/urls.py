@@ -4,4 +4,7 @@ from . import views
 
 urlpatterns = [
     path('', views.upload_label_view, name='analyze_food'), # This view will be the home page
+    path('compare/', views.compare_foods_view, name='compare_foods'),
+    path('scan/<int:scan_id>/analysis/', views.stream_analysis_view, name='stream_analysis'),
+    path('ingredients/', views.ingredient_search_view, name='ingredient_search'),
 ]
\ No newline at end of file
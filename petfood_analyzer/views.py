@@ -1,6 +1,5 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.conf import settings # To access MEDIA_ROOT
-from PIL import Image # Pillow library for image processing
 import pytesseract # Python wrapper for Tesseract OCR
 
 import json
@@ -11,106 +10,54 @@ import os # For path manipulation
 # Import your model and form
 from .models import FoodLabelScan
 from .forms import FoodLabelScanForm
+from .analysis_cache import analysis_cache_key, canonical_analysis_payload, get_cached_analysis, store_analysis
+from .ingredient_index import get_ingredient_index
+from .label_parser import parse_label
+from .nutrient_matrix import get_nutrient_matrix
+from .ocr import extract_label_text
+from .result_cache import get_cached_result, apply_cached_result, store_result
+from .storage import hash_image_file
 
-from PetPalAI.utils import get_food_label_collection
-import uuid # To generate unique IDs for documents
+from PetPalAI.utils import label_document_id
+from PetPalAI.vector_sync import is_indexed, scan_document
+from PetPalAI.vector_writer import get_vector_writer
 
 
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 
 # --- Initialize the Ollama Client with a timeout ---
 # You can do this once when your Django app starts up,
 # or in the function if you prefer. Doing it here makes it reusable.
 # Adjust the timeout (in seconds) as needed. 120 seconds (2 minutes) is a good start.
-pytesseract.pytesseract.tesseract_cmd = r'/usr/local/bin/tesseract' # local machine path
 ollama_client = Client(host='http://localhost:11434', timeout=120)
 
+# Model and prompt revision behind generate_pros_cons. Bump the prompt version whenever the
+# prompt text changes so cached analyses (see result_cache.py / analysis_cache.py) are not reused.
+AI_ANALYSIS_MODEL = 'llama3.2'
+AI_ANALYSIS_PROMPT_VERSION = 'v2'
+# Deterministic mode pins temperature and seed so a cached answer is the answer the model would give.
+AI_ANALYSIS_DETERMINISTIC = getattr(settings, 'AI_ANALYSIS_DETERMINISTIC', False)
+AI_ANALYSIS_OPTIONS = {'temperature': 0, 'seed': 42} if AI_ANALYSIS_DETERMINISTIC else {'temperature': 0.7}
+ANALYSIS_VERSION = f"{AI_ANALYSIS_PROMPT_VERSION}:{AI_ANALYSIS_MODEL}:t{AI_ANALYSIS_OPTIONS['temperature']}"
+
 
 def parse_nutritional_data(raw_text):
     """
     Parses raw OCR text to extract structured nutritional data.
+    Returns (data, kcal_per_kg, kcal_per_unit); see label_parser.parse_label.
     """
-    data = {
-        "product_name": None,
-        "guaranteed_analysis": {},
-        "ingredients": [],
-        "feeding_guide": None,
-        "other_info": {}
-    }
-    extracted_kcal_per_kg = None
-    extracted_kcal_per_unit = None
-    # Product_name
-    pattern = r"Animal feeding tests using AAFCO procedures substantiate that (.*?) provides complete and balanced nutrition for .*"
-
-    match_product_name = re.search(pattern, raw_text, re.IGNORECASE | re.DOTALL)  # re.DOTALL allows . to match newlines
-
-    if match_product_name:
-        data["product_name"] = match_product_name.group(1).strip()  # .strip() to remove any leading/trailing whitespace
-
-
-    # Extracting Guaranteed Analysis (simplified) ---
-    # Crude Protein
-    match_protein = re.search(r'Crude Protein,\s*Min.\s*([\d.]+%)', raw_text, re.IGNORECASE)
-    if match_protein:
-        data["guaranteed_analysis"]["crude_protein"] = match_protein.group(1)
-
-    # Crude Fat
-    match_fat = re.search(r'Crude Fat,\s*Min.\s*([\d.]+%)', raw_text, re.IGNORECASE)
-    if match_fat:
-        data["guaranteed_analysis"]["crude_fat"] = match_fat.group(1)
-
-    # Moisture
-    match_moisture = re.search(r'Moisture,\s*Max.\s*([\d.]+%)', raw_text, re.IGNORECASE)
-    if match_moisture:
-        data["guaranteed_analysis"]["moisture"] = match_moisture.group(1)
-
-    # Calorie Content
-    # Regex to capture "816 kcal ME/kg" AND "67 kcal ME/can" (or similar)
-    calorie_match = re.search(
-        r'Calorie Content \(calculated\):\s*([\d.]+)\s*kcal ME/kg(?:;\s*([\d.]+)\s*kcal ME/(?:can|cup|treat))?',
-        raw_text, re.IGNORECASE
-    )
-
-    if calorie_match:
-        # First group is always kcal ME/kg
-        kcal_per_kg_str = calorie_match.group(1)
-        try:
-            extracted_kcal_per_kg = float(kcal_per_kg_str)  # Convert to float
-        except ValueError:
-            extracted_kcal_per_kg = None  # Handle cases where conversion fails
-
-        # Second group is optional (kcal per can/cup)
-        if calorie_match.group(2):
-            unit_type_match = re.search(r'kcal ME/(can|cup|treat)', raw_text, re.IGNORECASE)
-            unit_type = unit_type_match.group(1) if unit_type_match else 'unit'
-            extracted_kcal_per_unit = f"{calorie_match.group(2)} kcal ME/{unit_type}"
-
-    # ... (your existing regex for ingredients list, etc.) ...
-    ingredients_match = re.search(
-        r'(?:Ingredients|Inaredients):\s*(.*?)(?=\s*Guaranteed Analysis:|Calorie Content:|DAILY FEEDING GUIDE:|AFCO Statement:|Ingredients : Bouillon|$)',
-        raw_text, re.IGNORECASE | re.DOTALL)
-    if ingredients_match:
-        ingredients_string = ingredients_match.group(1).strip()
-        ingredients_string = ingredients_string.replace('Inaredients:', 'Ingredients:')
-        ingredients_string = ingredients_string.replace(':', '')
-        ingredients_list = [item.strip() for item in re.split(r'[,;]', ingredients_string) if item.strip()]
-        data["ingredients"] = ingredients_list
-
-    # Return the data dict, kcal_per_kg, and kcal_per_unit
-    return data, extracted_kcal_per_kg, extracted_kcal_per_unit
-
-def generate_pros_cons(nutritional_data):
-    """
-    Generates AI-powered pros and cons for pet food based on parsed nutritional data.
-    """
-    if not nutritional_data or not isinstance(nutritional_data, dict):
-        return "No valid nutritional data to analyze."
+    return parse_label(raw_text)
 
+def _analysis_messages(payload, pet_type=None, food_type=None):
+    """Chat messages for the pros/cons prompt, built from the canonical analysis payload."""
     # Convert the dictionary to a string for the LLM prompt
-    nutritional_data_str = json.dumps(nutritional_data, indent=2)
+    nutritional_data_str = json.dumps(payload, indent=2)
+    audience = f"a {pet_type} owner" if pet_type and pet_type != 'other' else "a typical cat or dog owner"
+    food_kind = dict(FoodLabelScan.FOOD_TYPE_CHOICES).get(food_type, "pet food").lower()
 
     prompt = f"""
-    Analyze the following pet food nutritional data and provide a concise list of pros and cons for a typical cat or dog owner.
+    Analyze the following {food_kind} nutritional data and provide a concise list of pros and cons for {audience}.
     Focus on common concerns like protein content, fat content, moisture, ingredients (e.g., common allergens, quality of protein sources, fillers), and calorie content.
     Do not make medical recommendations. If data is incomplete or unclear, mention it in 'Notes'. Keep it to about 3-5 pros and 3-5 cons. Alert any recalls in last 2 years.
 
@@ -129,6 +76,32 @@ def generate_pros_cons(nutritional_data):
     Notes:
     - ...
     """
+    return [
+        {'role': 'system', 'content': 'You are an AI assistant that analyzes pet food labels.'},
+        {'role': 'user', 'content': prompt}
+    ]
+
+
+def analysis_failed(text):
+    """True for a blank analysis or one of the "AI analysis failed..." messages."""
+    return not (text or "").strip() or text.startswith("AI analysis failed")
+
+
+def generate_pros_cons(nutritional_data, pet_type=None, food_type=None):
+    """
+    Generates AI-powered pros and cons for pet food based on parsed nutritional data.
+    Answers are cached on the normalized data, pet type and food type (see analysis_cache.py).
+    """
+    if not nutritional_data or not isinstance(nutritional_data, dict):
+        return "No valid nutritional data to analyze."
+
+    # Only the normalized, analysis-relevant fields go into the prompt, so the cache key
+    # fully determines what the model sees.
+    payload = canonical_analysis_payload(nutritional_data)
+    cache_key = analysis_cache_key(payload, pet_type, food_type, ANALYSIS_VERSION, AI_ANALYSIS_OPTIONS)
+    cached_analysis = get_cached_analysis(cache_key)
+    if cached_analysis is not None:
+        return cached_analysis
 
     try:
         # Assuming your Ollama server is running locally (default: http://localhost:11434)
@@ -136,14 +109,13 @@ def generate_pros_cons(nutritional_data):
         # Set to a value in seconds (e.g., 120 seconds = 2 minutes)
         # You might need to adjust this based on your system's performance.
         response = ollama_client.chat(
-            model='llama3.2',
-            messages=[
-                {'role': 'system', 'content': 'You are an AI assistant that analyzes pet food labels.'},
-                {'role': 'user', 'content': prompt}
-            ],
-            options={'temperature': 0.7}
+            model=AI_ANALYSIS_MODEL,
+            messages=_analysis_messages(payload, pet_type, food_type),
+            options=AI_ANALYSIS_OPTIONS
         )
-        return response['message']['content']
+        analysis = response['message']['content']
+        store_analysis(cache_key, analysis, pet_type, food_type, ANALYSIS_VERSION)
+        return analysis
     except ollama.ResponseError as e:  # Catch specific Ollama API errors
         print(f"Ollama API Error: {e}")
         return f"AI analysis failed due to Ollama API error: {e}"
@@ -152,6 +124,145 @@ def generate_pros_cons(nutritional_data):
         return f"AI analysis failed: An unexpected error occurred. Error: {e}"
 
 
+def stream_pros_cons(nutritional_data, pet_type=None, food_type=None):
+    """
+    Streaming variant of generate_pros_cons: yields the analysis in chunks as
+    Ollama produces them. A cached answer is yielded in one piece. The complete
+    text is stored in the analysis cache once the stream finishes cleanly.
+    On failure (including an empty answer) the last chunk is an "AI analysis
+    failed..." message like those generate_pros_cons returns, and nothing is cached.
+    """
+    if not nutritional_data or not isinstance(nutritional_data, dict):
+        yield "No valid nutritional data to analyze."
+        return
+
+    payload = canonical_analysis_payload(nutritional_data)
+    cache_key = analysis_cache_key(payload, pet_type, food_type, ANALYSIS_VERSION, AI_ANALYSIS_OPTIONS)
+    cached_analysis = get_cached_analysis(cache_key)
+    if cached_analysis is not None:
+        yield cached_analysis
+        return
+
+    parts = []
+    try:
+        stream = ollama_client.chat(
+            model=AI_ANALYSIS_MODEL,
+            messages=_analysis_messages(payload, pet_type, food_type),
+            options=AI_ANALYSIS_OPTIONS,
+            stream=True,
+        )
+        for chunk in stream:
+            content = chunk['message']['content']
+            if content:
+                parts.append(content)
+                yield content
+    except ollama.ResponseError as e:
+        print(f"Ollama API Error: {e}")
+        yield f"AI analysis failed due to Ollama API error: {e}"
+        return
+    except Exception as e:
+        print(f"General AI analysis error: {e}")
+        yield f"AI analysis failed: An unexpected error occurred. Error: {e}"
+        return
+
+    analysis = "".join(parts)
+    if analysis_failed(analysis):
+        yield "AI analysis failed: The model returned an empty answer."
+        return
+    store_analysis(cache_key, analysis, pet_type, food_type, ANALYSIS_VERSION)
+
+
+# Version of build_label_document's text and label_document_metadata's keys. Bump it when
+# either changes: the vector index is then re-embedded into a new version in the background.
+LABEL_DOCUMENT_SCHEMA = 2
+
+
+def build_label_document(parsed_data):
+    """Text representation of a parsed label, as stored in the vector database."""
+    return f"Product Name: {parsed_data.get('product_name')}\n" \
+           f"Ingredients: {', '.join(parsed_data.get('ingredients', []))}\n" \
+           f"Analysis: {parsed_data.get('guaranteed_analysis')}"
+
+
+def sync_label_document(food_scan):
+    """
+    Queues the scan's vector document for upsert, or its removal when the scan has no
+    ingredient list. Called from the FoodLabelScan post_save signal after commit; the
+    process-wide writer applies queued changes in batches (see PetPalAI/vector_writer.py).
+    """
+    writer = get_vector_writer()
+    if is_indexed(food_scan):
+        writer.submit(*scan_document(food_scan))
+    else:
+        writer.submit_delete(label_document_id(food_scan.pk))
+
+
+def label_document_metadata(food_scan):
+    """
+    Metadata stored with each vector document; retrieval filters on pet_type,
+    food_type and user_id inside the vector query (see petfood_analyzer/retrieval.py).
+    Anonymous scans get user_id 0, since metadata values cannot be null.
+    """
+    return {
+        "product_name": food_scan.parsed_data.get('product_name') or '',
+        "scan_id": food_scan.pk,
+        "pet_type": food_scan.pet_type,
+        "food_type": food_scan.food_type,
+        "user_id": food_scan.user_id or 0,
+    }
+
+
+def process_label_scan(food_scan_instance, ocr_mode=None, defer_analysis=False):
+    """
+    Runs OCR, parsing and AI analysis on a saved FoodLabelScan and fills in its
+    result fields. Does not save the instance. Returns an error message or None.
+    `ocr_mode` is "single", "tiled" or "auto" (default: settings.LABEL_OCR_MODE).
+    With `defer_analysis`, ai_analysis is left blank for stream_analysis_view to fill.
+    """
+    error_message = None
+
+    # --- 1. Perform OCR using pytesseract ---
+    # Get the full path to the saved image file
+    image_path = food_scan_instance.image.path
+    try:
+        # Downscale, binarize, deskew and crop before handing the image to Tesseract.
+        # Steps are configured via settings.LABEL_OCR_PREPROCESSING.
+        food_scan_instance.raw_text = extract_label_text(image_path, mode=ocr_mode)
+    except pytesseract.TesseractNotFoundError:
+        raw_text = "ERROR: Tesseract OCR engine not found. Please ensure it's installed and in your PATH."
+        food_scan_instance.raw_text = raw_text
+        error_message = raw_text # Store error to display
+    except Exception as e:
+        raw_text = f"ERROR during OCR: {e}"
+        food_scan_instance.raw_text = raw_text
+        error_message = raw_text
+
+    # --- 2. Plug in your parsing logic ---
+    # Pass the raw_text to your parsing function
+    parsed_data_dict, kcal_per_kg_decimal, kcal_per_unit_str = parse_nutritional_data(food_scan_instance.raw_text)
+    food_scan_instance.parsed_data = parsed_data_dict
+    food_scan_instance.calorie_content_kcal_per_kg = kcal_per_kg_decimal
+    food_scan_instance.calorie_content_per_unit = kcal_per_unit_str
+    food_scan_instance.apply_parsed_data()
+
+    print("food_scan_instance.parsed_data ", parsed_data_dict)
+    # --- 3. Plug in your AI analysis logic ---
+    # Pass the parsed_data to your LLM function
+    if parsed_data_dict.get("ingredients"):
+        if defer_analysis:
+            food_scan_instance.ai_analysis = ""
+        else:
+            food_scan_instance.ai_analysis = generate_pros_cons(
+                parsed_data_dict, food_scan_instance.pet_type, food_scan_instance.food_type
+            )
+        # The vector database picks the scan up when it is saved (see signals.py)
+
+    else:
+        food_scan_instance.ai_analysis = "AI analysis skipped: No ingredient list found in the label."
+
+    return error_message
+
+
 @login_required
 def upload_label_view(request):
     """
@@ -176,79 +287,28 @@ def upload_label_view(request):
                 else:
                     food_scan_instance.user = None # Or link to a default/anonymous user if you set one up
 
+                # Identical photos (same bytes) reuse the cached OCR/parse output; the analysis
+                # comes from the analysis cache, keyed on the pet and food type too.
+                image_hash = hash_image_file(form.cleaned_data['image'])
+                cached_result = get_cached_result(image_hash, ANALYSIS_VERSION)
+
                 # Save the image file to MEDIA_ROOT
                 food_scan_instance.save() # Saves the image to disk and creates a DB entry
 
-                # --- 1. Perform OCR using pytesseract ---
-                # Get the full path to the saved image file
-                image_path = food_scan_instance.image.path
-                try:
-                    # Open the image using Pillow and pass to pytesseract
-                    image = Image.open(image_path)
-                    # convert to RGB to ensure a common mode, then grayscale.
-                    image = image.convert('RGB')
-                    #image = image.convert('L')  # Convert to grayscale
-                    # OPTIONAL: Save the processed image for inspection
-                    # This helps verify what Tesseract is actually receiving
-                    # debug_image_path = os.path.join(settings.MEDIA_ROOT, 'debug_processed_image.png')
-                    # image.save(debug_image_path)
-                    raw_text = pytesseract.image_to_string(image)
-                    food_scan_instance.raw_text = raw_text.strip()
-                except pytesseract.TesseractNotFoundError:
-                    raw_text = "ERROR: Tesseract OCR engine not found. Please ensure it's installed and in your PATH."
-                    food_scan_instance.raw_text = raw_text
-                    error_message = raw_text # Store error to display
-                except Exception as e:
-                    raw_text = f"ERROR during OCR: {e}"
-                    food_scan_instance.raw_text = raw_text
-                    error_message = raw_text
-
-                # --- 2. Plug in your parsing logic ---
-                # Pass the raw_text to your parsing function
-                parsed_data_dict, kcal_per_kg_decimal, kcal_per_unit_str = parse_nutritional_data(food_scan_instance.raw_text)
-                food_scan_instance.parsed_data = parsed_data_dict
-                food_scan_instance.calorie_content_kcal_per_kg = kcal_per_kg_decimal
-                food_scan_instance.calorie_content_per_unit = kcal_per_unit_str
-
-                print("food_scan_instance.parsed_data ", parsed_data_dict)
-                # --- 3. Plug in your AI analysis logic ---
-                # Pass the parsed_data to your LLM function
-                if parsed_data_dict.get("ingredients"):
-                    food_scan_instance.ai_analysis = generate_pros_cons(parsed_data_dict)
-                    # Add parsed data to the Vector Database
-                    collection = get_food_label_collection()
-                    # Count the number of items before adding
-                    initial_count = collection.count()
-
-                    # Create a string representation of the parsed data
-                    doc_content = f"Product Name: {parsed_data_dict.get('product_name')}\n" \
-                                  f"Ingredients: {', '.join(parsed_data_dict.get('ingredients', []))}\n" \
-                                  f"Analysis: {parsed_data_dict.get('guaranteed_analysis')}"
-
-                    # Add the document to the collection
-                    collection.add(
-                        documents=[doc_content],
-                        metadatas=[{"product_name": parsed_data_dict.get('product_name')}],
-                        ids=[str(uuid.uuid4())]
-                    )
-
-                    # Count the number of items after adding
-                    final_count = collection.count()
-
-                    # Print the result to your terminal
-                    print(f"ChromaDB Status: Initial count was {initial_count}, Final count is {final_count}.")
-                    if final_count > initial_count:
-                        print("✅ Document successfully added to the vector database.")
-                    else:
-                        print("❌ Document was NOT added to the vector database. Check for errors.")
-
+                if cached_result:
+                    apply_cached_result(cached_result, food_scan_instance)
                 else:
-                    food_scan_instance.ai_analysis = "AI analysis skipped: No ingredient list found in the label."
-
+                    # The page renders as soon as OCR and parsing are done; the pros/cons
+                    # stream in afterwards from stream_analysis_view.
+                    error_message = process_label_scan(food_scan_instance, defer_analysis=True)
 
                 # Save the FoodLabelScan instance again with the processed data
                 food_scan_instance.save()
 
+                # Only cache clean runs, so a transient OCR failure isn't replayed forever.
+                if not cached_result and not error_message:
+                    store_result(image_hash, ANALYSIS_VERSION, food_scan_instance)
+
                 # At this point, food_scan_instance contains all the data.
                 # It will be passed to the template for display.
 
@@ -264,5 +324,126 @@ def upload_label_view(request):
         'form': form,
         'food_scan': food_scan_instance, # Pass the processed scan or None
         'error_message': error_message,
+        'analysis_pending': food_scan_instance is not None and analysis_pending(food_scan_instance),
     }
-    return render(request, 'petfood_analyzer/upload.html', context)
\ No newline at end of file
+    return render(request, 'petfood_analyzer/upload.html', context)
+
+
+def analysis_pending(food_scan):
+    """True when a scan has ingredients to analyze but no ai_analysis yet."""
+    return not food_scan.ai_analysis and bool((food_scan.parsed_data or {}).get('ingredients'))
+
+
+@login_required
+def stream_analysis_view(request, scan_id):
+    """
+    Streams the AI pros/cons for one of the user's scans as plain text.
+    The full text is saved to FoodLabelScan.ai_analysis when the stream ends
+    (a failed one leaves it pending for a retry); if it was already generated,
+    it is returned in one piece.
+    """
+    food_scan = get_object_or_404(FoodLabelScan, pk=scan_id, user=request.user)
+
+    if not analysis_pending(food_scan):
+        return HttpResponse(food_scan.ai_analysis, content_type='text/plain; charset=utf-8')
+
+    def stream():
+        parts = []
+        for chunk in stream_pros_cons(food_scan.parsed_data, food_scan.pet_type, food_scan.food_type):
+            parts.append(chunk)
+            yield chunk
+
+        # Only reached when the whole answer was sent; a client that disconnects
+        # mid-stream leaves the analysis pending so the next page load retries it.
+        # So does a failed stream: its message is shown, not saved as the analysis.
+        analysis = "".join(parts)
+        if analysis_failed(analysis):
+            return
+        food_scan.ai_analysis = analysis
+        food_scan.save(update_fields=['ai_analysis'])
+
+    response = StreamingHttpResponse(stream(), content_type='text/plain; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let a reverse proxy buffer the stream
+    return response
+
+@login_required
+def compare_foods_view(request):
+    """
+    JSON comparison of scanned foods on a dry-matter and per-1000-kcal basis.
+
+    Query parameters (all optional):
+      ids        comma-separated FoodLabelScan ids to restrict the comparison to
+      pet_type   e.g. "dog" / "cat"
+      food_type  e.g. "DRY" / "WET"
+      sort       metric to rank by (default "protein_dm"), e.g. "fat_per_1000kcal"
+      order      "desc" (default) or "asc"
+      limit      number of results (default 50, max 1000)
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Invalid method"}, status=405)
+
+    try:
+        ids = request.GET.get('ids')
+        ids = [int(i) for i in ids.split(',') if i.strip()] if ids else None
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 1000)
+    except ValueError:
+        return JsonResponse({"error": "ids and limit must be integers."}, status=400)
+
+    matrix = get_nutrient_matrix()
+    try:
+        results = matrix.compare(
+            ids=ids,
+            pet_type=request.GET.get('pet_type') or None,
+            food_type=request.GET.get('food_type') or None,
+            sort=request.GET.get('sort', 'protein_dm'),
+            descending=request.GET.get('order', 'desc') != 'asc',
+            limit=limit,
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"count": len(results), "results": results})
+
+
+def _csv_param(request, name):
+    values = []
+    for raw in request.GET.getlist(name):
+        values.extend(v.strip() for v in raw.split(',') if v.strip())
+    return values
+
+
+@login_required
+def ingredient_search_view(request):
+    """
+    JSON search of scanned foods by ingredient.
+
+    Query parameters (comma-separated or repeated):
+      include  ingredients that must all be present, e.g. "chicken meal"
+      exclude  ingredients that must not be present, e.g. "corn,wheat"
+      any      at least one of these must be present
+      limit    number of scans to return (default 50, max 1000)
+    Spellings are canonicalized, so "Chlcken Meal" matches "chicken meal".
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Invalid method"}, status=405)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 1000)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+
+    include = _csv_param(request, 'include')
+    exclude = _csv_param(request, 'exclude')
+    any_of = _csv_param(request, 'any')
+    if not (include or exclude or any_of):
+        return JsonResponse({"error": "Give at least one of include, exclude or any."}, status=400)
+
+    scan_ids = get_ingredient_index().query(include=include, exclude=exclude, any_of=any_of)
+    page = [int(i) for i in scan_ids[:limit]]
+    names = dict(FoodLabelScan.objects.filter(id__in=page).values_list('id', 'product_name'))
+
+    return JsonResponse({
+        "count": int(len(scan_ids)),
+        "results": [{"scan_id": i, "product_name": names.get(i)} for i in page if i in names],
+    })
@@ -0,0 +1,30 @@
+# user_profile/cache_invalidation.py
+"""Drops a user's cached pages (PetPalAI/page_cache.py) when their User or UserProfile row changes."""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from PetPalAI.page_cache import PAGES, PROFILE_FORM, invalidate_user_pages
+from .models import UserProfile
+
+# Saves touching only these User fields change nothing the cached pages show (login sets last_login).
+IGNORED_USER_FIELDS = frozenset({"last_login", "password"})
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= IGNORED_USER_FIELDS):
+        return
+    # The username is in every page's header, the email in the profile form.
+    invalidate_user_pages([instance.pk], pages=PAGES)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_user_pages_on_user_delete(sender, instance, **kwargs):
+    invalidate_user_pages([instance.pk], pages=PAGES)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_form(sender, instance, **kwargs):
+    invalidate_user_pages([instance.user_id], pages=(PROFILE_FORM,))
@@ -1,13 +1,16 @@
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from .forms import UserForm, UserProfileForm
 from django.contrib.auth.decorators import login_required
 
+from PetPalAI.page_cache import PROFILE_FORM, get_or_render
+
+FORM_FIELDS_TEMPLATE = 'user_profile/_profile_form_fields.html'
+
 
 @login_required
 def user_profile_view(request):
-    user_form = UserForm(instance=request.user)
-    profile_form = UserProfileForm(instance=request.user.profile)
-
     if request.method == 'POST':
         user_form = UserForm(request.POST, instance=request.user)
         profile_form = UserProfileForm(request.POST, instance=request.user.profile)
@@ -17,4 +20,15 @@ def user_profile_view(request):
             profile_form.save()
             return redirect('user_profile')
 
-    return render(request,'user_profile/profile.html',{'user_form': user_form,'profile_form': profile_form})
+        form_fields = render_to_string(FORM_FIELDS_TEMPLATE, {'user_form': user_form, 'profile_form': profile_form})
+    else:
+        # The unbound form fields are cached per user; the page around them is rendered per
+        # request because it carries the CSRF token.
+        def render_form_fields():
+            return render_to_string(FORM_FIELDS_TEMPLATE, {
+                'user_form': UserForm(instance=request.user),
+                'profile_form': UserProfileForm(instance=request.user.profile),
+            })
+        form_fields = get_or_render(request.user.pk, PROFILE_FORM, render_form_fields)
+
+    return render(request,'user_profile/profile.html',{'form_fields': mark_safe(form_fields)})